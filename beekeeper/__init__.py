@@ -1,9 +1,37 @@
 """
-Importing certain classes into the global namespace.
+Importing certain classes into the global namespace. On Python 3.7 and
+up, they're only imported when they're first used, so that importing one
+of beekeeper's modules doesn't mean importing all of them.
 """
 
-from beekeeper.api import API
-from beekeeper.hive import Hive
-from beekeeper.data_handlers import DataHandler
-from beekeeper.variable_handlers import VariableHandler, set_content_type
-from beekeeper.variable_handlers import render as render_variables
+import sys
+
+EXPORTS = {
+    'API': 'beekeeper.api',
+    'Hive': 'beekeeper.hive',
+    'DataHandler': 'beekeeper.data_handlers',
+    'VariableHandler': 'beekeeper.variable_handlers',
+    'set_content_type': 'beekeeper.variable_handlers',
+    'render_variables': 'beekeeper.variable_handlers',
+}
+
+ALIASES = {
+    'render_variables': 'render',
+}
+
+__all__ = list(EXPORTS)
+
+def __getattr__(name):
+    if name not in EXPORTS:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    __import__(EXPORTS[name])
+    value = getattr(sys.modules[EXPORTS[name]], ALIASES.get(name, name))
+    globals()[name] = value
+    return value
+
+if sys.version_info < (3, 7):
+    from beekeeper.api import API
+    from beekeeper.hive import Hive
+    from beekeeper.data_handlers import DataHandler
+    from beekeeper.variable_handlers import VariableHandler, set_content_type
+    from beekeeper.variable_handlers import render as render_variables
@@ -0,0 +1,542 @@
+"""
+Provides an asyncio-native way of executing Actions. Variable rendering,
+traversal and error handling are exactly the same as in the blocking path;
+the only difference is that requests are sent over non-blocking,
+keep-alive connections, so a single event loop can drive many concurrent
+calls without a thread per request.
+
+This module needs Python 3.5 or newer, so it's only imported when an
+asynchronous method is actually used.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+import asyncio
+import io
+import re
+import socket
+import time
+from functools import partial
+from http.client import parse_headers, InvalidURL
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit, urljoin
+
+from beekeeper.comms import Request, Response, ResponseException, timed_out
+from beekeeper.exceptions import RequestTimeout
+from beekeeper.pool import ConnectionPool, DEFAULT_PORTS, REDIRECT_CODES
+from beekeeper.ratelimit import release_all, observe_all
+from beekeeper.retry import RetryPolicy
+from beekeeper.compression import CompressionPolicy
+from beekeeper.metrics import Timings, report
+from beekeeper.multipart import is_replayable
+from beekeeper.trace import Trace
+from beekeeper.transports import BufferedResponse
+
+#How often to check for a free in-flight slot on a rate limiter, since
+#its slots are shared with threads and can't be awaited directly.
+SLOT_POLL_INTERVAL = 0.01
+
+#The checks http.client makes on the request line and headers before it
+#sends them, so that nothing can smuggle in a header of its own
+LEGAL_HEADER_NAME = re.compile(r'[^:\s][^:\r\n]*')
+ILLEGAL_HEADER_VALUE = re.compile(r'\n(?![ \t])|\r(?![ \t\n])')
+DISALLOWED_PATH_CHARS = re.compile('[\x00-\x20\x7f]')
+
+def header_line(name, value):
+    """
+    Format a header, raising a ValueError for a name or value that would
+    break out of its line, as http.client does.
+    """
+    name, value = '{}'.format(name), '{}'.format(value)
+    if LEGAL_HEADER_NAME.fullmatch(name) is None:
+        raise ValueError('Invalid header name {!r}'.format(name))
+    if ILLEGAL_HEADER_VALUE.search(value) is not None:
+        raise ValueError('Invalid header value {!r}'.format(value))
+    return '{}: {}'.format(name, value)
+
+class AsyncConnection(object):
+
+    """
+    A single keep-alive connection; a thin wrapper around an asyncio
+    reader/writer pair that knows how to speak just enough HTTP/1.1.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def is_usable(self):
+        return not self.reader.at_eof() and not self.writer.is_closing()
+
+    def close(self):
+        self.writer.close()
+
+    def abort(self):
+        """
+        Drop the connection without waiting on its event loop, which may
+        have been closed already (as it is after asyncio.run()). Shutting
+        the socket down tells the server straight away; the transport lets
+        go of it once it's collected.
+        """
+        transport = self.writer.transport
+        sock = transport.get_extra_info('socket')
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        try:
+            transport.abort()
+        except RuntimeError:
+            pass
+
+    async def request(self, method, host, path, data, headers):
+        match = DISALLOWED_PATH_CHARS.search(path)
+        if match is not None:
+            raise InvalidURL("URL can't contain control characters. {!r} (found at least {!r})".format(path, match.group()))
+        lines = ['{} {} HTTP/1.1'.format(method, path), 'Host: {}'.format(host)]
+        names = {name.lower() for name in headers}
+        if 'accept-encoding' not in names:
+            lines.append('Accept-Encoding: identity')
+        streamed = data is not None and not isinstance(data, bytes)
+        if streamed and 'content-length' not in names:
+            lines.append('Transfer-Encoding: chunked')
+        elif not streamed and (data is not None or method in ('POST', 'PUT', 'PATCH')):
+            lines.append('Content-Length: {}'.format(len(data or b'')))
+        lines.extend(header_line(name, val) for name, val in headers.items())
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        if streamed:
+            await self.write_streamed(data, chunked='content-length' not in names)
+        elif data:
+            self.writer.write(data)
+        await self.writer.drain()
+
+    async def write_streamed(self, data, chunked):
+        """
+        Write a streamed body a chunk at a time, waiting for each chunk
+        to drain so that no more than one is buffered at once.
+        """
+        for chunk in data:
+            if chunked:
+                self.writer.write('{:x}\r\n'.format(len(chunk)).encode('latin-1'))
+            self.writer.write(chunk)
+            if chunked:
+                self.writer.write(b'\r\n')
+            await self.writer.drain()
+        if chunked:
+            self.writer.write(b'0\r\n\r\n')
+
+    async def getresponse(self, method, timings):
+        """
+        Read a full response off the connection; returns a BufferedResponse
+        along with whether or not the connection can be used again.
+        """
+        with timings.timer('ttfb'):
+            version, code, reason, header_lines = await self.read_head()
+        headers = parse_headers(io.BytesIO(b''.join(header_lines)))
+        connection = headers.get('Connection', '').lower()
+        will_close = connection == 'close' or (version == 'HTTP/1.0' and connection != 'keep-alive')
+        with timings.timer('download'):
+            if method == 'HEAD' or code in (204, 304) or 100 <= code < 200:
+                body = b''
+            elif headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                body = await self.read_chunked()
+            elif headers.get('Content-Length') is not None:
+                body = await self.reader.readexactly(int(headers['Content-Length']))
+            else:
+                body = await self.reader.read()
+                will_close = True
+        return BufferedResponse(code, reason, headers, body), not will_close
+
+    async def read_head(self):
+        """
+        Read the status line and headers, skipping past any 100 Continue.
+        """
+        while True:
+            status_line = await self.reader.readline()
+            if not status_line:
+                raise ConnectionResetError('Remote end closed connection without response')
+            version, code, reason = (status_line.decode('latin-1').rstrip('\r\n').split(' ', 2) + [''])[:3]
+            code = int(code)
+            header_lines = []
+            while True:
+                line = await self.reader.readline()
+                header_lines.append(line)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+            if code != 100:
+                return version, code, reason, header_lines
+
+    async def read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self.reader.readline()).split(b';')[0].strip(), 16)
+            if size == 0:
+                break
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+        while (await self.reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+        return b''.join(chunks)
+
+class AsyncConnectionPool(ConnectionPool):
+
+    """
+    The asyncio counterpart to ConnectionPool; same limits, same idle
+    eviction, same redirect and cookie handling. Connections are tied to
+    the event loop that opened them, which is why a Session keeps a pool
+    for each loop; if a pool is used from a new loop anyway, the old
+    loop's idle connections are dropped and it starts over from scratch.
+    """
+
+    def __init__(self, *args, **kwargs):
+        ConnectionPool.__init__(self, *args, **kwargs)
+        self.loop = None
+
+    def check_loop(self):
+        loop = asyncio.get_event_loop()
+        if loop is not self.loop:
+            self.close()
+            self.loop = loop
+            self.active = {}
+            self.condition = asyncio.Condition()
+
+    async def urlopen(self, url, data=None, headers=None, method=None, timeout=5, timings=None, trace=None):
+        """
+        Send a request, following redirects the same way that urllib
+        would, and raise an HTTPError for any non-2xx final response.
+        """
+        headers = dict(headers or {})
+        method = method or ('GET' if data is None else 'POST')
+        timings = timings if timings is not None else Timings()
+        for _ in range(self.max_redirects + 1):
+            response = await self.send(url, data, headers, method, timeout, timings, trace)
+            location = response.headers.get('Location')
+            if response.code in REDIRECT_CODES and location and self.should_redirect(response.code, method):
+                url = urljoin(url, location)
+                if method not in ('GET', 'HEAD'):
+                    method, data = 'GET', None
+                    headers = {
+                        name: val for name, val in headers.items()
+                        if name.lower() not in ('content-type', 'content-length')
+                    }
+                continue
+            if not 200 <= response.code < 300:
+                raise HTTPError(url, response.code, response.msg, response.headers, response)
+            return response
+        raise HTTPError(url, response.code, 'Too many redirects', response.headers, response)
+
+    async def send(self, url, data, headers, method, timeout, timings, trace=None):
+        """
+        Send a single request over a pooled connection, retrying on a
+        fresh connection if a reused one turns out to be dead (and the
+        body can be sent again). As in the blocking pool, cookies are only
+        added to this request's headers.
+        """
+        headers = dict(headers)
+        self.check_loop()
+        parts = urlsplit(url)
+        port = parts.port or DEFAULT_PORTS.get(parts.scheme)
+        key = (parts.scheme, parts.hostname, port)
+        host = parts.netloc.rsplit('@', 1)[-1]
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        cookie_request = self.add_cookies(url, headers)
+        while True:
+            conn, reused = await self.acquire(key, timeout, timings)
+            reusable = False
+            if trace is not None:
+                trace.request(method, url, headers, data)
+            try:
+                with timings.timer('ttfb'):
+                    await conn.request(method, host, path, data, headers)
+                response, reusable = await conn.getresponse(method, timings)
+            except (ConnectionError, asyncio.IncompleteReadError) as err:
+                if reused and is_replayable(data):
+                    continue
+                raise URLError(err)
+            except (OSError, InvalidURL) as err:
+                raise URLError(err)
+            finally:
+                await self.release(key, conn, reusable)
+            if trace is not None:
+                trace.response(response.code, response.msg, response.headers)
+            if self.cookie_jar is not None:
+                self.cookie_jar.extract_cookies(response, cookie_request)
+            return response
+
+    async def acquire(self, key, timeout, timings):
+        """
+        Get a connection to the given host, reusing an idle one if we
+        can, and waiting for one to free up if the host is already at
+        its connection limit.
+        """
+        async with self.condition:
+            self.evict_idle()
+            while True:
+                idle = self.idle.get(key)
+                while idle:
+                    conn, _ = idle.pop()
+                    if conn.is_usable():
+                        self.active[key] = self.active.get(key, 0) + 1
+                        return conn, True
+                    conn.close()
+                if self.active.get(key, 0) < self.max_connections:
+                    self.active[key] = self.active.get(key, 0) + 1
+                    break
+                await self.condition.wait()
+        try:
+            return await self.new_connection(key, timings), False
+        except BaseException:
+            async with self.condition:
+                self.active[key] -= 1
+                self.condition.notify()
+            raise
+
+    async def release(self, key, conn, reusable=True):
+        async with self.condition:
+            self.active[key] = self.active.get(key, 1) - 1
+            if reusable and conn.is_usable():
+                self.idle.setdefault(key, []).append((conn, time.time()))
+            else:
+                conn.close()
+            self.condition.notify()
+
+    async def new_connection(self, key, timings):
+        """
+        Open a new connection to the given host, trying each address it
+        resolves to in turn. The DNS lookup is timed on its own; for HTTPS,
+        the TLS handshake is counted as part of the time spent connecting.
+        """
+        scheme, host, port = key
+        with timings.timer('dns'):
+            addresses = await asyncio.get_event_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        error = OSError('getaddrinfo returned no addresses for {}'.format(host))
+        with timings.timer('connect'):
+            for address in addresses:
+                try:
+                    if scheme == 'https':
+                        reader, writer = await asyncio.open_connection(
+                            address[4][0], port, ssl=self.tls_context(), server_hostname=host
+                        )
+                    else:
+                        reader, writer = await asyncio.open_connection(address[4][0], port)
+                    return AsyncConnection(reader, writer)
+                except OSError as err:
+                    error = err
+        raise error
+
+    def close(self):
+        """
+        Close every idle connection held by the pool.
+        """
+        for idle in self.idle.values():
+            for conn, _ in idle:
+                conn.abort()
+        self.idle = {}
+
+def buffered_urlopen(transport, **kwargs):
+    """
+    Send a request over a blocking transport, and read the whole response,
+    so that nothing is left to block the event loop when it's read.
+    """
+    try:
+        response = transport.urlopen(**kwargs)
+    except HTTPError as err:
+        body = BufferedResponse(err.code, err.msg, err.headers, err.read())
+        raise HTTPError(err.geturl(), err.code, err.msg, err.headers, body)
+    try:
+        return BufferedResponse(response.getcode(), response.msg, response.headers, response.read())
+    finally:
+        response.close()
+
+async def transport_urlopen(request, pool, output, timeout):
+    """
+    Send the request over the asyncio pool, or if the API doesn't use the
+    pooled transport, over its own transport on a worker thread. Requests
+    that have to go through a proxy are sent on a worker thread too, by
+    the blocking pool, which knows how to talk to proxies.
+    """
+    parts = urlsplit(output['url'])
+    if pool is not None and pool.proxy_for(parts.scheme, parts.hostname) is None:
+        return await pool.urlopen(timeout=timeout, timings=request.timings, trace=request.trace, **output)
+    return await asyncio.get_event_loop().run_in_executor(None, partial(
+        buffered_urlopen, request.action.endpoint.transport(), timeout=timeout,
+        timings=request.timings, trace=request.trace, **output
+    ))
+
+async def urlopen(request, pool, output, timeout):
+    """
+    The asyncio counterpart to Request.open(); send the request once the
+    rate limiters allow it, without blocking the loop.
+    """
+    limiters = request.action.plan.rate_limiters
+    taken = []
+    try:
+        for limiter in limiters:
+            await asyncio.sleep(limiter.reserve())
+            while not limiter.take_slot(False):
+                await asyncio.sleep(SLOT_POLL_INTERVAL)
+            taken.append(limiter)
+        try:
+            response = await transport_urlopen(request, pool, output, timeout)
+        except HTTPError as err:
+            observe_all(limiters, err.code, err.headers)
+            raise
+    finally:
+        release_all(taken)
+    observe_all(limiters, response.getcode(), response.headers)
+    return response
+
+async def fetch(request, timeout):
+    """
+    The asyncio counterpart to Request.fetch(); get the raw response for
+    the request, going through the API's response cache if it has one.
+    """
+    pool = request.action.endpoint.async_connection_pool()
+    cache = request.action.endpoint.response_cache()
+    cookie_jar = request.action.endpoint.session().cookie_jar
+    lookup = cache.lookup(request.output, request.action.plan.cache_ttl, cookie_jar) if cache is not None else None
+    if lookup is None:
+        return await urlopen(request, pool, request.output, timeout)
+    if lookup.is_fresh():
+        if request.trace is not None:
+            request.trace.cached(request.output['url'])
+        return lookup.entry.response()
+    try:
+        response = await urlopen(request, pool, lookup.conditional(request.output), timeout)
+    except HTTPError as err:
+        if not lookup.not_modified(err):
+            raise
+        return lookup.entry.response()
+    return lookup.store(response)
+
+async def timed_fetch(request, timeout):
+    policy = request.action.plan.hedge
+    start = time.time()
+    response = await asyncio.wait_for(fetch(request, timeout), timeout)
+    policy.record(start, response)
+    return response
+
+async def dispatch(request, timeout, hedge=False):
+    """
+    The asyncio counterpart to Request.dispatch(); losing copies of a
+    hedged request are cancelled outright.
+    """
+    policy = request.action.plan.hedge
+    if not policy.applies_to(request.output['method']):
+        return await asyncio.wait_for(fetch(request, timeout), timeout)
+    if not hedge or request.has_streamed_body():
+        return await timed_fetch(request, timeout)
+    pending = {asyncio.ensure_future(timed_fetch(request, timeout))}
+    launched = 1
+    failures = []
+    delay = policy.delay()
+    while True:
+        can_hedge = launched <= policy.max_hedges and not failures
+        done, pending = await asyncio.wait(
+            pending, timeout=delay if can_hedge else None,
+            return_when=asyncio.FIRST_COMPLETED
+        )
+        if not done:
+            pending.add(asyncio.ensure_future(timed_fetch(request, timeout)))
+            launched += 1
+            continue
+        for task in done:
+            if task.exception() is None:
+                for loser in pending:
+                    loser.cancel()
+                return task.result()
+            failures.append(task.exception())
+        if not pending:
+            raise failures[0]
+
+async def send(request, **kwargs):
+    """
+    The asyncio counterpart to Request.send(); send the request defined by
+    the data stored in the Request object, retrying according to the
+    _retry policy.
+    """
+    request.trace = Trace.from_setting(kwargs.get('_verbose', False))
+    request.compress_body(kwargs.get('_compress', request.action.plan.compress))
+    retry = kwargs.get('_retry', request.action.plan.retry)
+    timeout = kwargs.get('_timeout', 5)
+    if retry is None:
+        return await attempt(request, timeout, **kwargs)
+    state = retry.start(request.output['method'])
+    while True:
+        try:
+            return await attempt(request, state.timeout(timeout), **kwargs)
+        except (ResponseException, RequestTimeout, URLError) as err:
+            if not is_replayable(request.output['data']):
+                raise
+            delay = state.next_delay(err)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+
+async def attempt(request, timeout, **kwargs):
+    """
+    Make a single attempt at sending the request, and report how it went
+    to the API's metrics hooks.
+    """
+    if request.attempts:
+        request.timings = Timings()
+    request.attempts += 1
+    try:
+        resp = await receive(request, timeout, **kwargs)
+        out = resp if kwargs.get('return_full_object', False) else resp.read()
+    except Exception as err:
+        if request.trace is not None:
+            request.trace.error(err)
+        report(request, err)
+        raise
+    if request.trace is not None:
+        request.trace.finish(resp)
+    report(request, resp)
+    return out
+
+async def receive(request, timeout, **kwargs):
+    """
+    The asyncio counterpart to Request.receive().
+    """
+    traversal = kwargs.get('traversal', None)
+    hedge = kwargs.get('_hedge', False)
+    with request.timings.timer('render'):
+        request.output['url'] = request.render_url()
+    static_format = request.action.plan.format
+    try:
+        raw = await dispatch(request, timeout, hedge)
+        return Response(static_format, raw, traversal, timings=request.timings, json_codec=request.json_codec)
+    except HTTPError as err:
+        raise ResponseException(static_format, err, timings=request.timings)
+    except (asyncio.TimeoutError, socket.timeout, URLError) as err:
+        if not (isinstance(err, asyncio.TimeoutError) or timed_out(err)):
+            raise
+        raise RequestTimeout(partial(send, request, **kwargs))
+
+async def execute(action, *args, **kwargs):
+    """
+    The asyncio counterpart to Action.execute(). _stream is accepted, and
+    returns a Response with the same interface, but asyncio bodies are
+    always read in full before the coroutine returns.
+    """
+    _verbose = kwargs.pop('_verbose', False)
+    _stream = kwargs.pop('_stream', False)
+    _retry = RetryPolicy.from_setting(kwargs.pop('_retry', action.plan.retry))
+    _hedge = kwargs.pop('_hedge', action.plan.hedging)
+    _compress = CompressionPolicy.from_setting(kwargs.pop('_compress', action.plan.compress))
+    return_full_object = kwargs.pop('return_full_object', False) or _stream
+    variables = action.variables().fill(*args, **kwargs)
+    return await send(
+        Request(action, variables),
+        traversal=action.plan.traversal,
+        _verbose=_verbose,
+        _retry=_retry,
+        _hedge=_hedge,
+        _compress=_compress,
+        return_full_object=return_full_object,
+        _timeout=action.plan.timeout
+    )
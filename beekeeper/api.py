@@ -6,26 +6,40 @@ to directly interface between the developer and the remote API.
 from __future__ import absolute_import, division
 from __future__ import unicode_literals, print_function
 
-import copy
+import threading
 from functools import partial
 from keyword import iskeyword
 
 from beekeeper.variables import Variables
 from beekeeper.hive import Hive
 from beekeeper.comms import Request
+from beekeeper.data_handlers import get_json_codec
+from beekeeper.session import Session
+from beekeeper.batch import run_batch
+from beekeeper.plan import CallPlan
+from beekeeper.ratelimit import RateLimiter
+from beekeeper.retry import RetryPolicy
+from beekeeper.compression import CompressionPolicy
+from beekeeper.traversal import TraversalPath
+from beekeeper.urls import URLTemplate
 
 class Endpoint(object):
 
     """
-    Contains the settings for an endpoint, as well as a backref to the API
+    Contains the settings for an endpoint, as well as a backref to the API.
+    The full URL is parsed into a URLTemplate when the Endpoint is built.
     """
 
     def __init__(self, parent, path, **kwargs):
         self.parent = parent
         self.path = path
+        self.template = URLTemplate(self.url())
         self.vars = Variables(**kwargs.get('variables', {}))
         self.methods = kwargs.get('methods', ['GET'])
         self.mimetype = kwargs.get('mimetype', None)
+        self.limiter = None
+        if 'rate_limit' in kwargs:
+            self.limiter = RateLimiter(**kwargs['rate_limit'])
 
     def variables(self):
         """
@@ -39,6 +53,58 @@ class Endpoint(object):
         """
         return self.parent.base_url() + self.path
 
+    def transport(self):
+        """
+        Get the API-level transport to send requests over.
+        """
+        return self.parent.transport()
+
+    def session(self):
+        """
+        Get the API-level Session.
+        """
+        return self.parent.session()
+
+    def connection_pool(self):
+        """
+        Get the API-level pool of connections to send requests over.
+        """
+        return self.parent.connection_pool()
+
+    def async_connection_pool(self):
+        """
+        Get the API-level pool of asyncio connections to send requests over.
+        """
+        return self.parent.async_connection_pool()
+
+    def response_cache(self):
+        """
+        Get the API-level response cache, if there is one.
+        """
+        return self.parent.response_cache()
+
+    def rate_limiters(self):
+        """
+        Get the API-level rate limiters, and add in the Endpoint-level
+        rate limiter.
+        """
+        limiters = self.parent.rate_limiters()
+        if self.limiter is not None:
+            limiters.append(self.limiter)
+        return limiters
+
+    def metrics_hooks(self):
+        """
+        Get the API-level list of metrics hooks.
+        """
+        return self.parent.metrics_hooks()
+
+    def json_codec(self):
+        """
+        Get the API-level JSON codec.
+        """
+        return self.parent.json_codec()
+
     def new_action(self, method='GET', **kwargs):
         """
         Create a new Action linked to this endpoint with the given args.
@@ -61,18 +127,32 @@ class APIObject(object):
 
     """
     Holds Action objects in the appropriate namespace, and provides a __getitem__
-    dundermethod so that we can subscript by object ID when such exists
+    dundermethod so that we can subscript by object ID when such exists.
+    Each Action is only built the first time it's used.
     """
 
     def __init__(self, parent, actions, **kwargs):
+        self._parent = parent
+        self._name = kwargs.get('_name', None)
         self._description = kwargs.get('description', None)
         self._id_variable = kwargs.get('id_variable', None)
         if iskeyword(self._id_variable):
             self._id_variable = '_' + self._id_variable
+        self._action_specs = {}
         self._actions = {}
+        self._lock = threading.Lock()
         for name, action in actions.items():
             self.add_action(name, parent, action)
 
+    def __getattr__(self, name):
+        """
+        Build the named Action the first time it's asked for; after that,
+        its execute method is found as a normal attribute.
+        """
+        if name in self.__dict__.get('_action_specs', {}):
+            return self.get_action(name).execute
+        raise AttributeError(name)
+
     def __getitem__(self, key):
         """
         Allows us to subscript, dictionary-style, on the object if we
@@ -82,20 +162,57 @@ class APIObject(object):
             return APIObjectInstance(self, key)
         raise TypeError('Object cannot be addressed by ID')
 
+    @property
+    def aio(self):
+        """
+        The asyncio mirror of the APIObject.
+        """
+        return AsyncAPIObject(self)
+
+    def map_ids(self, ids, action, concurrency=8, ordered=True, **kwargs):
+        """
+        Run the named action once for each of the given IDs, across a
+        bounded pool of worker threads, with any keyword arguments passed
+        along to every call. Yields a BatchResult for each ID.
+
+        >>> for result in ExampleAPI.Objects.map_ids([1, 2, 3], 'get'):
+        ...     print(result.kwargs['object_id'], result.get())
+        """
+        if not self._id_variable:
+            raise TypeError('Object cannot be addressed by ID')
+        calls = (dict(kwargs, **{self._id_variable: each}) for each in ids)
+        return self.get_action(action).map(calls, concurrency=concurrency, ordered=ordered)
+
+    def iterate(self, action, *args, **kwargs):
+        """
+        Yield every item from every page of results for the named action,
+        following the pagination rules defined for it in the hive.
+
+        >>> for contact in hubspot.Contacts.iterate('list', _prefetch=True):
+        ...     print(contact['vid'])
+        """
+        return self.get_action(action).iterate(*args, **kwargs)
+
     def defined_actions(self):
         """
         Get a list of the available Actions on the APIObject.
         """
-        return [name for name in self._actions]
+        return [name for name in self._action_specs]
 
     def add_action(self, name, parent, action):
         """
-        Add a single Action to the APIObject.
+        Add a single Action to the APIObject; it's built from the given
+        settings when it's first used. Its name can't be one the APIObject
+        already uses for something else, since one would hide the other.
         """
         if iskeyword(name):
             name = '_' + name
-        self._actions[name] = parent.new_action(**action)
-        setattr(self, name, self._actions[name].execute)
+        if name not in self._action_specs and name in vars(APIObject):
+            raise TypeError('Action name {!r} clashes with an APIObject attribute'.format(name))
+        self._parent = parent
+        self._action_specs[name] = action
+        self._actions.pop(name, None)
+        self.__dict__.pop(name, None)
 
     def printed_out(self, name):
         """
@@ -110,8 +227,8 @@ class APIObject(object):
         out += '|---{}{}\n'.format(name, subs)
         if self._description:
             out += '|   |   {}\n'.format(self._description)
-        for name, action in self._actions.items():
-            out += action.printed_out(name)
+        for name in self.defined_actions():
+            out += self.get_action(name).printed_out(name)
         return out
 
     def id_variable(self):
@@ -120,6 +237,42 @@ class APIObject(object):
         """
         return self._id_variable
 
+    def get_action(self, name):
+        """
+        Get the Action object with the given name, building it if this
+        is the first time it's been asked for.
+        """
+        if name not in self._actions:
+            if name not in self._action_specs:
+                raise AttributeError(name)
+            with self._lock:
+                if name not in self._actions:
+                    action = self._parent.new_action(**self._action_specs[name])
+                    if self._name is not None:
+                        action.name = '{}.{}'.format(self._name, name)
+                    self._actions[name] = action
+                    setattr(self, name, action.execute)
+        return self._actions[name]
+
+class AsyncAPIObject(object):
+    """
+    Mirrors an APIObject, but its actions return coroutines rather than
+    blocking; available on every APIObject as its "aio" attribute:
+
+    >>> await ExampleAPI.Objects.aio.update(object_id=123, varname=value)
+
+    >>> await ExampleAPI.Objects.aio[123].update(varname=value)
+    """
+
+    def __init__(self, api_object):
+        self._api_object = api_object
+
+    def __getitem__(self, key):
+        return self._api_object[key].aio
+
+    def __getattr__(self, name):
+        return self._api_object.get_action(name).aexecute
+
 class APIObjectInstance(object):
     """
     Ephemeral class that gets created/destroyed when the developer subscripts
@@ -146,6 +299,7 @@ class APIObjectInstance(object):
         self._id_key = id_key
         self._actions = api_object.defined_actions
         self._id_variable = api_object.id_variable()
+        self.aio = AsyncAPIObjectInstance(api_object, id_key)
 
     def __getattr__(self, name):
         """
@@ -156,6 +310,25 @@ class APIObjectInstance(object):
         action = getattr(self._api_object, name)
         return partial(action, **{self._id_variable: self._id_key})
 
+class AsyncAPIObjectInstance(APIObjectInstance):
+    """
+    The asyncio counterpart to APIObjectInstance; the two statements below
+    are equivalent:
+
+    >>> await ExampleAPI.Objects.aio[123].update(varname=value)
+
+    >>> await ExampleAPI.Objects[123].aio.update(varname=value)
+    """
+
+    def __init__(self, api_object, id_key):
+        self._api_object = api_object
+        self._id_key = id_key
+        self._id_variable = api_object.id_variable()
+
+    def __getattr__(self, name):
+        action = self._api_object.get_action(name).aexecute
+        return partial(action, **{self._id_variable: self._id_key})
+
 class Action(object):
 
     """
@@ -164,6 +337,7 @@ class Action(object):
 
     def __init__(self, endpoint, method, **kwargs):
         self.endpoint = endpoint
+        self.name = None
         self.method = method
         self.vars = Variables(**kwargs.get('variables', {}))
         self.mimetype = kwargs.get('mimetype', None)
@@ -171,30 +345,80 @@ class Action(object):
         self.description = kwargs.get('description', None)
         self.traversal = kwargs.get('traverse', None)
         self.timeout = kwargs.get('timeout', 5)
+        self.cache_ttl = kwargs.get('cache', {}).get('ttl', None)
+        self.pagination = kwargs.get('pagination', None)
+        self.retry = kwargs.get('retry', None)
+        self.hedge = kwargs.get('hedge', None)
+        self.compress = kwargs.get('compress', None)
+        self.plan = CallPlan(self)
 
     def variables(self):
         """
-        Grab all the variables from the Endpoint and higher, and
-        add the ones that exist on the Action level.
+        Get a fresh copy of the variables from the Endpoint and higher,
+        merged with the ones that exist on the Action level. The merging
+        is done once, when the Action's CallPlan is compiled.
         """
-        return self.endpoint.variables().add(**self.vars)
+        return self.plan.variables()
 
     def execute(self, *args, **kwargs):
         """
         Fill all variables from *args and **kwargs, build the request,
-        and send it. If we set the _verbose kwarg to true, then we'll
-        get a Response object back instead of loaded data.
+        and send it. If we set the return_full_object kwarg to true, then
+        we'll get a Response object back instead of loaded data; setting
+        _stream does the same, but leaves the body unread until asked for.
+        The _retry kwarg overrides the Action's retry policy for this call,
+        _hedge turns hedged requests on or off, and _compress overrides
+        how the request body is compressed.
         """
         _verbose = kwargs.pop('_verbose', False)
+        _stream = kwargs.pop('_stream', False)
+        _retry = RetryPolicy.from_setting(kwargs.pop('_retry', self.plan.retry))
+        _hedge = kwargs.pop('_hedge', self.plan.hedging)
+        _compress = CompressionPolicy.from_setting(kwargs.pop('_compress', self.plan.compress))
         return_full_object = kwargs.pop('return_full_object', False)
         variables = self.variables().fill(*args, **kwargs)
         return Request(self, variables).send(
-            traversal=self.traversal,
+            traversal=self.plan.traversal,
             _verbose=_verbose,
+            _stream=_stream,
+            _retry=_retry,
+            _hedge=_hedge,
+            _compress=_compress,
             return_full_object=return_full_object,
-            _timeout=self.timeout
+            _timeout=self.plan.timeout
         )
 
+    def iterate(self, *args, **kwargs):
+        """
+        Takes the same arguments as .execute(), and yields each item from
+        every page of results, following the pagination rules defined for
+        the Action in the hive. Pages are only fetched as they're needed;
+        if we set the _prefetch kwarg to true, the next page is fetched in
+        the background while the current one is being consumed.
+        """
+        if self.plan.paginator is None:
+            raise TypeError('Action does not define pagination')
+        return self.plan.paginator.iterate(self, *args, **kwargs)
+
+    def map(self, calls, concurrency=8, ordered=True):
+        """
+        Execute the action once for each dictionary of keyword arguments
+        in calls, using up to "concurrency" threads at once, and yield a
+        BatchResult for each call; a call that raises an exception won't
+        stop the rest of the batch. Results come back in the order the
+        calls were given, unless ordered is False, in which case they
+        come back as soon as they're done.
+        """
+        return run_batch(self.execute, calls, concurrency=concurrency, ordered=ordered)
+
+    def aexecute(self, *args, **kwargs):
+        """
+        The asyncio counterpart to .execute(); takes the same arguments,
+        and returns a coroutine that sends the request without blocking.
+        """
+        from beekeeper.aio import execute
+        return execute(self, *args, **kwargs)
+
     def format(self):
         """
         Get the local directional MIME type; if it doesn't exist, defer
@@ -221,54 +445,92 @@ class Action(object):
 class API(object):
 
     """
-    Holds global-level settings and provides initialization methods
+    Holds global-level settings and provides initialization methods. The
+    APIObjects, Endpoints and Actions described by the hive are only built
+    when they're first used, so that setting up an API with a large hive
+    stays cheap; their settings are still checked up front, so that a
+    broken hive fails when it's loaded rather than on the first call.
     """
 
     def __init__(self, hive, *args, **kwargs):
+        session_options = {
+            'transport': kwargs.pop('_transport', None),
+            'headers': kwargs.pop('_headers', None),
+            'max_connections': kwargs.pop('_max_connections', 10),
+            'idle_timeout': kwargs.pop('_idle_timeout', 60)
+        }
+        self._session = kwargs.pop('_session', None) or Session(**session_options)
+        self._cache = kwargs.pop('_cache', None)
+        metrics = kwargs.pop('_metrics', [])
+        self._metrics_hooks = list(metrics) if isinstance(metrics, (list, tuple)) else [metrics]
+        self._json_codec = get_json_codec(kwargs.pop('_json', None))
+        self._limiter = None
+        if 'rate_limit' in hive:
+            self._limiter = RateLimiter(**hive['rate_limit'])
         self._root = hive.get('root')
         self._mimetype = hive.get('mimetype', 'application/json')
         self._vars = Variables(
             variable_settings=hive.get('variable_settings', {}),
             **hive.get('variables', {})
             ).fill(*args, **kwargs)
-        self._endpoints = {}
         self._description = hive.get('description', None)
         self._name = hive.get('name', None)
+        self._lock = threading.RLock()
+        self._endpoint_specs = dict(hive['endpoints'])
+        self._endpoints = {}
+        for spec in self._endpoint_specs.values():
+            URLTemplate((self._root or '') + spec['path'])
+        self._object_specs = {}
         self._objects = {}
-        for name, endpoint in hive['endpoints'].items():
-            self.add_endpoint(name, **endpoint)
         for name, obj in hive['objects'].items():
             self.add_object(name, obj)
 
+    def __getattr__(self, name):
+        """
+        Build the named APIObject the first time it's asked for; after
+        that, it's found as a normal attribute.
+        """
+        if name in self.__dict__.get('_object_specs', {}):
+            return self.get_object(name)
+        raise AttributeError(name)
+
     @classmethod
     def from_hive_file(cls, fname, *args, **kwargs):
         """
         Open a local JSON hive file and initialize from the hive contained
         in that file, paying attention to the version keyword argument.
+        The hive_cache keyword argument names a directory to keep a
+        compiled copy of the hive in, to skip parsing it next time.
         """
         version = kwargs.pop('version', None)
         require = kwargs.pop('require_https', True)
-        return cls(Hive.from_file(fname, version, require), *args, **kwargs)
+        cache = kwargs.pop('hive_cache', None)
+        return cls(Hive.from_file(fname, version, require, cache), *args, **kwargs)
 
     @classmethod
     def from_remote_hive(cls, url, *args, **kwargs):
         """
         Download a JSON hive file from a URL, and initialize from it,
-        paying attention to the version keyword argument.
+        paying attention to the version keyword argument. The hive_cache
+        keyword argument gives a directory or ResponseCache to keep the
+        hive in, so that it doesn't have to be downloaded every time.
         """
         version = kwargs.pop('version', None)
         require = kwargs.pop('require_https', False)
-        return cls(Hive.from_url(url, version, require), *args, **kwargs)
+        cache = kwargs.pop('hive_cache', None)
+        return cls(Hive.from_url(url, version, require, cache), *args, **kwargs)
 
     @classmethod
     def from_domain(cls, domain, *args, **kwargs):
         """
         Try to download the hive file from the domain using the defined
-        beekeeper spec of domain/api/hive.json.
+        beekeeper spec of domain/api/hive.json, keeping it in the
+        hive_cache, if there is one.
         """
         version = kwargs.pop('version', None)
         require = kwargs.pop('require_https', False)
-        return cls(Hive.from_domain(domain, version, require), *args, **kwargs)
+        cache = kwargs.pop('hive_cache', None)
+        return cls(Hive.from_domain(domain, version, require, cache), *args, **kwargs)
 
     def __repr__(self):
         out = ''
@@ -277,15 +539,16 @@ class API(object):
         out += '{}({}{})\n'.format(self._name, req_var, opt_var)
         if self._description:
             out += '|   {}\n'.format(self._description)
-        for name, obj in self._objects.items():
-            out += obj.printed_out(name)
+        for name in self._object_specs:
+            out += self.get_object(name).printed_out(name)
         return out
 
     def variables(self):
         """
-        Return a copy of the API-level variables.
+        Return a copy of the API-level variables. Callable values are
+        left as they are, and executed when a request is made.
         """
-        return copy.deepcopy(self._vars)
+        return self._vars.copy()
 
     def add_endpoint(self, name, **kwargs):
         """
@@ -293,22 +556,73 @@ class API(object):
         """
         self._endpoints[name] = Endpoint(self, **kwargs)
 
+    def get_endpoint(self, name):
+        """
+        Get the Endpoint with the given name, building it from the hive
+        if this is the first time it's been asked for.
+        """
+        if name not in self._endpoints:
+            with self._lock:
+                if name not in self._endpoints:
+                    self.add_endpoint(name, **self._endpoint_specs[name])
+        return self._endpoints[name]
+
     def add_object(self, name, obj):
         """
-        Initialize an APIObject with the given name and make it available
-        using dot notation from the top-level namespace.
+        Add an APIObject with the given name, to be initialized when it's
+        first used, and make it available using dot notation from the
+        top-level namespace.
         """
         if iskeyword(name):
             name = '_' + name
-        setattr(self, name, APIObject(self, **obj))
-        self._objects[name] = getattr(self, name)
+        if name not in self._object_specs and name in vars(API):
+            raise TypeError('Object name {!r} clashes with an API attribute'.format(name))
+        for action_name, action in obj.get('actions', {}).items():
+            self.check_action(name, action_name, **action)
+        self._object_specs[name] = obj
+        self._objects.pop(name, None)
+        self.__dict__.pop(name, None)
+
+    def check_action(self, object_name, action_name, endpoint, method='GET', **kwargs):
+        """
+        Check an Action's settings without building it: its name can't
+        clash with an APIObject attribute, its Endpoint has to exist and
+        allow its method, and its traversal path has to be valid. Anything
+        wrong raises a TypeError.
+        """
+        if iskeyword(action_name):
+            action_name = '_' + action_name
+        if action_name in vars(APIObject):
+            raise TypeError('Action name {!r} clashes with an APIObject attribute'.format(action_name))
+        spec = self._endpoint_specs.get(endpoint)
+        if spec is None:
+            raise TypeError('Action {}.{} uses an unknown endpoint {!r}'.format(object_name, action_name, endpoint))
+        methods = spec.get('methods', ['GET'])
+        if method not in methods:
+            raise TypeError('{} not in valid method(s): {}.'.format(method, methods))
+        TraversalPath.from_setting(kwargs.get('traverse', None))
+
+    def get_object(self, name):
+        """
+        Get the APIObject with the given name, building it if this is the
+        first time it's been asked for.
+        """
+        if name not in self._objects:
+            if name not in self._object_specs:
+                raise AttributeError(name)
+            with self._lock:
+                if name not in self._objects:
+                    api_object = APIObject(self, _name=name, **self._object_specs[name])
+                    self._objects[name] = api_object
+                    setattr(self, name, api_object)
+        return self._objects[name]
 
     def new_action(self, endpoint, **kwargs):
         """
         Initialize a new Action linked to the named Endpoint that's
         a member of the API.
         """
-        return self._endpoints[endpoint].new_action(**kwargs)
+        return self.get_endpoint(endpoint).new_action(**kwargs)
 
     def format(self):
         """
@@ -321,3 +635,80 @@ class API(object):
         Provides the API base URL.
         """
         return self._root
+
+    def session(self):
+        """
+        Provides the Session holding the API's cookies, connections and
+        default headers.
+        """
+        return self._session
+
+    def transport(self):
+        """
+        Provides the transport shared by every Action on the API, chosen
+        with the _transport keyword argument.
+        """
+        return self._session.transport
+
+    def connection_pool(self):
+        """
+        Provides the pool of keep-alive connections shared by every
+        Action on the API, or None if the API uses another transport.
+        """
+        return self._session.connection_pool()
+
+    def async_connection_pool(self):
+        """
+        Provides the pool of asyncio connections shared by every Action
+        on the API within the current event loop; it's only created the
+        first time that loop needs it. If the API doesn't use the pooled
+        transport, this is None, and asyncio calls go through the API's
+        transport on a worker thread instead.
+        """
+        return self._session.async_connection_pool()
+
+    def close(self):
+        """
+        Close the API's session, and with it, every open connection.
+        """
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def response_cache(self):
+        """
+        Provides the response cache passed in with the _cache keyword
+        argument, or None if caching is off.
+        """
+        return self._cache
+
+    def rate_limiters(self):
+        """
+        Provides a list of the API-level rate limiters; there's at most
+        one, defined by the rate_limit key in the hive.
+        """
+        return [self._limiter] if self._limiter is not None else []
+
+    def metrics_hooks(self):
+        """
+        Provides the list of metrics hooks, which are called with a
+        RequestMetrics object after every request.
+        """
+        return self._metrics_hooks
+
+    def add_metrics_hook(self, hook):
+        """
+        Add a callable to be told about every request made through the API.
+        """
+        self._metrics_hooks.append(hook)
+
+    def json_codec(self):
+        """
+        Provides the JSONCodec used to encode and decode JSON bodies,
+        chosen with the _json keyword argument.
+        """
+        return self._json_codec
@@ -0,0 +1,103 @@
+"""
+Provides a bounded pool of worker threads for running one call over many
+sets of arguments at once, as used by Action.map() and APIObject.map_ids().
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+import threading
+
+class BatchResult(object):
+
+    """
+    The outcome of a single call in a batch. Rather than aborting the
+    whole batch, an exception raised by the call is stored on the result
+    so that the developer can decide what to do with it.
+    """
+
+    def __init__(self, index, kwargs, result=None, error=None):
+        self.index = index
+        self.kwargs = kwargs
+        self.result = result
+        self.error = error
+
+    def __repr__(self):
+        if self.failed():
+            return 'BatchResult({}, error={!r})'.format(self.index, self.error)
+        return 'BatchResult({}, result={!r})'.format(self.index, self.result)
+
+    def failed(self):
+        """
+        Did the call raise an exception?
+        """
+        return self.error is not None
+
+    def get(self):
+        """
+        Return the result of the call, or raise the exception it raised.
+        """
+        if self.failed():
+            raise self.error
+        return self.result
+
+def run_batch(func, calls, concurrency=8, ordered=True):
+    """
+    Call func(**kwargs) for each kwargs dict in calls, using up to
+    "concurrency" worker threads, and yield a BatchResult for each. If
+    ordered is true, results come out in the same order as the calls
+    went in; otherwise, they come out as soon as they complete. Calls
+    are pulled from the iterable lazily, so it can be a generator of
+    any length.
+    """
+    tasks = queue.Queue()
+    results = queue.Queue()
+
+    def worker():
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            index, kwargs = task
+            try:
+                results.put(BatchResult(index, kwargs, result=func(**kwargs)))
+            except Exception as err:
+                results.put(BatchResult(index, kwargs, error=err))
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    calls = enumerate(calls)
+    exhausted = False
+    pending = 0
+    finished = {}
+    next_index = 0
+    try:
+        while True:
+            while not exhausted and pending + len(finished) < concurrency * 2:
+                try:
+                    tasks.put(next(calls))
+                    pending += 1
+                except StopIteration:
+                    exhausted = True
+            if not pending:
+                break
+            result = results.get()
+            pending -= 1
+            if not ordered:
+                yield result
+                continue
+            finished[result.index] = result
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
+    finally:
+        for _ in threads:
+            tasks.put(None)
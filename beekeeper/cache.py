@@ -0,0 +1,354 @@
+"""
+Provides an opt-in cache for responses to GET and HEAD requests. Entries
+are keyed on the method, the rendered URL and the request headers that can
+change what the server sends back, including the cookies that the session
+will send along with the request. Responses marked private, and those that
+vary on headers that aren't part of the key, aren't stored. Once an entry's time-to-live runs out,
+it's revalidated with the server using its ETag and/or Last-Modified
+headers, rather than being downloaded again from scratch.
+
+Storage is pluggable; MemoryCache and DiskCache are built in, and anything
+implementing load/store/touch/discard can be used instead.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+try:
+    from urllib2 import Request as CookieRequest
+except ImportError:
+    from urllib.request import Request as CookieRequest
+
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from email.message import Message
+
+CACHEABLE_METHODS = ('GET', 'HEAD')
+KEY_HEADERS = ('accept', 'accept-encoding', 'accept-language', 'authorization', 'cookie')
+
+class CacheEntry(object):
+
+    """
+    A stored response. Headers are kept as a plain list of pairs so that
+    the entry can be pickled by any backend.
+    """
+
+    def __init__(self, code, message, headers, data, ttl):
+        self.code = code
+        self.message = message
+        self.headers = list(headers)
+        self.data = data
+        self.refresh(ttl)
+
+    def refresh(self, ttl):
+        self.expires = time.time() + ttl
+
+    def is_fresh(self):
+        return time.time() < self.expires
+
+    def header(self, name):
+        for key, val in self.headers:
+            if key.lower() == name.lower():
+                return val
+        return None
+
+    def validators(self):
+        """
+        Build the conditional headers used to revalidate the entry.
+        """
+        out = {}
+        if self.header('ETag'):
+            out['If-None-Match'] = self.header('ETag')
+        if self.header('Last-Modified'):
+            out['If-Modified-Since'] = self.header('Last-Modified')
+        return out
+
+    def update_headers(self, headers):
+        """
+        Take on any headers sent with a 304 Not Modified response.
+        """
+        new = {key.lower(): (key, val) for key, val in headers.items()}
+        self.headers = [
+            new.pop(key.lower(), (key, val)) for key, val in self.headers
+        ] + list(new.values())
+
+    def response(self):
+        return CachedResponse(self)
+
+class CachedResponse(object):
+
+    """
+    Looks like the response objects that urllib hands back, so that a
+    cached entry can be turned into a Response like any other.
+    """
+
+    def __init__(self, entry):
+        self.code = entry.code
+        self.msg = entry.message
+        self.headers = Message()
+        for name, val in entry.headers:
+            self.headers[name] = val
+        self.body = io.BytesIO(entry.data)
+
+    def getcode(self):
+        return self.code
+
+    def info(self):
+        return self.headers
+
+    def read(self, amt=None):
+        return self.body.read(amt)
+
+    def close(self):
+        pass
+
+class CacheLookup(object):
+
+    """
+    Tracks a single request's trip through the cache: finding an entry,
+    revalidating it if it's gone stale, and storing the response if the
+    server sends back a new one.
+    """
+
+    def __init__(self, cache, key, entry, ttl):
+        self.cache = cache
+        self.key = key
+        self.entry = entry
+        self.ttl = ttl
+
+    def is_fresh(self):
+        return self.entry is not None and self.entry.is_fresh()
+
+    def conditional(self, output):
+        """
+        Add any revalidation headers to a copy of the request output.
+        """
+        if self.entry is None:
+            return output
+        headers = dict(output['headers'])
+        headers.update(self.entry.validators())
+        return dict(output, headers=headers)
+
+    def not_modified(self, err):
+        """
+        Handle an HTTPError from a revalidation; if it's a 304, the entry
+        is refreshed and we return True. Otherwise, we return False so
+        that the error can be raised as normal.
+        """
+        if self.entry is None or err.code != 304:
+            return False
+        err.read()
+        self.entry.update_headers(err.headers)
+        self.entry.refresh(self.ttl)
+        self.cache.store(self.key, self.entry)
+        return True
+
+    def store(self, response):
+        """
+        Store a fresh response, if it can be stored, and hand back an
+        equivalent response to be read in its place.
+        """
+        if not self.cache.should_store(response.getcode(), response.headers):
+            return response
+        self.entry = CacheEntry(response.getcode(), response.msg, response.headers.items(), response.read(), self.ttl)
+        self.cache.store(self.key, self.entry)
+        return self.entry.response()
+
+class ResponseCache(object):
+
+    """
+    The caching policy; subclasses provide the storage. The default_ttl
+    is used for Actions that don't set their own TTL in the hive; if it's
+    None, those Actions aren't cached at all.
+    """
+
+    def __init__(self, default_ttl=None):
+        self.default_ttl = default_ttl
+
+    def ttl(self, action_ttl):
+        return self.default_ttl if action_ttl is None else action_ttl
+
+    @staticmethod
+    def key(method, url, headers):
+        """
+        Hash the parts of a request that determine its response, so
+        that keys are a fixed size and don't hold credentials in the
+        clear.
+        """
+        parts = [method, url]
+        for name, val in sorted(headers.items()):
+            if name.lower() in KEY_HEADERS:
+                parts.append('{}: {}'.format(name.lower(), val))
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        entry = self.load(key)
+        if entry is not None:
+            self.touch(key)
+        return entry
+
+    def lookup(self, output, action_ttl, cookie_jar=None):
+        """
+        Start a CacheLookup for the given request output, or return None
+        if the request isn't cacheable. The transport only adds cookies
+        from its cookie jar as the request is sent, so the jar is passed
+        in to key the entry on the cookies that will go with it; otherwise,
+        one session could be handed a response meant for another.
+        """
+        ttl = self.ttl(action_ttl)
+        if ttl is None or output['method'] not in CACHEABLE_METHODS:
+            return None
+        headers = with_cookies(output['url'], output['headers'], cookie_jar)
+        key = self.key(output['method'], output['url'], headers)
+        return CacheLookup(self, key, self.get(key), ttl)
+
+    @staticmethod
+    def should_store(code, headers):
+        """
+        Only store successful responses that aren't marked no-store or
+        private, and that don't vary on anything outside the key.
+        """
+        if code != 200:
+            return False
+        directives = set(
+            directive.split('=')[0].strip().lower()
+            for directive in headers.get('Cache-Control', '').split(',')
+        )
+        if directives & set(['no-store', 'private']):
+            return False
+        varies = set(name.strip().lower() for name in headers.get('Vary', '').split(','))
+        return varies.issubset(KEY_HEADERS + ('',))
+
+    def load(self, key):
+        raise NotImplementedError
+
+    def store(self, key, entry):
+        raise NotImplementedError
+
+    def touch(self, key):
+        pass
+
+    def discard(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+class MemoryCache(ResponseCache):
+
+    """
+    Keeps up to max_entries responses in memory, evicting the least
+    recently used entry when it's full.
+    """
+
+    def __init__(self, max_entries=1000, default_ttl=None):
+        ResponseCache.__init__(self, default_ttl)
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def load(self, key):
+        with self.lock:
+            return self.entries.get(key)
+
+    def touch(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries[key] = self.entries.pop(key)
+
+    def store(self, key, entry):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+class DiskCache(ResponseCache):
+
+    """
+    Keeps up to max_entries responses as pickled files in a directory,
+    evicting the least recently used entries (by file modification time)
+    when it's full.
+    """
+
+    def __init__(self, directory, max_entries=1000, default_ttl=None):
+        ResponseCache.__init__(self, default_ttl)
+        self.directory = directory
+        self.max_entries = max_entries
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.cache')
+
+    def load(self, key):
+        try:
+            with open(self.path(key), 'rb') as cache_file:
+                return pickle.load(cache_file)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def touch(self, key):
+        try:
+            os.utime(self.path(key), None)
+        except OSError:
+            pass
+
+    def store(self, key, entry):
+        handle, temp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(handle, 'wb') as cache_file:
+            pickle.dump(entry, cache_file, pickle.HIGHEST_PROTOCOL)
+        getattr(os, 'replace', os.rename)(temp_path, self.path(key))
+        self.evict()
+
+    def evict(self):
+        paths = [
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if name.endswith('.cache')
+        ]
+        if len(paths) > self.max_entries:
+            paths.sort(key=os.path.getmtime)
+            for path in paths[:len(paths) - self.max_entries]:
+                remove(path)
+
+    def discard(self, key):
+        remove(self.path(key))
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.cache'):
+                remove(os.path.join(self.directory, name))
+
+def with_cookies(url, headers, cookie_jar):
+    """
+    Add the Cookie header that the cookie jar would send with a request
+    to the URL, unless one was explicitly set.
+    """
+    if cookie_jar is None or any(name.lower() == 'cookie' for name in headers):
+        return headers
+    cookie_request = CookieRequest(url)
+    cookie_jar.add_cookie_header(cookie_request)
+    cookie = cookie_request.unredirected_hdrs.get('Cookie')
+    if not cookie:
+        return headers
+    return dict(headers, Cookie=cookie)
+
+def remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
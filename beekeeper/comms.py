@@ -6,53 +6,75 @@ from __future__ import absolute_import, division
 from __future__ import unicode_literals, print_function
 
 try:
-    from urllib2 import Request as Py2Request, HTTPError, URLError
-    from urllib2 import build_opener, HTTPCookieProcessor
-    from urllib import urlencode
-    import httplib
+    from urllib2 import HTTPError, URLError
     import cookielib
-    pyversion = 2
 
 except ImportError:
-    from urllib.request import Request as PythonRequest, build_opener
-    from urllib.request import HTTPCookieProcessor
     from urllib.error import HTTPError, URLError
-    from urllib.parse import urlencode
-    import http.client as httplib
     import http.cookiejar as cookielib
-    pyversion = 3
 
 import socket
 import functools
+import time
 
 from beekeeper.variable_handlers import render
 from beekeeper.data_handlers import decode
-from beekeeper.exceptions import TraversalError, TooMuchBodyData, RequestTimeout
-
-if pyversion == 2:
-    class PythonRequest(Py2Request):
-
-        def __init__(self, *args, **kwargs):
-            self._method = kwargs.pop('method', None)
-            Py2Request.__init__(self, *args, **kwargs)
-
-        def get_method(self):
-            return self._method if self._method else super(PythonRequest, self).get_method()
-elif pyversion == 3:
-    basestring = str
-
+from beekeeper.incremental import iter_json, iter_items
+from beekeeper.traversal import traverse, TraversalPath
+from beekeeper.ratelimit import acquire_all, release_all, observe_all
+from beekeeper.metrics import Timings, report
+from beekeeper.trace import Trace
+from beekeeper.transports import UrllibTransport, PythonRequest
+from beekeeper.compression import accept_encoding, decompressing
+from beekeeper.multipart import is_replayable
+from beekeeper.urls import encode_params
+from beekeeper.exceptions import TooMuchBodyData, RequestTimeout
 
 COOKIE_JAR = cookielib.CookieJar()
-REQUEST_OPENER = build_opener(HTTPCookieProcessor(COOKIE_JAR))
+REQUEST_OPENER = UrllibTransport(COOKIE_JAR).opener
 
-def download_as_json(url):
+def download_as_json(url, cache=None, ttl=None):
     """
-    Download the data at the URL and load it as JSON
+    Download the data at the URL and load it as JSON. If a ResponseCache
+    is given, a fresh copy of the data is taken from it, and a stale copy
+    is revalidated with the server rather than downloaded again; if the
+    server can't be reached at all, a stale copy is used anyway.
     """
+    output = download_output(url)
+    lookup = cache.lookup(output, ttl, COOKIE_JAR) if cache is not None else None
+    if lookup is None:
+        try:
+            return Response('application/json', request(url=url, headers=output['headers'])).read()
+        except HTTPError as err:
+            raise ResponseException('application/json', err)
+    if lookup.is_fresh():
+        return Response('application/json', lookup.entry.response()).read()
     try:
-        return Response('application/json', request(url=url)).read()
+        response = lookup.store(request(url=url, headers=lookup.conditional(output)['headers']))
     except HTTPError as err:
-        raise ResponseException('application/json', err)
+        if not lookup.not_modified(err):
+            raise ResponseException('application/json', err)
+        response = lookup.entry.response()
+    except (URLError, socket.error):
+        if lookup.entry is None:
+            raise
+        response = lookup.entry.response()
+    return Response('application/json', response).read()
+
+def timed_out(err):
+    """
+    Check whether an error raised while sending a request was a timeout,
+    either on its own or wrapped in a URLError.
+    """
+    if isinstance(err, URLError):
+        err = err.reason
+    return isinstance(err, socket.timeout)
+
+def download_output(url):
+    """
+    Build the request output that download_as_json() sends for the URL.
+    """
+    return {'method': 'GET', 'url': url, 'headers': {'Accept-Encoding': accept_encoding()}}
 
 def request(*args, **kwargs):
     """
@@ -72,47 +94,182 @@ class Request(object):
 
     def __init__(self, action, variables):
         self.action = action
-        self.url = self.action.endpoint.url()
+        self.url = self.action.plan.url
         self.replacements = {}
         self.params = {}
+        self.fixed_url = None
         self.output = {
             'data': None,
-            'headers': {},
-            'method': self.action.method
+            'headers': dict(self.action.endpoint.session().headers),
+            'method': self.action.plan.method
         }
-        for var_type in variables.types():
-            render(self, var_type, **variables.vals(var_type))
+        self.timings = Timings()
+        self.trace = None
+        self.attempts = 0
+        self.json_codec = self.action.endpoint.json_codec()
+        with self.timings.timer('render'):
+            for var_type in variables.types():
+                render(self, var_type, **variables.vals(var_type))
+        if not any(name.lower() == 'accept-encoding' for name in self.output['headers']):
+            self.output['headers']['Accept-Encoding'] = accept_encoding()
 
     def send(self, **kwargs):
         """
-        Send the request defined by the data stored in the object.
+        Send the request defined by the data stored in the object. If
+        _stream is set, the body isn't read up front, and the Response
+        object is returned so that it can be read piece by piece. Failed
+        attempts are retried according to the _retry policy, which
+        defaults to the Action's, unless the body is streamed from a file
+        that can't be rewound, in which case the error is raised. The body
+        is compressed according to the _compress policy, which also
+        defaults to the Action's. If _verbose
+        is set, the request is traced; see beekeeper.trace.Trace.from_setting().
         """
-        return_full_object = kwargs.get('return_full_object', False)
-        _verbose = kwargs.get('_verbose', False)
-        traversal = kwargs.get('traversal', None)
+        self.trace = Trace.from_setting(kwargs.get('_verbose', False))
+        self.compress_body(kwargs.get('_compress', self.action.plan.compress))
+        retry = kwargs.get('_retry', self.action.plan.retry)
         timeout = kwargs.get('_timeout', 5)
-        self.output['url'] = self.render_url()
-        with VerboseContextManager(verbose=_verbose):
+        if retry is None:
+            return self.attempt(timeout, **kwargs)
+        state = retry.start(self.output['method'])
+        while True:
             try:
-                resp = Response(self.action.format(), request(timeout=timeout, **self.output), traversal)
-            except HTTPError as err:
-                raise ResponseException(self.action.format(), err)
-            except socket.timeout:
-                raise RequestTimeout(functools.partial(self.send, **kwargs))
-            except URLError as err:
-                if isinstance(err.reason, socket.timeout):
-                    raise RequestTimeout(functools.partial(self.send, **kwargs))
-                else:
+                return self.attempt(state.timeout(timeout), **kwargs)
+            except (ResponseException, RequestTimeout, URLError) as err:
+                if not is_replayable(self.output['data']):
                     raise
+                delay = state.next_delay(err)
+                if delay is None:
+                    raise
+                time.sleep(delay)
 
-        if return_full_object:
-            return resp
-        else:
-            return resp.read()
+    def attempt(self, timeout, **kwargs):
+        """
+        Make a single attempt at sending the request, and report how it
+        went to the API's metrics hooks. Each attempt gets its own timings.
+        """
+        if self.attempts:
+            self.timings = Timings()
+        self.attempts += 1
+        try:
+            resp = self.receive(timeout, **kwargs)
+            if kwargs.get('return_full_object', False) or kwargs.get('_stream', False):
+                out = resp
+            else:
+                out = resp.read()
+        except Exception as err:
+            if self.trace is not None:
+                self.trace.error(err)
+            report(self, err)
+            raise
+        if self.trace is not None:
+            self.trace.finish(resp)
+        report(self, resp)
+        return out
+
+    def receive(self, timeout, **kwargs):
+        """
+        Get the Response to the request, turning HTTP errors and timeouts
+        into beekeeper exceptions.
+        """
+        traversal = kwargs.get('traversal', None)
+        stream = kwargs.get('_stream', False)
+        hedge = kwargs.get('_hedge', False)
+        with self.timings.timer('render'):
+            self.output['url'] = self.render_url()
+        static_format = self.action.plan.format
+        try:
+            raw = self.dispatch(timeout, hedge)
+            return Response(static_format, raw, traversal, stream=stream, timings=self.timings, json_codec=self.json_codec)
+        except HTTPError as err:
+            raise ResponseException(static_format, err, timings=self.timings)
+        except (socket.timeout, URLError) as err:
+            if not timed_out(err):
+                raise
+            raise RequestTimeout(functools.partial(self.send, **kwargs))
+
+    def dispatch(self, timeout, hedge=False):
+        """
+        Fetch the raw response, hedging the request if asked to and the
+        method is safe to send twice. A streamed body can only be sent
+        once at a time, so requests with one are never hedged.
+        """
+        policy = self.action.plan.hedge
+        if not policy.applies_to(self.output['method']):
+            return self.fetch(timeout)
+        if hedge and not self.has_streamed_body():
+            return policy.run(functools.partial(self.fetch, timeout))
+        start = time.time()
+        response = self.fetch(timeout)
+        policy.record(start, response)
+        return response
+
+    def fetch(self, timeout):
+        """
+        Get the raw response for the request. If the API has a response
+        cache and the Action is cacheable, look there first, and revalidate
+        stale entries with the server rather than downloading them again.
+        """
+        pool = self.action.endpoint.transport()
+        cache = self.action.endpoint.response_cache()
+        cookie_jar = self.action.endpoint.session().cookie_jar
+        lookup = cache.lookup(self.output, self.action.plan.cache_ttl, cookie_jar) if cache is not None else None
+        if lookup is None:
+            return self.open(pool, self.output, timeout)
+        if lookup.is_fresh():
+            if self.trace is not None:
+                self.trace.cached(self.output['url'])
+            return lookup.entry.response()
+        try:
+            response = self.open(pool, lookup.conditional(self.output), timeout)
+        except HTTPError as err:
+            if not lookup.not_modified(err):
+                raise
+            return lookup.entry.response()
+        return lookup.store(response)
+
+    def open(self, pool, output, timeout):
+        """
+        Send the request over the API's transport, once the API and Endpoint rate
+        limiters allow it, and let the limiters know how it went. The
+        request counts as in flight until the response headers arrive.
+        """
+        limiters = self.action.plan.rate_limiters
+        acquire_all(limiters)
+        try:
+            response = pool.urlopen(timeout=timeout, timings=self.timings, trace=self.trace, **output)
+        except HTTPError as err:
+            observe_all(limiters, err.code, err.headers)
+            raise
+        finally:
+            release_all(limiters)
+        observe_all(limiters, response.getcode(), response.headers)
+        return response
 
     def set_headers(self, **headers):
         self.output['headers'].update(headers)
 
+    def compress_body(self, policy):
+        """
+        Compress the body according to the CompressionPolicy, if there is
+        one, the body is big enough, and it hasn't been encoded already.
+        """
+        if policy is None or not policy.applies_to(self.output['data']):
+            return
+        if any(name.lower() == 'content-encoding' for name in self.output['headers']):
+            return
+        with self.timings.timer('render'):
+            self.output['data'] = policy.compress(self.output['data'])
+        self.set_headers(**{'Content-Encoding': policy.encoding})
+
+    def has_streamed_body(self):
+        """
+        Check whether the body is sent from a stream, like a MultipartBody
+        with files in it, rather than from bytes.
+        """
+        data = self.output['data']
+        return data is not None and not isinstance(data, bytes)
+
     def set_data(self, data, override=False):
         if self.output['data'] is None or override:
             self.output['data'] = data
@@ -125,29 +282,140 @@ class Request(object):
     def set_url_replacements(self, **replacements):
         self.replacements.update(replacements)
 
+    def use_url(self, url):
+        """
+        Send the request to a fully-formed URL, like a pagination link,
+        instead of rendering one from the Endpoint's path and variables.
+        """
+        self.fixed_url = url
+
     def render_url(self):
         """
-        Render the final URL based on available variables
+        Render the final URL based on available variables, with the
+        replacement values percent-escaped
         """
-        url = self.url.format(**self.replacements)
+        if self.fixed_url is not None:
+            return self.fixed_url
+        url = self.action.plan.url_template.render(self.replacements)
         if self.params:
-            return url + '?' + urlencode(self.params)
+            return url + '?' + encode_params(self.params, self.action.plan.static_params)
         return url
 
 class Response(object):
 
     """
     Stores data and provides methods related to the response that
-    we get back from the API provider's server
+    we get back from the API provider's server. Normally, the body is
+    read as soon as the response arrives; when streaming, it's left on
+    the wire until it's asked for, either all at once through .data or
+    .read(), or a piece at a time through .iter_bytes(), .iter_lines()
+    or the file-like .raw object. A compressed body is decompressed as
+    it's read; .bytes_received and .bytes_decoded count the body bytes
+    that came over the wire and the bytes they decoded to.
     """
 
-    def __init__(self, static_format, response, traversal=None):
+    def __init__(self, static_format, response, traversal=None, stream=False, timings=None, json_codec=None):
         self.static_format = static_format
         self.headers = response.headers
-        self.data = response.read()
+        self.raw = decompressing(response)
+        self.bytes_decoded = 0
         self.code = response.getcode()
         self.message = response.msg
+        if traversal is not None and not isinstance(traversal, TraversalPath):
+            traversal = TraversalPath(traversal)
         self.traversal = traversal
+        self.timings = timings if timings is not None else Timings()
+        self.json_codec = json_codec
+        self._data = None
+        if not stream:
+            with self.timings.timer('download'):
+                self._data = self.raw.read()
+            self.bytes_decoded = len(self._data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def data(self):
+        """
+        The full body of the response; if we're streaming, reading this
+        pulls the rest of the body off the wire.
+        """
+        if self._data is None:
+            with self.timings.timer('download'):
+                self._data = self.raw.read()
+            self.bytes_decoded += len(self._data)
+            self.close()
+        return self._data
+
+    @property
+    def bytes_received(self):
+        """
+        The number of body bytes read off the wire so far; the same as
+        .bytes_decoded unless the body was compressed.
+        """
+        return getattr(self.raw, 'compressed_bytes', self.bytes_decoded)
+
+    def iter_bytes(self, chunk_size=8192):
+        """
+        Yield the body of the response in chunks of up to chunk_size bytes
+        without holding the whole thing in memory.
+        """
+        if self._data is not None:
+            for start in range(0, len(self._data), chunk_size):
+                yield self._data[start:start + chunk_size]
+            return
+        try:
+            while True:
+                chunk = self.raw.read(chunk_size)
+                if not chunk:
+                    break
+                self.bytes_decoded += len(chunk)
+                yield chunk
+        finally:
+            self.close()
+
+    def iter_lines(self, chunk_size=8192):
+        """
+        Yield the body of the response one line (as bytes, without the
+        line ending) at a time.
+        """
+        pending = b''
+        for chunk in self.iter_bytes(chunk_size):
+            lines = (pending + chunk).split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                yield line[:-1] if line.endswith(b'\r') else line
+        if pending:
+            yield pending[:-1] if pending.endswith(b'\r') else pending
+
+    def iter_items(self, chunk_size=65536):
+        """
+        Yield the traversed body of the response a piece at a time: the
+        items of a list, the (key, value) pairs of a dictionary, or a lone
+        value by itself. If the body is streamed JSON, the traversal path
+        drives an incremental parser, so that items come out as soon as
+        they arrive and the rest of the document is never held in memory;
+        otherwise, the body is read in full and traversed as normal.
+        """
+        if self._data is None and self.mimetype() == 'application/json':
+            items = iter_json(self.iter_bytes(chunk_size), self.traversal, self.encoding())
+        else:
+            items = iter_items(self.read())
+        for item in items:
+            yield item
+
+    def close(self):
+        """
+        Let go of the underlying connection; if a streamed body wasn't
+        read all the way through, the connection won't be reused.
+        """
+        close = getattr(self.raw, 'close', None)
+        if close is not None:
+            close()
 
     def mimetype(self):
         """
@@ -175,72 +443,16 @@ class Response(object):
         format, if such couldn't be pulled automatically.
         """
         if not raw:
-            response_body = decode(self.data, self.mimetype(), encoding=self.encoding())
+            data = self.data
+            with self.timings.timer('decode'):
+                response_body = decode(data, self.mimetype(), encoding=self.encoding(), json_codec=self.json_codec)
             if perform_traversal and self.traversal is not None:
-                return traverse(response_body, *self.traversal)
+                with self.timings.timer('traverse'):
+                    return self.traversal(response_body)
             return response_body
         else:
             return self.data
 
-def traverse(obj, *path, **kwargs):
-    """
-    Traverse the object we receive with the given path. Path
-    items can be either strings or lists of strings (or any
-    nested combination thereof). Behavior in given cases is
-    laid out line by line below.
-    """
-    if path:
-        if isinstance(obj, list) or isinstance(obj, tuple):
-            #If the current state of the object received is a
-            #list, return a list of each of its children elements,
-            #traversed with the current state of the string
-            return [traverse(x, *path) for x in obj]
-        elif isinstance(obj, dict):
-            #If the current state of the object received is a
-            #dictionary, do the following...
-            if isinstance(path[0], list) or isinstance(path[0], tuple):
-                #If the current top item in the path is a list,
-                #return a dictionary with keys to each of the
-                #items in the list, each traversed recursively.
-                for branch in path[0]:
-                    if not isinstance(branch, basestring):
-                        raise TraversalError(obj, path[0])
-                return {name: traverse(obj[name], *path[1:], split=True) for name in path[0]}
-            elif not isinstance(path[0], basestring):
-                #If the key isn't a string (or a list; handled
-                #previously), raise an exception.
-                raise TraversalError(obj, path[0])
-            elif path[0] == '\\*':
-                #If the key is a wildcard, return a dict containing
-                #each item, traversed down recursively.
-                return {name: traverse(item, *path[1:], split=True) for name, item in obj.items()}
-            elif path[0] in obj:
-                #The individual key is in the current object;
-                #traverse it and return the result.
-                return traverse(obj[path[0]], *path[1:])
-            else:
-                #The individual key doesn't exist in the
-                #current object; raise an error
-                raise TraversalError(obj, path[0])
-        else:
-            #If the current object isn't either a list or
-            #a dict, then do one of two things:
-            if kwargs.get('split', False):
-                #If the previously-recursed operation caused
-                #a split in a dict, just return the object; it's
-                #been specifically called out, but it isn't
-                #possible to recurse further.
-                return obj
-            else:
-                #The object can't be traversed, and we didn't
-                #specifically call it out to do something
-                #else with. Raise an exception.
-                raise TraversalError(obj, path[0])
-    else:
-        #If there's no path left, then just return the
-        #object that we received.
-        return obj
-
 class ResponseException(Response, Exception):
     """
     The exception we raise when we get an HTTPError back from
@@ -249,25 +461,8 @@ class ResponseException(Response, Exception):
     circular dependencies.
     """
 
-    def __init__(self, static_format, response):
-        Response.__init__(self, static_format, response, traversal=None)
+    def __init__(self, static_format, response, timings=None):
+        Response.__init__(self, static_format, response, traversal=None, timings=timings)
 
     def __str__(self):
         return 'Error message: {}/{}'.format(self.code, self.message)
-
-class VerboseContextManager(object):
-    """
-    Sets httplib to verbose on __enter__; returns it to its
-    previous state on __exit__.
-    """
-
-    def __init__(self, verbose=False):
-        self.verbose = verbose
-        self.previous_state = httplib.HTTPConnection.debuglevel
-
-    def __enter__(self):
-        if self.verbose:
-            httplib.HTTPConnection.debuglevel = 1
-
-    def __exit__(self, *args, **kwargs):
-        httplib.HTTPConnection.debuglevel = self.previous_state
@@ -0,0 +1,239 @@
+"""
+Provides transparent decompression of response bodies. Every request
+offers the encodings that beekeeper can decode in its Accept-Encoding
+header, unless it already has one; gzip and deflate always, and br and
+zstd when the brotli (or brotlicffi) and zstandard packages are installed.
+
+A compressed response is decoded as its body is read, a chunk at a time,
+so streaming reads work exactly as they do for uncompressed ones. The
+number of bytes that came over the wire and the number they decoded to
+are both kept, and are available on the Response.
+
+Request bodies can be compressed too, according to a CompressionPolicy
+set on the Action in the hive or for a single call; the body is sent with
+a Content-Encoding header naming the encoding used.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+import zlib
+
+BASE_ENCODINGS = ('gzip', 'deflate')
+OPTIONAL_ENCODINGS = (('br', ('brotli', 'brotlicffi')), ('zstd', ('zstandard',)))
+ACCEPT_ENCODING = []
+
+class ZlibDecoder(object):
+
+    """
+    Decodes gzip, or deflate; servers send deflate both with and without
+    the zlib wrapper, so we start expecting it and fall back to a raw
+    deflate stream if it's not there.
+    """
+
+    def __init__(self, encoding):
+        self.gzip = encoding in ('gzip', 'x-gzip')
+        self.first = True
+        self.decoder = zlib.decompressobj(16 + zlib.MAX_WBITS if self.gzip else zlib.MAX_WBITS)
+
+    def decompress(self, data):
+        if self.first and not self.gzip and data:
+            self.first = False
+            try:
+                return self.decoder.decompress(data)
+            except zlib.error:
+                self.decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self.decoder.decompress(data)
+
+    def flush(self):
+        return self.decoder.flush()
+
+class BrotliDecoder(object):
+
+    def __init__(self, encoding):
+        try:
+            import brotli
+        except ImportError:
+            import brotlicffi as brotli
+        self.decoder = brotli.Decompressor()
+
+    def decompress(self, data):
+        if hasattr(self.decoder, 'process'):
+            return self.decoder.process(data)
+        return self.decoder.decompress(data)
+
+    def flush(self):
+        return b''
+
+class ZstdDecoder(object):
+
+    def __init__(self, encoding):
+        import zstandard
+        self.decoder = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data):
+        return self.decoder.decompress(data)
+
+    def flush(self):
+        return self.decoder.flush()
+
+DECODERS = {
+    'gzip': ZlibDecoder,
+    'x-gzip': ZlibDecoder,
+    'deflate': ZlibDecoder,
+    'br': BrotliDecoder,
+    'zstd': ZstdDecoder
+}
+
+def accept_encoding():
+    """
+    Build the Accept-Encoding header value, the first time it's needed,
+    from the encodings we have decoders available for.
+    """
+    if not ACCEPT_ENCODING:
+        encodings = list(BASE_ENCODINGS)
+        for encoding, modules in OPTIONAL_ENCODINGS:
+            for module in modules:
+                try:
+                    __import__(module)
+                except ImportError:
+                    continue
+                encodings.append(encoding)
+                break
+        ACCEPT_ENCODING.append(', '.join(encodings))
+    return ACCEPT_ENCODING[0]
+
+def content_encodings(headers):
+    """
+    Get the list of encodings applied to a response body, in the order
+    they were applied, or None if we can't decode one of them.
+    """
+    value = headers.get('Content-Encoding', '') or ''
+    encodings = [each.strip().lower() for each in value.split(',') if each.strip()]
+    encodings = [each for each in encodings if each != 'identity']
+    if any(each not in DECODERS for each in encodings):
+        return None
+    return encodings
+
+class DecompressingReader(object):
+
+    """
+    Wraps a raw response whose body is compressed, and decodes the body
+    as it's read; otherwise, it looks just like the response it wraps.
+    """
+
+    def __init__(self, raw, encodings):
+        self.raw = raw
+        self.decoders = [DECODERS[each](each) for each in reversed(encodings)]
+        self.buffer = b''
+        self.done = False
+        self.compressed_bytes = 0
+        self.decompressed_bytes = 0
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def decode(self, data, final=False):
+        for decoder in self.decoders:
+            data = decoder.decompress(data)
+            if final:
+                data += decoder.flush()
+        return data
+
+    def read(self, amt=None):
+        if amt is None:
+            data = self.raw.read()
+            self.compressed_bytes += len(data)
+            out = self.buffer + self.decode(data, final=not self.done)
+            self.buffer = b''
+            self.done = True
+        else:
+            while len(self.buffer) < amt and not self.done:
+                data = self.raw.read(amt)
+                self.compressed_bytes += len(data)
+                self.buffer += self.decode(data, final=not data)
+                self.done = not data
+            out, self.buffer = self.buffer[:amt], self.buffer[amt:]
+        self.decompressed_bytes += len(out)
+        return out
+
+def decompressing(raw):
+    """
+    Wrap a raw response in a DecompressingReader if its body is encoded
+    in a way we can decode; otherwise, hand it back as it is.
+    """
+    encodings = content_encodings(raw.headers)
+    if not encodings:
+        return raw
+    try:
+        return DecompressingReader(raw, encodings)
+    except ImportError:
+        return raw
+
+DEFAULT_LEVELS = {'gzip': 6, 'deflate': 6, 'br': 4, 'zstd': 3}
+
+def gzip_encode(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+def deflate_encode(data, level):
+    return zlib.compress(data, level)
+
+def brotli_encode(data, level):
+    try:
+        import brotli
+    except ImportError:
+        import brotlicffi as brotli
+    return brotli.compress(data, quality=level)
+
+def zstd_encode(data, level):
+    import zstandard
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+ENCODERS = {
+    'gzip': gzip_encode,
+    'deflate': deflate_encode,
+    'br': brotli_encode,
+    'zstd': zstd_encode
+}
+
+class CompressionPolicy(object):
+
+    """
+    Compresses request bodies of at least min_size bytes with the given
+    encoding ("gzip", "deflate", "br" or "zstd") at the given level; the
+    default levels favour speed, since bodies are compressed on every call.
+    Smaller bodies are sent as they are, since compressing them costs more
+    than it saves.
+    """
+
+    def __init__(self, encoding='gzip', min_size=1024, level=None):
+        if encoding not in ENCODERS:
+            raise TypeError('Unknown content encoding {!r}'.format(encoding))
+        self.encoding = encoding
+        self.min_size = min_size
+        self.level = DEFAULT_LEVELS[encoding] if level is None else level
+
+    @classmethod
+    def from_setting(cls, setting):
+        """
+        Build a policy from the hive's "compress" key, or the _compress
+        keyword argument, which can be true, for gzip with the default
+        settings, the name of an encoding, a dictionary of settings, or a
+        CompressionPolicy. Something false turns compression off.
+        """
+        if isinstance(setting, CompressionPolicy):
+            return setting
+        if not setting:
+            return None
+        if setting is True:
+            return cls()
+        if isinstance(setting, dict):
+            return cls(**setting)
+        return cls(setting)
+
+    def applies_to(self, data):
+        return isinstance(data, bytes) and len(data) >= self.min_size
+
+    def compress(self, data):
+        return ENCODERS[self.encoding](data, self.level)
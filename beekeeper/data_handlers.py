@@ -5,6 +5,17 @@ doing things to variable_handlers; we map MIME types
 to format-specific classes in a dictionary, and then
 have a generic "run" method that directs requests
 passed to it to the correct format-specific method.
+
+Handlers that need a third-party codec, like xmltodict
+for XML, only import it the first time their MIME type
+is actually encoded or decoded, so that using beekeeper
+with JSON-only hives doesn't pay for loading it.
+
+JSON goes through a pluggable codec, chosen per API with
+the _json keyword argument; faster libraries like orjson
+and ujson parse straight from bytes and serialize straight
+to bytes, and the standard library's json module is the
+fallback when they're not installed.
 """
 
 from __future__ import absolute_import, division
@@ -19,8 +30,6 @@ import json
 import json.decoder
 from functools import partial
 
-import xmltodict
-
 class DataHandlerMeta(type):
 
     def __init__(cls, name, bases, dct):
@@ -37,24 +46,105 @@ class XMLParser(DataHandler):
 
     @staticmethod
     def dump(python_object, encoding):
+        import xmltodict
         if python_object:
             return xmltodict.unparse(python_object).encode(encoding)
 
     @staticmethod
     def load(response, encoding):
+        import xmltodict
         return xmltodict.parse(response, encoding=encoding, xml_attribs=True, dict_constructor=dict)
 
+class JSONCodec(object):
+
+    """
+    Turns JSON bytes into Python objects and back, using the standard
+    library's json module. Subclasses use faster libraries, which can
+    work on bytes directly.
+    """
+
+    name = 'json'
+
+    def loads(self, data, encoding):
+        return json.loads(data.decode(encoding))
+
+    def dumps(self, python_object, encoding):
+        return json.dumps(python_object).encode(encoding)
+
+class OrjsonCodec(JSONCodec):
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+        self.options = orjson.OPT_NON_STR_KEYS
+
+    def loads(self, data, encoding):
+        if encoding.lower() not in UTF8:
+            data = data.decode(encoding)
+        return self.orjson.loads(data)
+
+    def dumps(self, python_object, encoding):
+        data = self.orjson.dumps(python_object, option=self.options)
+        if encoding.lower() not in UTF8:
+            data = data.decode('utf-8').encode(encoding)
+        return data
+
+class UjsonCodec(JSONCodec):
+
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self.ujson = ujson
+
+    def loads(self, data, encoding):
+        if encoding.lower() not in UTF8:
+            data = data.decode(encoding)
+        return self.ujson.loads(data)
+
+    def dumps(self, python_object, encoding):
+        return self.ujson.dumps(python_object, escape_forward_slashes=False).encode(encoding)
+
+UTF8 = ('utf-8', 'utf8')
+JSON_CODECS = {codec.name: codec for codec in (JSONCodec, OrjsonCodec, UjsonCodec)}
+PREFERRED_JSON_CODECS = ('orjson', 'ujson', 'json')
+STDLIB_JSON = JSONCodec()
+
+def get_json_codec(setting=None):
+    """
+    Turn the _json keyword argument into a JSONCodec: the name of a
+    library ("json", the default, "orjson" or "ujson"), "auto" for the
+    fastest one that's installed, or a JSONCodec object, which is used
+    as it is. Naming a library that isn't installed raises ImportError.
+    """
+    if setting is None or setting == 'json':
+        return STDLIB_JSON
+    if isinstance(setting, JSONCodec):
+        return setting
+    if setting == 'auto':
+        for name in PREFERRED_JSON_CODECS:
+            try:
+                return get_json_codec(name)
+            except ImportError:
+                continue
+    if setting in JSON_CODECS:
+        return JSON_CODECS[setting]()
+    raise TypeError('Unknown JSON codec {!r}'.format(setting))
+
 class JSONParser(DataHandler):
     mimetype = 'application/json'
+    uses_json_codec = True
 
     @staticmethod
-    def dump(python_object, encoding):
+    def dump(python_object, encoding, json_codec=STDLIB_JSON):
         if python_object:
-            return json.dumps(python_object).encode(encoding)
+            return json_codec.dumps(python_object, encoding)
 
     @staticmethod
-    def load(response, encoding):
-        return json.loads(response.decode(encoding))
+    def load(response, encoding, json_codec=STDLIB_JSON):
+        return json_codec.loads(response, encoding)
 
 class HTTPFormEncoder(DataHandler):
     mimetype = 'application/x-www-form-urlencoded'
@@ -66,21 +156,21 @@ class HTTPFormEncoder(DataHandler):
 
 class PlainText(DataHandler):
     mimetypes = ['text/plain', 'text/html']
+    uses_json_codec = True
 
     @staticmethod
-    def dump(python_object, encoding):
+    def dump(python_object, encoding, json_codec=STDLIB_JSON):
         if python_object:
             return str(python_object).encode(encoding)
 
     @staticmethod
-    def load(response, encoding):
-        response = response.decode(encoding)
+    def load(response, encoding, json_codec=STDLIB_JSON):
         try:
-            return json.loads(response)
+            return json_codec.loads(response, encoding)
         except ValueError:
-            return response
+            return response.decode(encoding)
         except json.decoder.JSONDecodeError:
-            return response
+            return response.decode(encoding)
 
 class Binary(DataHandler):
     mimetypes = ['application/octet-stream']
@@ -94,7 +184,7 @@ class Binary(DataHandler):
     def load(response, encoding):
         return response
 
-def code(action, data, mimetype, encoding='utf-8'):
+def code(action, data, mimetype, encoding='utf-8', json_codec=None):
     if action == 'dump' and hasattr(data, 'read'):
         data = data.read()
     if action == 'dump' and isinstance(data, bytes):
@@ -104,7 +194,10 @@ def code(action, data, mimetype, encoding='utf-8'):
     if action == 'load' and mimetype not in DataHandler.registry:
         return getattr(Binary, action)(data, encoding)
     if mimetype in DataHandler.registry and getattr(DataHandler.registry[mimetype], action, None):
-        return getattr(DataHandler.registry[mimetype], action)(data, encoding)
+        handler = DataHandler.registry[mimetype]
+        if json_codec is not None and getattr(handler, 'uses_json_codec', False):
+            return getattr(handler, action)(data, encoding, json_codec=json_codec)
+        return getattr(handler, action)(data, encoding)
     else:
         raise Exception('Cannot parse MIME type {}'.format(mimetype))
 
@@ -0,0 +1,130 @@
+"""
+Provides hedged requests, which cut down on tail latency for idempotent
+Actions. If a request hasn't come back within the delay that most requests
+to the same Action finish in, a duplicate is sent, and whichever comes back
+first successfully is used. The loser is abandoned: its response is closed
+as soon as it arrives, so that its connection isn't handed back to the pool
+in an unknown state.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+import threading
+import time
+from collections import deque
+
+try:
+    from Queue import Queue, Empty
+except ImportError:
+    from queue import Queue, Empty
+
+from beekeeper.cache import CachedResponse
+from beekeeper.retry import IDEMPOTENT_METHODS
+
+class HedgePolicy(object):
+
+    """
+    Sends up to max_hedges duplicate requests, each one after the current
+    "percentile" latency of the last "window" calls to the Action has gone
+    by without a response. Until min_samples latencies have been seen, the
+    fixed "delay" (in seconds) is used instead.
+    """
+
+    def __init__(self, percentile=95, delay=0.1, max_hedges=1, min_samples=20,
+                 window=100, methods=IDEMPOTENT_METHODS):
+        self.percentile = percentile
+        self.default_delay = delay
+        self.max_hedges = max_hedges
+        self.min_samples = min_samples
+        self.methods = tuple(methods)
+        self.latencies = deque(maxlen=window)
+
+    @classmethod
+    def from_setting(cls, setting):
+        """
+        Build a policy from the hive's "hedge" key, which can be true, for
+        the default settings, or a dictionary of settings.
+        """
+        if isinstance(setting, dict):
+            return cls(**setting)
+        return cls()
+
+    def applies_to(self, method):
+        return method in self.methods
+
+    def record(self, start, response):
+        """
+        Note how long a request that started at the given time took to
+        come back; responses served from the cache don't count.
+        """
+        if not isinstance(response, CachedResponse):
+            self.latencies.append(time.time() - start)
+
+    def delay(self):
+        """
+        The time to wait on an outstanding request before hedging it.
+        """
+        samples = sorted(self.latencies)
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        index = int(round((len(samples) - 1) * self.percentile / 100))
+        return samples[index]
+
+    def run(self, fetch):
+        """
+        Call fetch, hedging it with duplicate calls as needed, and return
+        the first successful result. If every call fails, the error from
+        the first one is raised.
+        """
+        results = Queue()
+        failures = []
+        delay = self.delay()
+        launch(fetch, results, self)
+        launched = 1
+        while True:
+            can_hedge = launched <= self.max_hedges and not failures
+            try:
+                succeeded, value = results.get(timeout=delay if can_hedge else None)
+            except Empty:
+                launch(fetch, results, self)
+                launched += 1
+                continue
+            if succeeded:
+                abandon(results, launched - len(failures) - 1)
+                return value
+            failures.append(value)
+            if len(failures) == launched:
+                raise failures[0]
+
+def launch(fetch, results, policy):
+    """
+    Start a single copy of the request on its own thread.
+    """
+    def worker():
+        start = time.time()
+        try:
+            response = fetch()
+        except Exception as err:
+            results.put((False, err))
+        else:
+            policy.record(start, response)
+            results.put((True, response))
+    thread = threading.Thread(target=worker)
+    thread.daemon = True
+    thread.start()
+
+def abandon(results, outstanding):
+    """
+    Close the responses to any copies of the request still in flight,
+    once they come in.
+    """
+    def closer():
+        for _ in range(outstanding):
+            succeeded, value = results.get()
+            if succeeded:
+                value.close()
+    if outstanding:
+        thread = threading.Thread(target=closer)
+        thread.daemon = True
+        thread.start()
@@ -1,6 +1,15 @@
 """
 Provides the Hive class to work with JSON hive files, both remotely
-retrieved and opened from a local file
+retrieved and opened from a local file.
+
+Hives can be kept in a hive cache, given with the hive_cache argument or
+the BEEKEEPER_HIVE_CACHE environment variable: either a directory or a
+ResponseCache. Remote hives are stored there along with their ETag and
+Last-Modified headers, used as they are for a few minutes, and then
+revalidated with the server; if the server can't be reached, the cached
+copy is used anyway. Hives for a specific version from a hive's
+other_versions list are never revalidated, since they shouldn't change.
+Local hive files get a compiled copy kept in the directory, if there is one.
 """
 from __future__ import absolute_import, division
 from __future__ import unicode_literals, print_function
@@ -10,13 +19,22 @@ try:
 except ImportError:
     from urllib.error import URLError
 
+import hashlib
 import json
+import marshal
 import os
+import sys
+import tempfile
 
-from beekeeper.comms import download_as_json, ResponseException
+from beekeeper.cache import DiskCache, ResponseCache
+from beekeeper.comms import download_as_json, download_output, ResponseException
 from beekeeper.exceptions import MissingHive, VersionNotInHive
 from beekeeper.exceptions import HiveLoadedOverHTTP
 
+COMPILED_HIVE_VERSION = 1
+HIVE_TTL = 300
+PINNED_HIVE_TTL = float('inf')
+
 class Hive(dict):
 
     """
@@ -29,49 +47,70 @@ class Hive(dict):
         dict.__init__(self, **kwargs)
 
     @classmethod
-    def from_file(cls, fname, version=None, require_https=True):
+    def from_file(cls, fname, version=None, require_https=True, cache=None):
         """
-        Create a Hive object based on JSON located in a local file.
+        Create a Hive object based on JSON located in a local file. If
+        the hive cache is a directory, the parsed hive is kept there in
+        compiled form, and reused instead of parsing the JSON again until
+        the file changes.
         """
-        if os.path.exists(fname):
-            with open(fname) as hive_file:
-                return cls(**json.load(hive_file)).from_version(version, require_https=require_https)
-        else:
+        if not os.path.exists(fname):
             raise MissingHive(fname)
+        cache = get_hive_cache(cache)
+        cache_dir = getattr(cache, 'directory', None)
+        if cache_dir:
+            hive = load_compiled(fname, cache_dir)
+        else:
+            hive = None
+        if hive is None:
+            header = compiled_header(fname)
+            with open(fname) as hive_file:
+                hive = json.load(hive_file)
+            if cache_dir:
+                save_compiled(fname, cache_dir, header, hive)
+        return cls(**hive).from_version(version, require_https=require_https, cache=cache)
 
     @classmethod
-    def from_url(cls, url, version=None, require_https=False):
+    def from_url(cls, url, version=None, require_https=False, cache=None, pinned=False):
         """
-        Create a Hive object based on JSON located at a remote URL.
+        Create a Hive object based on JSON located at a remote URL. A
+        pinned hive is never revalidated once it's in the hive cache.
         """
+        cache = get_hive_cache(cache)
         if "https://" in url:
             require_https = True
         if "http://" in url and require_https:
             try:
-                hive = cls.from_url(url, version=version, require_https=False)
+                hive = cls.from_url(url, version=version, require_https=False, cache=cache, pinned=pinned)
             except HiveLoadedOverHTTP as err:
                 hive = err.hive
             raise HiveLoadedOverHTTP(url, hive)
         else:
             try:
-                return cls(**download_as_json(url)).from_version(version, require_https)
+                hive = download_as_json(url, cache, hive_ttl(cache, pinned))
             except (ResponseException, URLError):
                 raise MissingHive(url)
+            return cls(**hive).from_version(version, require_https, cache)
 
     @classmethod
-    def from_domain(cls, domain, version=None, require_https=True):
+    def from_domain(cls, domain, version=None, require_https=True, cache=None):
         """
         Try to find a hive for the given domain; raise an error if we have to
         failover to HTTP and haven't explicitly suppressed it in the call.
+        If we've already had to failover, and the hive we got over HTTP is
+        still fresh in the hive cache, we go straight to it.
         """
-        url = 'https://' + domain + '/api/hive.json'
+        cache = get_hive_cache(cache)
+        https_url = 'https://' + domain + '/api/hive.json'
+        http_url = 'http://' + domain + '/api/hive.json'
+        if is_cached(cache, http_url) and not is_cached(cache, https_url):
+            return cls.from_url(http_url, version=version, require_https=require_https, cache=cache)
         try:
-            return cls.from_url(url, version=version, require_https=require_https)
+            return cls.from_url(https_url, version=version, require_https=require_https, cache=cache)
         except MissingHive:
-            url = 'http://' + domain + '/api/hive.json'
-            return cls.from_url(url, version=version, require_https=require_https)
+            return cls.from_url(http_url, version=version, require_https=require_https, cache=cache)
 
-    def from_version(self, version, require_https=False):
+    def from_version(self, version, require_https=False, cache=None):
         """
         Create a Hive object based on the information in the object
         and the version passed into the method.
@@ -79,7 +118,7 @@ class Hive(dict):
         if version is None or self.version() == version:
             return self
         else:
-            return Hive.from_url(self.get_version_url(version), require_https=require_https)
+            return Hive.from_url(self.get_version_url(version), require_https=require_https, cache=cache, pinned=True)
 
     def get_version_url(self, version):
         """
@@ -101,3 +140,87 @@ class Hive(dict):
         Generate a list of other versions in the hive.
         """
         return self.get('versioning', {}).get('other_versions', [])
+
+def get_hive_cache(setting):
+    """
+    Turn the hive_cache argument into a ResponseCache: a directory is
+    used for a DiskCache, a ResponseCache is used as it is, and if there's
+    no setting, the BEEKEEPER_HIVE_CACHE environment variable is tried.
+    """
+    setting = setting or os.environ.get('BEEKEEPER_HIVE_CACHE')
+    if not setting:
+        return None
+    if isinstance(setting, ResponseCache):
+        return setting
+    try:
+        return DiskCache(setting, default_ttl=HIVE_TTL)
+    except OSError:
+        return None
+
+def hive_ttl(cache, pinned=False):
+    """
+    How long a remote hive stays fresh in the cache before it's revalidated.
+    """
+    if cache is None:
+        return None
+    if pinned:
+        return PINNED_HIVE_TTL
+    return HIVE_TTL if cache.default_ttl is None else cache.default_ttl
+
+def is_cached(cache, url):
+    """
+    Check whether there's a fresh copy of the hive at the URL in the cache.
+    """
+    if cache is None:
+        return False
+    lookup = cache.lookup(download_output(url), hive_ttl(cache))
+    return lookup.is_fresh()
+
+def compiled_path(fname, cache_dir):
+    """
+    The location of the compiled copy of a hive file; it's named for the
+    hive file's full path and the Python version, since marshal's format
+    can change between versions.
+    """
+    key = hashlib.sha1(os.path.abspath(fname).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, '{}.py{}{}.hive'.format(key, *sys.version_info[:2]))
+
+def compiled_header(fname):
+    """
+    The header stored with a compiled hive; like a .pyc file, the compiled
+    hive is only used while the source file's size and modification time
+    still match the ones it was compiled from.
+    """
+    stat = os.stat(fname)
+    return (COMPILED_HIVE_VERSION, stat.st_mtime, stat.st_size)
+
+def load_compiled(fname, cache_dir):
+    """
+    Load the compiled copy of a hive file, or return None if there isn't
+    an up-to-date one. The file is read in one go; marshal.load() reads
+    it a few bytes at a time, which is slower than parsing the JSON.
+    """
+    try:
+        with open(compiled_path(fname, cache_dir), 'rb') as compiled:
+            header, hive = marshal.loads(compiled.read())
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        return None
+    if header != compiled_header(fname):
+        return None
+    return hive
+
+def save_compiled(fname, cache_dir, header, hive):
+    """
+    Write the compiled copy of a hive file. The cache is only there to
+    speed things up, so a failure to write it is ignored; the write goes
+    through a temporary file so that other processes never see half of it.
+    """
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        handle, temp_path = tempfile.mkstemp(dir=cache_dir)
+        with os.fdopen(handle, 'wb') as compiled:
+            marshal.dump((header, hive), compiled)
+        getattr(os, 'replace', os.rename)(temp_path, compiled_path(fname, cache_dir))
+    except (IOError, OSError, ValueError):
+        pass
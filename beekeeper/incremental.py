@@ -0,0 +1,315 @@
+"""
+Provides incremental JSON decoding driven by an Action's traversal path.
+Rather than decoding a whole response body and then traversing it, the
+traversal path is walked through the body as it comes off the wire: parts
+of the document that the path doesn't reach are skipped over without being
+decoded, and matched elements are yielded as soon as they're complete.
+
+Each matched element is decoded (and then traversed with the rest of the
+path) on its own, so memory use is bounded by the size of the largest
+element rather than the size of the whole document. The items yielded are
+the same as iterating over the result of traverse() on the fully decoded
+document: the elements of a list, the (key, value) pairs of a dictionary,
+or a lone value by itself.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+import codecs
+import json
+import re
+
+from beekeeper.exceptions import TraversalError, StrReprWrapper
+from beekeeper.traversal import TraversalPath
+
+try:
+    basestring
+except NameError:
+    basestring = str
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+STRUCTURE = re.compile(r'["{}\[\]]')
+STRING_SPECIAL = re.compile(r'["\\]')
+SCALAR_END = re.compile(r'[,\]}\s]')
+NUMBER_START = '-0123456789'
+NUMBER_CHARS = re.compile(r'[-+0-9.eE]*')
+COMPACT_AT = 65536
+
+#Stands in for an object we skipped over rather than decoding, when
+#we need to raise a TraversalError about it.
+SKIPPED = StrReprWrapper('{...}')
+
+class JSONScanner(object):
+
+    """
+    Pulls a JSON document through a buffer from an iterable of byte
+    chunks, and provides methods to read or skip over one value at a time.
+    """
+
+    def __init__(self, chunks, encoding='utf-8'):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.buf = ''
+        self.pos = 0
+        self.done = False
+        self.decode = json.JSONDecoder().raw_decode
+
+    def fill(self):
+        """
+        Add the next chunk of text to the buffer; returns False if
+        there's nothing left.
+        """
+        while not self.done:
+            try:
+                text = self.decoder.decode(next(self.chunks))
+            except StopIteration:
+                self.done = True
+                text = self.decoder.decode(b'', final=True)
+            if text:
+                self.buf += text
+                return True
+        return False
+
+    def more(self, i, keep=True):
+        """
+        Read more data while scanning from index i, and return i adjusted
+        for any compaction. Unless keep is set, everything in the buffer
+        before i is thrown away first.
+        """
+        if not keep:
+            self.buf = self.buf[i:]
+            self.pos = i = 0
+        if not self.fill():
+            raise ValueError('Unexpected end of JSON data')
+        return i
+
+    def peek(self):
+        """
+        Skip whitespace and return the next character, or an empty string
+        at the end of the data.
+        """
+        if self.pos > COMPACT_AT:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError('Expected one of {!r}, got {!r}'.format(chars, char))
+        self.pos += 1
+        return char
+
+    def string_end(self, i, keep=True):
+        """
+        Find the index just past the closing quote of a string whose
+        contents start at index i.
+        """
+        while True:
+            match = STRING_SPECIAL.search(self.buf, i)
+            if match is None:
+                i = self.more(len(self.buf), keep)
+            elif match.group() == '"':
+                return match.end()
+            elif match.end() >= len(self.buf):
+                i = self.more(match.start(), keep)
+            else:
+                i = match.end() + 1
+
+    def composite_end(self, i, keep=True):
+        """
+        Find the index just past the end of the object or array that
+        starts at index i.
+        """
+        depth = 0
+        while True:
+            match = STRUCTURE.search(self.buf, i)
+            if match is None:
+                i = self.more(len(self.buf), keep)
+                continue
+            char, i = match.group(), match.end()
+            if char == '"':
+                i = self.string_end(i, keep)
+            elif char in '{[':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return i
+
+    def scalar_end(self, i):
+        while True:
+            match = SCALAR_END.search(self.buf, i)
+            if match is not None:
+                return match.start()
+            i = len(self.buf)
+            if not self.fill():
+                return i
+
+    def value_end(self, keep=True):
+        char = self.peek()
+        if not char:
+            raise ValueError('Unexpected end of JSON data')
+        if char in '{[':
+            return self.composite_end(self.pos, keep)
+        if char == '"':
+            return self.string_end(self.pos + 1, keep)
+        return self.scalar_end(self.pos)
+
+    def read_value(self):
+        """
+        Decode the next value in full. If the value isn't all in the buffer
+        yet, decoding fails, and we try again once at least twice as much
+        data has come in, so a large value isn't decoded over and over.
+        A number is the exception: one cut off in the middle ("1." of
+        "1.5") can still decode, so we only trust it once something other
+        than part of a number follows it, or there's no more data.
+        """
+        self.peek()
+        wanted = 0
+        while True:
+            while len(self.buf) - self.pos < wanted and self.fill():
+                pass
+            try:
+                value, end = self.decode(self.buf, self.pos)
+            except ValueError:
+                if self.done:
+                    raise
+                wanted = 2 * (len(self.buf) - self.pos)
+                continue
+            if self.buf[self.pos] in NUMBER_START:
+                stop = NUMBER_CHARS.match(self.buf, end).end()
+                if stop == len(self.buf) and self.fill():
+                    continue
+                if stop != end:
+                    raise ValueError('Invalid number in JSON data')
+            self.pos = end
+            return value
+
+    def skip_value(self):
+        """
+        Move past the next value without decoding it, and without holding
+        on to it in the buffer.
+        """
+        self.pos = self.value_end(keep=False)
+
+    def object_keys(self):
+        """
+        Step through an object, yielding each key; the caller must read
+        or skip the matching value before asking for the next key.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise ValueError('Expected an object key')
+            key = self.read_value()
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+    def array_elements(self):
+        """
+        Step through an array, yielding once per element; the caller must
+        read or skip each element before moving on.
+        """
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.expect(',]') == ']':
+                return
+
+def check_branches(branches):
+    for branch in branches:
+        if not isinstance(branch, basestring):
+            raise TraversalError(SKIPPED, branches)
+
+def iter_traversed(scanner, path):
+    """
+    Yield the items of the next value, traversed with the given path, as
+    soon as each one is complete.
+    """
+    char = scanner.peek()
+    if not path:
+        if char == '[':
+            for _ in scanner.array_elements():
+                yield scanner.read_value()
+        elif char == '{':
+            for name in scanner.object_keys():
+                yield name, scanner.read_value()
+        else:
+            yield scanner.read_value()
+    elif char == '[':
+        extract = TraversalPath(path)
+        for _ in scanner.array_elements():
+            yield extract(scanner.read_value())
+    elif char == '{':
+        key = path[0]
+        if isinstance(key, list) or isinstance(key, tuple):
+            #Yield in the order the keys were given in the path, as
+            #traverse() would, but as early as the document allows.
+            check_branches(key)
+            wanted = list(key)
+            found = {}
+            extract = TraversalPath(path[1:])
+            for name in scanner.object_keys():
+                if name in key and name not in found:
+                    found[name] = extract(scanner.read_value(), split=True)
+                    while wanted and wanted[0] in found:
+                        yield wanted[0], found[wanted.pop(0)]
+                else:
+                    scanner.skip_value()
+            if wanted:
+                raise KeyError(wanted[0])
+        elif not isinstance(key, basestring):
+            raise TraversalError(SKIPPED, key)
+        elif key == '\\*':
+            extract = TraversalPath(path[1:])
+            for name in scanner.object_keys():
+                yield name, extract(scanner.read_value(), split=True)
+        else:
+            for name in scanner.object_keys():
+                if name == key:
+                    for item in iter_traversed(scanner, path[1:]):
+                        yield item
+                    return
+                scanner.skip_value()
+            raise TraversalError(SKIPPED, key)
+    else:
+        raise TraversalError(scanner.read_value(), path[0])
+
+def iter_json(chunks, path=None, encoding='utf-8'):
+    """
+    Incrementally decode a JSON document from an iterable of byte chunks,
+    yielding the items found by traversing it with the given path.
+    """
+    scanner = JSONScanner(chunks, encoding)
+    if scanner.peek():
+        for item in iter_traversed(scanner, list(path or [])):
+            yield item
+
+def iter_items(obj):
+    """
+    Iterate over an already-decoded, already-traversed object the same
+    way that iter_json() would.
+    """
+    if isinstance(obj, list) or isinstance(obj, tuple):
+        for item in obj:
+            yield item
+    elif isinstance(obj, dict):
+        for item in obj.items():
+            yield item
+    else:
+        yield obj
@@ -0,0 +1,197 @@
+"""
+Provides per-request timing instrumentation, and a way to hand it off to
+metrics systems. Each request records how long it spent in each phase:
+
+-   "render": turning variables into the URL, headers and body
+-   "dns", "connect" and "tls": opening a new connection, when one
+    couldn't be reused from the pool
+-   "ttfb": sending the request and waiting for the response headers
+-   "download": reading the response body
+-   "decode" and "traverse": parsing the body and traversing the result
+
+The timings are available on every Response as .timings, and are passed,
+along with the rest of the request's details, to any metrics hooks added
+to the API. A hook is just a callable taking a RequestMetrics object;
+MetricsRecorder is a ready-made hook that keeps counters and histograms
+for each Action. A hook that raises an exception doesn't affect the
+request; the exception is logged to the "beekeeper.metrics" logger.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+import threading
+import time
+
+PHASES = ('render', 'dns', 'connect', 'tls', 'ttfb', 'download', 'decode', 'traverse')
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class Timings(object):
+
+    """
+    The time, in seconds, that a request spent in each phase. Phases that
+    happen more than once, like a request that's redirected, add up.
+    """
+
+    def __init__(self):
+        self.phases = {}
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    def timer(self, phase):
+        return PhaseTimer(self, phase)
+
+    def get(self, phase, default=None):
+        return self.phases.get(phase, default)
+
+    def __getitem__(self, phase):
+        return self.phases[phase]
+
+    def __contains__(self, phase):
+        return phase in self.phases
+
+    def total(self):
+        return sum(self.phases.values())
+
+    def as_dict(self):
+        return dict(self.phases)
+
+    def __repr__(self):
+        parts = ['{}={:.4f}'.format(phase, self.phases[phase]) for phase in PHASES if phase in self.phases]
+        return 'Timings({})'.format(', '.join(parts))
+
+class PhaseTimer(object):
+
+    """
+    Adds the time spent inside a with block to one of the phases.
+    """
+
+    def __init__(self, timings, phase):
+        self.timings = timings
+        self.phase = phase
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *args):
+        self.timings.add(self.phase, time.time() - self.start)
+
+class RequestMetrics(object):
+
+    """
+    Everything a metrics hook gets told about a finished request: the
+    name of the Action (as "Object.action"), the method and URL, the
+    status code if there was one, the exception if the request failed,
+    the phase timings, and, if there was a response, how many bytes of
+    body came over the wire and how many they decoded to.
+    """
+
+    def __init__(self, action, method, url, code, error, timings, bytes_received=None, bytes_decoded=None):
+        self.action = action
+        self.method = method
+        self.url = url
+        self.code = code
+        self.error = error
+        self.timings = timings
+        self.bytes_received = bytes_received
+        self.bytes_decoded = bytes_decoded
+
+    def __repr__(self):
+        return 'RequestMetrics({} {} {} -> {})'.format(self.action, self.method, self.url, self.code)
+
+class Histogram(object):
+
+    """
+    Counts observations into buckets by upper bound, like a Prometheus
+    histogram, along with their count and sum.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        index = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = i
+                break
+        self.buckets[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def mean(self):
+        return self.sum / self.count if self.count else 0
+
+class MetricsRecorder(object):
+
+    """
+    A metrics hook that keeps, for each Action, counters of requests,
+    errors, status codes and body bytes received and decoded, and a
+    histogram of each phase's timings.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, metrics):
+        with self.lock:
+            self.increment(metrics.action, 'requests')
+            if metrics.error is not None:
+                self.increment(metrics.action, 'errors')
+            if metrics.code is not None:
+                self.increment(metrics.action, 'status_{}'.format(metrics.code))
+            if metrics.bytes_received is not None:
+                self.increment(metrics.action, 'bytes_received', metrics.bytes_received)
+                self.increment(metrics.action, 'bytes_decoded', metrics.bytes_decoded)
+            for phase, seconds in metrics.timings.phases.items():
+                key = (metrics.action, phase)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(self.buckets)
+                self.histograms[key].observe(seconds)
+
+    def increment(self, action, name, amount=1):
+        self.counters[(action, name)] = self.counters.get((action, name), 0) + amount
+
+    def counter(self, action, name):
+        return self.counters.get((action, name), 0)
+
+    def histogram(self, action, phase):
+        return self.histograms.get((action, phase))
+
+def report(request, outcome):
+    """
+    Hand the details of a finished request to the API's metrics hooks;
+    the outcome is either the Response or the exception raised. A failing
+    hook is logged and skipped, so that the request's own result (or
+    exception) still gets through.
+    """
+    hooks = request.action.endpoint.metrics_hooks()
+    if not hooks:
+        return
+    error = outcome if isinstance(outcome, Exception) else None
+    metrics = RequestMetrics(
+        request.action.name,
+        request.output['method'],
+        request.output.get('url'),
+        getattr(outcome, 'code', None),
+        error,
+        request.timings,
+        getattr(outcome, 'bytes_received', None),
+        getattr(outcome, 'bytes_decoded', None)
+    )
+    for hook in hooks:
+        try:
+            hook(metrics)
+        except Exception:
+            #logging is only imported if a hook ever fails, to keep importing beekeeper quick
+            import logging
+            logging.getLogger(__name__).exception('Metrics hook %r failed', hook)
@@ -0,0 +1,111 @@
+"""
+Provides MultipartBody, a request body that's sent a piece at a time
+rather than being built up in memory first. It's made of parts, each of
+which is either bytes or a file object; file objects are read in chunks
+as the body is sent, so uploading a large file never holds more than one
+chunk of it in memory.
+
+If the size of every file can be worked out up front (which it can for
+any seekable file opened in binary mode), the body's content_length is
+known and it's sent with a Content-Length header; otherwise, it's sent
+with chunked transfer encoding. Seekable files are rewound to where they
+started each time the body is iterated over, so that a request can be
+sent again if it has to be retried; a body with a file that can't seek
+can only be sent once, and is_replayable() says so, so that it's never
+quietly resent with half of its data missing.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+CHUNK_SIZE = 65536
+
+class MultipartBody(object):
+
+    """
+    An iterable of bytes chunks: each bytes part as it is, and each file
+    part chunk_size bytes at a time.
+    """
+
+    def __init__(self, parts, chunk_size=CHUNK_SIZE):
+        self.parts = [(part, start_position(part)) for part in parts]
+        self.chunk_size = chunk_size
+        self.content_length = 0
+        for part, start in self.parts:
+            size = len(part) if isinstance(part, bytes) else remaining_size(part, start)
+            if size is None:
+                self.content_length = None
+                break
+            self.content_length += size
+
+    def is_streamed(self):
+        """
+        Check whether any of the parts is a file object.
+        """
+        return any(not isinstance(part, bytes) for part, _ in self.parts)
+
+    def is_replayable(self):
+        """
+        Check whether the body can be sent more than once; that is, whether
+        every file part can be rewound.
+        """
+        return all(isinstance(part, bytes) or start is not None for part, start in self.parts)
+
+    def __iter__(self):
+        for part, start in self.parts:
+            if isinstance(part, bytes):
+                if part:
+                    yield part
+                continue
+            if start is not None:
+                part.seek(start)
+            while True:
+                chunk = part.read(self.chunk_size)
+                if not chunk:
+                    break
+                if not isinstance(chunk, bytes):
+                    chunk = chunk.encode('utf-8')
+                yield chunk
+
+def is_replayable(data):
+    """
+    Check whether a request body can be sent again: bytes can, and so can
+    a MultipartBody whose files can all be rewound, but any other stream
+    can only be read once.
+    """
+    if data is None or isinstance(data, bytes):
+        return True
+    replayable = getattr(data, 'is_replayable', None)
+    return replayable is not None and replayable()
+
+def start_position(part):
+    """
+    Find where a file part starts, so that it can be rewound; None for
+    bytes, and for files that can't seek.
+    """
+    if isinstance(part, bytes):
+        return None
+    try:
+        if hasattr(part, 'seekable') and not part.seekable():
+            return None
+        return part.tell()
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+
+def remaining_size(part, start):
+    """
+    Work out how many bytes are left to read from a file part, or None
+    if that can't be known: the file can't seek, or it's in text mode,
+    where characters and bytes don't line up.
+    """
+    if start is None or not isinstance(part.read(0), bytes):
+        return None
+    try:
+        end = part.seek(0, 2)
+        if end is None:
+            end = part.tell()
+        return end - start
+    except (IOError, OSError, ValueError):
+        return None
+    finally:
+        part.seek(start)
@@ -0,0 +1,186 @@
+"""
+Provides automatic pagination for Actions whose hive entries declare how
+the remote API splits its results into pages. Four styles are built in:
+
+-   "offset": an offset variable is advanced by the number of items on
+    each page, with an optional page-size variable.
+-   "page": a page number variable is incremented for each page.
+-   "cursor": the value found at a path in each response body is passed
+    back in a variable to get the next page.
+-   "link": the next page's URL is taken from the response's Link header.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+import re
+import threading
+
+from beekeeper.comms import Request
+from beekeeper.exceptions import TraversalError
+from beekeeper.incremental import iter_items
+from beekeeper.retry import RetryPolicy
+from beekeeper.compression import CompressionPolicy
+from beekeeper.traversal import TraversalPath
+
+NEXT_LINK = re.compile(r'<([^>]*)>[^,]*rel="?next"?')
+PAGINATION_TYPES = ('offset', 'page', 'cursor', 'link')
+
+class Prefetch(object):
+
+    """
+    Fetches a page on a background thread, holding on to the result (or
+    the exception) until it's asked for.
+    """
+
+    def __init__(self, func, *args):
+        self.result = None
+        self.error = None
+        self.thread = threading.Thread(target=self.run, args=(func,) + args)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self, func, *args):
+        try:
+            self.result = func(*args)
+        except Exception as err:
+            self.error = err
+
+    def get(self):
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+class Page(object):
+
+    """
+    A single page of results: the response, its fully decoded body, and
+    the items pulled out of it.
+    """
+
+    def __init__(self, response, body, items):
+        self.response = response
+        self.body = body
+        self.items = items
+
+    def count(self):
+        if isinstance(self.items, list) or isinstance(self.items, tuple):
+            return len(self.items)
+        return 1
+
+class Paginator(object):
+
+    """
+    Compiled from an Action's "pagination" hive entry; knows how to ask
+    for the first page, and how to get from each page to the next.
+    """
+
+    def __init__(self, spec, traversal=None):
+        self.type = spec.get('type', 'offset')
+        if self.type not in PAGINATION_TYPES:
+            raise TypeError('Unknown pagination type {}; expected one of {}'.format(self.type, PAGINATION_TYPES))
+        self.items_path = TraversalPath.from_setting(spec.get('items', traversal))
+        self.more_path = TraversalPath.from_setting(spec.get('more_path', None))
+        self.limit = spec.get('limit', None)
+        self.limit_variable = spec.get('limit_variable', None)
+        if self.type == 'offset':
+            self.variable = spec.get('offset_variable', 'offset')
+            self.start = spec.get('start', 0)
+        elif self.type == 'page':
+            self.variable = spec.get('page_variable', 'page')
+            self.start = spec.get('start', 1)
+        elif self.type == 'cursor':
+            self.variable = spec['cursor_variable']
+            self.cursor_path = TraversalPath.from_setting(spec['cursor_path'])
+
+    def first(self, kwargs):
+        """
+        Set up the keyword arguments for the first page, leaving alone
+        anything the developer has set explicitly.
+        """
+        kwargs = dict(kwargs)
+        if self.type in ('offset', 'page'):
+            kwargs.setdefault(self.variable, self.start)
+        if self.limit_variable and self.limit is not None:
+            kwargs.setdefault(self.limit_variable, self.limit)
+        return kwargs
+
+    def following(self, kwargs, page):
+        """
+        Work out the keyword arguments and URL for the page after the given
+        one, or return None if this was the last page.
+        """
+        if not page.count() or not self.has_more(page):
+            return None
+        limit = kwargs.get(self.limit_variable, self.limit) if self.limit_variable else self.limit
+        if self.type in ('offset', 'page') and limit is not None and page.count() < int(limit):
+            return None
+        if self.type == 'offset':
+            return dict(kwargs, **{self.variable: int(kwargs[self.variable]) + page.count()}), None
+        if self.type == 'page':
+            return dict(kwargs, **{self.variable: int(kwargs[self.variable]) + 1}), None
+        if self.type == 'cursor':
+            try:
+                cursor = self.cursor_path(page.body)
+            except TraversalError:
+                return None
+            if cursor is None or cursor == '':
+                return None
+            return dict(kwargs, **{self.variable: cursor}), None
+        match = NEXT_LINK.search(page.response.headers.get('Link', '') or '')
+        return (kwargs, match.group(1)) if match else None
+
+    def has_more(self, page):
+        if self.more_path is None:
+            return True
+        try:
+            return bool(self.more_path(page.body))
+        except TraversalError:
+            return False
+
+    def fetch(self, action, args, kwargs, url=None, options=None):
+        """
+        Send the request for a single page.
+        """
+        variables = action.variables().fill(*args, **kwargs)
+        request = Request(action, variables)
+        if url is not None:
+            request.use_url(url)
+        response = request.send(
+            return_full_object=True,
+            _timeout=action.plan.timeout,
+            **(options or {})
+        )
+        body = response.read(perform_traversal=False)
+        items = self.items_path(body) if self.items_path else body
+        return Page(response, body, items)
+
+    def iterate(self, action, *args, **kwargs):
+        """
+        Yield the items from each page in turn, fetching pages lazily as
+        the previous page's items run out. With _prefetch set, the next
+        page is requested in the background while the current page is
+        being consumed.
+        """
+        prefetch = kwargs.pop('_prefetch', False)
+        options = {
+            '_verbose': kwargs.pop('_verbose', False),
+            '_retry': RetryPolicy.from_setting(kwargs.pop('_retry', action.plan.retry)),
+            '_hedge': kwargs.pop('_hedge', action.plan.hedging),
+            '_compress': CompressionPolicy.from_setting(kwargs.pop('_compress', action.plan.compress))
+        }
+        state = (self.first(kwargs), None)
+        upcoming = None
+        while state is not None:
+            call_kwargs, url = state
+            if upcoming is not None:
+                page = upcoming.get()
+            else:
+                page = self.fetch(action, args, call_kwargs, url, options)
+            state = self.following(call_kwargs, page)
+            upcoming = None
+            if prefetch and state is not None:
+                upcoming = Prefetch(self.fetch, action, args, state[0], state[1], options)
+            for item in iter_items(page.items):
+                yield item
@@ -0,0 +1,55 @@
+"""
+Provides the CallPlan class, which holds everything about an Action that
+doesn't change from one call to the next, worked out once when the hive
+is loaded rather than on every request.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+from beekeeper.pagination import Paginator
+from beekeeper.retry import RetryPolicy
+from beekeeper.hedge import HedgePolicy
+from beekeeper.compression import CompressionPolicy
+from beekeeper.traversal import TraversalPath
+from beekeeper.urls import static_params
+
+class CallPlan(object):
+
+    """
+    A flattened view of an Action: the variables from the API, Endpoint
+    and Action levels merged together, plus the URL template and the
+    pre-encoded static query parameters, method, MIME type, compiled
+    traversal path, timeout, cache TTL, rate limiters, retry, hedging and
+    request body compression policies, and pagination rules.
+    The merged variables are kept as a template; each call gets its own
+    resolved copy to fill in.
+    """
+
+    def __init__(self, action):
+        self.template = action.endpoint.variables().add(**action.vars)
+        self.url = action.endpoint.url()
+        self.url_template = action.endpoint.template
+        self.static_params = static_params(self.template)
+        self.method = action.method
+        self.format = action.format()
+        self.traversal = TraversalPath.from_setting(action.traversal)
+        self.timeout = action.timeout
+        self.cache_ttl = action.cache_ttl
+        self.rate_limiters = action.endpoint.rate_limiters()
+        self.retry = RetryPolicy.from_setting(action.retry)
+        #The hedging policy tracks the Action's latencies even when it's
+        #off, so that the delay is ready if a call asks for hedging.
+        self.hedge = HedgePolicy.from_setting(action.hedge)
+        self.hedging = bool(action.hedge)
+        self.compress = CompressionPolicy.from_setting(action.compress)
+        self.paginator = None
+        if action.pagination is not None:
+            self.paginator = Paginator(action.pagination, self.traversal)
+
+    def variables(self):
+        """
+        Get a copy of the merged variables for a single request, with
+        any callable values executed.
+        """
+        return self.template.resolved()
@@ -0,0 +1,421 @@
+"""
+Provides a pool of persistent HTTP/1.1 connections. Requests made to the
+same host reuse an already-open socket where one is available, rather than
+paying for a brand new TCP (and TLS) handshake on every call.
+
+Proxies are taken from the environment (http_proxy, https_proxy and
+no_proxy), as urllib would: plain HTTP requests are sent to the proxy,
+and HTTPS ones are tunnelled through it with CONNECT. Connections made
+through a proxy are pooled separately from direct ones.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+try:
+    from urllib2 import Request as CookieRequest, HTTPError, URLError
+    from urllib import getproxies, proxy_bypass, unquote
+    from urlparse import urlsplit, urlunsplit, urljoin
+    import httplib
+except ImportError:
+    from urllib.request import Request as CookieRequest, getproxies, proxy_bypass
+    from urllib.error import HTTPError, URLError
+    from urllib.parse import urlsplit, urlunsplit, urljoin, unquote
+    import http.client as httplib
+
+from base64 import b64encode
+import socket
+import ssl
+import threading
+import time
+
+from beekeeper.metrics import Timings
+from beekeeper.multipart import is_replayable
+from beekeeper.transports import Transport, BufferedResponse
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+SSL_CONTEXT = []
+
+def default_ssl_context():
+    """
+    Build the default SSL context the first time an HTTPS connection
+    needs it, and share it between pools from then on; loading the
+    system's certificates is far too slow to do for every API.
+    """
+    if not SSL_CONTEXT:
+        SSL_CONTEXT.append(ssl.create_default_context())
+    return SSL_CONTEXT[0]
+
+def parse_proxy(proxy):
+    """
+    Split a proxy URL into its host, its port, and the value of the
+    Proxy-Authorization header for any credentials in it (or None).
+    """
+    if '://' not in proxy:
+        proxy = 'http://' + proxy
+    parts = urlsplit(proxy)
+    auth = None
+    if parts.username is not None:
+        credentials = '{}:{}'.format(unquote(parts.username), unquote(parts.password or ''))
+        auth = 'Basic ' + b64encode(credentials.encode('utf-8')).decode('ascii')
+    return parts.hostname, parts.port or DEFAULT_PORTS.get(parts.scheme, 80), auth
+
+def tunnel(sock, host, port, auth=None):
+    """
+    Ask the proxy at the other end of sock to open a tunnel to the given
+    host and port, raising a socket.error if it won't.
+    """
+    target = '[{}]:{}'.format(host, port) if ':' in host else '{}:{}'.format(host, port)
+    lines = ['CONNECT {} HTTP/1.1'.format(target), 'Host: {}'.format(target)]
+    if auth is not None:
+        lines.append('Proxy-Authorization: {}'.format(auth))
+    sock.sendall(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+    response = httplib.HTTPResponse(sock, method='CONNECT')
+    try:
+        response.begin()
+    finally:
+        response.close()
+    if response.status != 200:
+        raise socket.error('Tunnel connection failed: {} {}'.format(response.status, response.reason))
+
+class PooledResponse(object):
+
+    """
+    Wraps an httplib response so that it looks like the response objects
+    that urllib hands back, and returns the underlying connection to the
+    pool as soon as the body has been completely read.
+    """
+
+    def __init__(self, pool, key, conn, response):
+        self.pool = pool
+        self.key = key
+        self.conn = conn
+        self.response = response
+        self.headers = response.msg
+        self.msg = response.reason
+        self.code = response.status
+        self.released = False
+
+    def getcode(self):
+        return self.code
+
+    def info(self):
+        return self.headers
+
+    def read(self, amt=None):
+        """
+        Read from the response body; once there's nothing left to read,
+        the connection goes back into the pool.
+        """
+        try:
+            if amt is None:
+                data = self.response.read()
+            else:
+                data = self.response.read(amt)
+        except Exception:
+            self.release(reusable=False)
+            raise
+        if self.response.isclosed():
+            self.release()
+        return data
+
+    def buffered(self):
+        """
+        Read the whole body into a BufferedResponse, which has everything
+        an HTTPError needs from its file object, and let the connection go.
+        """
+        try:
+            body = self.read()
+        finally:
+            self.close()
+        return BufferedResponse(self.code, self.msg, self.headers, body)
+
+    def release(self, reusable=True):
+        if not self.released:
+            self.released = True
+            reusable = reusable and not self.response.will_close
+            self.pool.release(self.key, self.conn, reusable)
+
+    def close(self):
+        """
+        Give up on the response. If the body wasn't fully read, the
+        connection is in an unknown state, so it won't be reused.
+        """
+        if not self.released:
+            reusable = self.response.isclosed()
+            self.response.close()
+            self.release(reusable=reusable)
+
+class ConnectionPool(Transport):
+
+    """
+    Holds idle keep-alive connections keyed by (scheme, host, port), caps
+    the number of connections open to any single host, and throws away
+    connections that have sat idle for too long.
+    """
+
+    def __init__(self, max_connections=10, idle_timeout=60, cookie_jar=None, max_redirects=10):
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.cookie_jar = cookie_jar
+        self.max_redirects = max_redirects
+        self.ssl_context = None
+        self.proxies = getproxies()
+        self.idle = {}
+        self.active = {}
+        self.condition = threading.Condition()
+
+    def urlopen(self, url, data=None, headers=None, method=None, timeout=5, timings=None, trace=None):
+        """
+        Send a request, following redirects the same way that urllib
+        would, and raise an HTTPError for any non-2xx final response, with
+        its body already read, so that the connection can be reused.
+        The time spent connecting and waiting on the server is recorded
+        in timings, and each request and response written to the trace,
+        if they're given.
+        """
+        headers = dict(headers or {})
+        method = method or ('GET' if data is None else 'POST')
+        timings = timings if timings is not None else Timings()
+        for _ in range(self.max_redirects + 1):
+            response = self.send(url, data, headers, method, timeout, timings, trace)
+            location = response.headers.get('Location')
+            if response.code in REDIRECT_CODES and location and self.should_redirect(response.code, method):
+                response.read()
+                url = urljoin(url, location)
+                if method not in ('GET', 'HEAD'):
+                    method, data = 'GET', None
+                    headers = {
+                        name: val for name, val in headers.items()
+                        if name.lower() not in ('content-type', 'content-length')
+                    }
+                continue
+            if not 200 <= response.code < 300:
+                raise HTTPError(url, response.code, response.msg, response.headers, response.buffered())
+            return response
+        raise HTTPError(url, response.code, 'Too many redirects', response.headers, response.buffered())
+
+    @staticmethod
+    def should_redirect(code, method):
+        """
+        Mirror urllib: GETs and HEADs follow every redirect, POSTs follow
+        301/302/303 as a GET, and anything else is handed back as an error.
+        """
+        if method in ('GET', 'HEAD'):
+            return True
+        return method == 'POST' and code in (301, 302, 303)
+
+    def send(self, url, data, headers, method, timeout, timings, trace=None):
+        """
+        Send a single request over a pooled connection. If a reused
+        connection turns out to have been closed by the server while it
+        was idle, quietly retry on a fresh one, unless the body can only
+        be sent once. Cookies and proxy credentials are only added to this
+        request's copy of the headers, so that they don't follow a redirect
+        to another host.
+        """
+        headers = dict(headers)
+        parts = urlsplit(url)
+        proxy = self.proxy_for(parts.scheme, parts.hostname)
+        key = (parts.scheme, parts.hostname, parts.port or DEFAULT_PORTS.get(parts.scheme), proxy)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        if proxy is not None and parts.scheme == 'http':
+            #Plain HTTP goes to the proxy, which wants the whole URL
+            path = urlunsplit((parts.scheme, parts.netloc, path, '', ''))
+            auth = parse_proxy(proxy)[2]
+            if auth is not None:
+                headers.setdefault('Proxy-Authorization', auth)
+        cookie_request = self.add_cookies(url, headers)
+        while True:
+            try:
+                conn, reused = self.acquire(key, timeout, timings)
+            except socket.timeout:
+                raise
+            except socket.error as err:
+                raise URLError(err)
+            if trace is not None:
+                trace.request(method, url, headers, data)
+            try:
+                with timings.timer('ttfb'):
+                    conn.request(method, path, body=data, headers=headers)
+                    response = conn.getresponse()
+            except socket.timeout:
+                self.release(key, conn, reusable=False)
+                raise
+            except (httplib.HTTPException, socket.error) as err:
+                self.release(key, conn, reusable=False)
+                if reused and is_replayable(data):
+                    continue
+                raise URLError(err)
+            response = PooledResponse(self, key, conn, response)
+            if trace is not None:
+                trace.response(response.code, response.msg, response.headers)
+            if self.cookie_jar is not None:
+                self.cookie_jar.extract_cookies(response, cookie_request)
+            return response
+
+    def proxy_for(self, scheme, host):
+        """
+        The proxy to send a request to the given host through, or None
+        to connect directly.
+        """
+        proxy = self.proxies.get(scheme)
+        if not proxy or proxy_bypass(host):
+            return None
+        return proxy
+
+    def add_cookies(self, url, headers):
+        """
+        Let the cookie jar add a Cookie header, unless one was explicitly
+        set on the request.
+        """
+        cookie_request = CookieRequest(url, headers=headers)
+        if self.cookie_jar is not None:
+            self.cookie_jar.add_cookie_header(cookie_request)
+            cookie = cookie_request.unredirected_hdrs.get('Cookie')
+            if cookie:
+                headers['Cookie'] = cookie
+        return cookie_request
+
+    def acquire(self, key, timeout, timings):
+        """
+        Get a connection to the given host, reusing an idle one if we
+        can, and waiting for one to free up if the host is already at
+        its connection limit.
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        with self.condition:
+            self.evict_idle()
+            while True:
+                idle = self.idle.get(key)
+                if idle:
+                    conn, _ = idle.pop()
+                    self.active[key] = self.active.get(key, 0) + 1
+                    self.set_timeout(conn, timeout)
+                    return conn, True
+                if self.active.get(key, 0) < self.max_connections:
+                    self.active[key] = self.active.get(key, 0) + 1
+                    break
+                remaining = deadline - time.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise socket.timeout('Timed out waiting for a pooled connection')
+                self.condition.wait(remaining)
+        try:
+            return self.new_connection(key, timeout, timings), False
+        except BaseException:
+            with self.condition:
+                self.active[key] -= 1
+                self.condition.notify()
+            raise
+
+    def release(self, key, conn, reusable=True):
+        """
+        Return a connection to the pool, or close it if it can't be reused.
+        """
+        with self.condition:
+            self.active[key] = self.active.get(key, 1) - 1
+            if reusable and conn.sock is not None:
+                self.idle.setdefault(key, []).append((conn, time.time()))
+            else:
+                conn.close()
+            self.condition.notify()
+
+    def evict_idle(self):
+        """
+        Close any connections that have been idle for longer than the
+        idle timeout. Must be called with the condition held.
+        """
+        cutoff = time.time() - self.idle_timeout
+        for key, idle in self.idle.items():
+            for conn, last_used in idle:
+                if last_used <= cutoff:
+                    conn.close()
+            self.idle[key] = [(conn, last_used) for conn, last_used in idle if last_used > cutoff]
+
+    def new_connection(self, key, timeout, timings):
+        """
+        Open a new connection to the given host, timing the DNS lookup,
+        the TCP connection and the TLS handshake separately. Through a
+        proxy, the connection is to the proxy, and for HTTPS, setting up
+        the tunnel counts as part of connecting.
+        """
+        scheme, host, port, proxy = key
+        if scheme == 'https':
+            conn = httplib.HTTPSConnection(host, port, timeout=timeout, context=self.tls_context())
+        else:
+            conn = httplib.HTTPConnection(host, port, timeout=timeout)
+        if proxy is None:
+            sock = self.open_socket(host, port, timeout, timings)
+        else:
+            proxy_host, proxy_port, auth = parse_proxy(proxy)
+            sock = self.open_socket(proxy_host, proxy_port, timeout, timings)
+            if scheme == 'https':
+                with timings.timer('connect'):
+                    try:
+                        tunnel(sock, host, port, auth)
+                    except BaseException:
+                        sock.close()
+                        raise
+        if scheme == 'https':
+            with timings.timer('tls'):
+                try:
+                    sock = self.tls_context().wrap_socket(sock, server_hostname=host)
+                except BaseException:
+                    sock.close()
+                    raise
+        conn.sock = sock
+        return conn
+
+    @staticmethod
+    def open_socket(host, port, timeout, timings):
+        """
+        Open a TCP connection to the given host and port. Like
+        socket.create_connection(), we try each address the host resolves
+        to in turn, and only give up once they've all failed.
+        """
+        with timings.timer('dns'):
+            addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        error = socket.error('getaddrinfo returned no addresses for {}'.format(host))
+        with timings.timer('connect'):
+            for family, socktype, proto, _, address in addresses:
+                sock = socket.socket(family, socktype, proto)
+                try:
+                    sock.settimeout(timeout)
+                    sock.connect(address)
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    return sock
+                except socket.error as err:
+                    sock.close()
+                    error = err
+                except BaseException:
+                    sock.close()
+                    raise
+        raise error
+
+    def tls_context(self):
+        """
+        The SSL context for HTTPS connections; the shared default one,
+        unless the pool has been given its own.
+        """
+        if self.ssl_context is None:
+            self.ssl_context = default_ssl_context()
+        return self.ssl_context
+
+    @staticmethod
+    def set_timeout(conn, timeout):
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+
+    def close(self):
+        """
+        Close every idle connection held by the pool.
+        """
+        with self.condition:
+            for idle in self.idle.values():
+                for conn, _ in idle:
+                    conn.close()
+            self.idle = {}
@@ -0,0 +1,176 @@
+"""
+Provides client-side rate limiting, so that an API (or a single Endpoint)
+can be called from many threads at once without running into the remote
+provider's limits. Each RateLimiter combines a token bucket, which spaces
+requests out to a steady rate with room for short bursts, with a cap on
+the number of requests in flight at once.
+
+Limiters also listen to what the server tells them: a Retry-After header on
+a 429 or 503 response, or an X-RateLimit-Remaining (or RateLimit-Remaining)
+header that has hit zero, pauses the limiter until the server says it's
+ready for more.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+import threading
+import time
+from email.utils import parsedate_tz, mktime_tz
+
+THROTTLED_CODES = (429, 503)
+REMAINING_HEADERS = ('X-RateLimit-Remaining', 'RateLimit-Remaining')
+RESET_HEADERS = ('X-RateLimit-Reset', 'RateLimit-Reset')
+
+#Reset values bigger than this are taken to be Unix timestamps rather
+#than a number of seconds from now.
+EPOCH_CUTOFF = 1000000000
+
+class RateLimiter(object):
+
+    """
+    Allows up to "rate" requests every "per" seconds, in bursts of up to
+    "burst" requests (by default, the same as the rate), with no more than
+    "max_in_flight" requests waiting on the server at once. Any of these
+    can be left out to leave that dimension unlimited.
+    """
+
+    def __init__(self, rate=None, per=1, burst=None, max_in_flight=None):
+        self.rate = rate
+        self.per = per
+        self.burst = burst if burst is not None else (rate or 1)
+        self.tokens = self.burst
+        self.updated = time.time()
+        self.lock = threading.Lock()
+        self.slots = None
+        if max_in_flight:
+            self.slots = threading.BoundedSemaphore(max_in_flight)
+
+    def reserve(self):
+        """
+        Take a token from the bucket, and return the number of seconds to
+        wait before using it. Tokens can be taken ahead of time; each
+        caller is handed the next free spot in line.
+        """
+        with self.lock:
+            now = time.time()
+            if self.rate:
+                elapsed = max(0, now - self.updated)
+                self.tokens = min(self.burst, self.tokens + elapsed * self.rate / self.per)
+                self.updated = max(now, self.updated)
+                self.tokens -= 1
+            wait = max(0, self.updated - now)
+            if self.rate and self.tokens < 0:
+                wait += -self.tokens * self.per / self.rate
+            return wait
+
+    def take_slot(self, blocking=True):
+        """
+        Claim one of the in-flight slots; returns False if blocking is
+        off and every slot is taken.
+        """
+        if self.slots is None:
+            return True
+        return self.slots.acquire(blocking)
+
+    def acquire(self):
+        """
+        Block until a request is allowed to go out.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        self.take_slot()
+
+    def release(self):
+        if self.slots is not None:
+            self.slots.release()
+
+    def pause(self, seconds):
+        """
+        Hold off every request for the given number of seconds; tokens
+        don't build up while the limiter is paused.
+        """
+        with self.lock:
+            until = time.time() + seconds
+            if until > self.updated:
+                self.tokens = min(self.tokens, 0)
+                self.updated = until
+
+    def observe(self, code, headers):
+        """
+        Adapt to the rate limiting information in a response.
+        """
+        delay = None
+        if code in THROTTLED_CODES:
+            delay = retry_after(headers.get('Retry-After'))
+        remaining = first_header(headers, REMAINING_HEADERS)
+        if delay is None and remaining is not None:
+            try:
+                if int(remaining) <= 0:
+                    delay = reset_delay(first_header(headers, RESET_HEADERS))
+            except ValueError:
+                pass
+        if delay is None and code == 429:
+            delay = self.per / self.rate if self.rate else 1
+        if delay:
+            self.pause(delay)
+
+def first_header(headers, names):
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+def retry_after(value):
+    """
+    Parse a Retry-After header, which is either a number of seconds or
+    an HTTP date, into a number of seconds from now.
+    """
+    if value is None:
+        return None
+    try:
+        return max(0, float(value))
+    except ValueError:
+        parsed = parsedate_tz(value)
+        if parsed is None:
+            return None
+        return max(0, mktime_tz(parsed) - time.time())
+
+def reset_delay(value):
+    """
+    Parse a rate limit reset header, which is either a number of seconds
+    or a Unix timestamp, into a number of seconds from now.
+    """
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except ValueError:
+        return None
+    if value > EPOCH_CUTOFF:
+        value -= time.time()
+    return max(0, value)
+
+def acquire_all(limiters):
+    """
+    Wait on each of the limiters in turn; if anything goes wrong partway
+    through, the slots already taken are given back.
+    """
+    taken = []
+    try:
+        for limiter in limiters:
+            limiter.acquire()
+            taken.append(limiter)
+    except BaseException:
+        release_all(taken)
+        raise
+
+def release_all(limiters):
+    for limiter in limiters:
+        limiter.release()
+
+def observe_all(limiters, code, headers):
+    for limiter in limiters:
+        limiter.observe(code, headers)
@@ -0,0 +1,119 @@
+"""
+Provides automatic retries for requests that fail in ways that are likely
+to be temporary: timeouts, dropped connections, and responses like 503
+Service Unavailable. Retries back off exponentially with random jitter, so
+that many clients failing at once don't all come back at the same moment,
+and only idempotent methods are retried unless the policy says otherwise.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+import random
+import time
+
+try:
+    from urllib2 import URLError
+except ImportError:
+    from urllib.error import URLError
+
+from beekeeper.exceptions import RequestTimeout
+from beekeeper.ratelimit import retry_after
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+
+class RetryPolicy(object):
+
+    """
+    Makes up to "attempts" tries in total. The delay before retry number n
+    is chosen at random between zero and backoff * 2 ** (n - 1) seconds,
+    up to max_backoff, or without randomness if jitter is off; a
+    Retry-After header from the server is used as a lower bound. If a
+    deadline is given, no retry is started that would run past that many
+    seconds from the first attempt.
+    """
+
+    def __init__(self, attempts=3, backoff=0.5, max_backoff=30, jitter=True,
+                 statuses=RETRY_STATUSES, methods=IDEMPOTENT_METHODS, deadline=None):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = tuple(statuses)
+        self.methods = tuple(methods)
+        self.deadline = deadline
+
+    @classmethod
+    def from_setting(cls, setting):
+        """
+        Build a policy from a hive entry or the _retry keyword argument,
+        which can be a RetryPolicy, a dictionary of settings, a number of
+        attempts, or something false to turn retries off.
+        """
+        if isinstance(setting, RetryPolicy):
+            return setting
+        if not setting:
+            return None
+        if isinstance(setting, dict):
+            return cls(**setting)
+        if setting is True:
+            return cls()
+        return cls(attempts=int(setting))
+
+    def start(self, method):
+        return RetryState(self, method)
+
+    def is_retryable(self, method, err):
+        if method not in self.methods:
+            return False
+        if isinstance(err, RequestTimeout) or isinstance(err, URLError):
+            return True
+        return getattr(err, 'code', None) in self.statuses
+
+    def delay(self, attempt, err):
+        """
+        The delay before retrying after the given (1-based) failed attempt.
+        """
+        ceiling = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        delay = random.uniform(0, ceiling) if self.jitter else ceiling
+        headers = getattr(err, 'headers', None)
+        if headers is not None:
+            delay = max(delay, retry_after(headers.get('Retry-After')) or 0)
+        return delay
+
+class RetryState(object):
+
+    """
+    Tracks the attempts made for a single call under a RetryPolicy.
+    """
+
+    def __init__(self, policy, method):
+        self.policy = policy
+        self.method = method
+        self.attempt = 0
+        self.started = time.time()
+
+    def timeout(self, timeout):
+        """
+        Shorten the per-attempt timeout so that it doesn't run past the
+        policy's deadline.
+        """
+        if self.policy.deadline is None:
+            return timeout
+        remaining = self.policy.deadline - (time.time() - self.started)
+        return max(0.001, min(timeout, remaining))
+
+    def next_delay(self, err):
+        """
+        Record a failed attempt; return how long to wait before trying
+        again, or None if the error should be raised.
+        """
+        self.attempt += 1
+        if self.attempt >= self.policy.attempts or not self.policy.is_retryable(self.method, err):
+            return None
+        delay = self.policy.delay(self.attempt, err)
+        if self.policy.deadline is not None:
+            if time.time() + delay - self.started >= self.policy.deadline:
+                return None
+        return delay
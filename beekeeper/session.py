@@ -0,0 +1,98 @@
+"""
+Provides the Session class, which holds everything an API keeps from one
+request to the next: its cookies, its connections and its default headers.
+Every API gets a Session of its own unless it's handed one to share, so
+unrelated APIs (or the same API used with different credentials) never
+see each other's cookies or connections.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+try:
+    import cookielib
+except ImportError:
+    import http.cookiejar as cookielib
+
+import threading
+import weakref
+
+from beekeeper.pool import ConnectionPool
+from beekeeper.transports import get_transport
+
+class Session(object):
+
+    """
+    Owns a cookie jar, a transport (by default, a ConnectionPool with the
+    given limits), the matching asyncio connection pools (one for each
+    event loop that uses the session), and headers that
+    are sent with every request unless a variable overrides them. Closing
+    the session closes all of its connections; it can be used as a
+    context manager to do so automatically.
+    """
+
+    def __init__(self, transport=None, cookie_jar=None, headers=None, max_connections=10, idle_timeout=60):
+        self.cookie_jar = cookie_jar if cookie_jar is not None else cookielib.CookieJar()
+        self.headers = dict(headers or {})
+        self.transport = get_transport(
+            transport,
+            cookie_jar=self.cookie_jar,
+            max_connections=max_connections,
+            idle_timeout=idle_timeout
+        )
+        self.async_pools = weakref.WeakKeyDictionary()
+        self.async_lock = threading.Lock()
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def connection_pool(self):
+        """
+        The session's pool of keep-alive connections, or None if it uses
+        another transport.
+        """
+        if isinstance(self.transport, ConnectionPool):
+            return self.transport
+        return None
+
+    def async_connection_pool(self):
+        """
+        The session's pool of asyncio connections for the current event
+        loop, created the first time that loop needs it; None if the session
+        doesn't use the pooled transport. Connections can't be shared
+        between loops, so each loop (say, one per thread) gets a pool of
+        its own, and the pools of loops that have since been closed are
+        closed along with them.
+        """
+        pool = self.connection_pool()
+        if pool is None:
+            return None
+        import asyncio
+        from beekeeper.aio import AsyncConnectionPool
+        loop = asyncio.get_event_loop()
+        with self.async_lock:
+            for other in list(self.async_pools):
+                if other.is_closed():
+                    self.async_pools.pop(other).close()
+            async_pool = self.async_pools.get(loop)
+            if async_pool is None:
+                async_pool = self.async_pools[loop] = AsyncConnectionPool(
+                    max_connections=pool.max_connections,
+                    idle_timeout=pool.idle_timeout,
+                    cookie_jar=self.cookie_jar
+                )
+        return async_pool
+
+    def close(self):
+        """
+        Close every connection held by the session.
+        """
+        self.transport.close()
+        with self.async_lock:
+            for async_pool in list(self.async_pools.values()):
+                async_pool.close()
+        self.closed = True
@@ -0,0 +1,103 @@
+"""
+Provides per-request tracing, for seeing exactly what beekeeper sends and
+gets back. A Trace belongs to a single Request, so tracing one call never
+affects any other call being made at the same time, whether from another
+thread or another coroutine.
+
+Each line of a trace is tagged with a number unique to the request, so
+that traces from concurrent requests can be told apart:
+
+    #1 > GET https://api.example.com/widgets
+    #1 > Accept: application/json
+    #1 < 200 OK
+    #1 < Content-Type: application/json
+    #1 < body: 1532 bytes
+    #1 timings: Timings(dns=0.0012, connect=0.0213, ttfb=0.1520, ...)
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+import itertools
+
+DEBUG = 10 # logging.DEBUG, without importing logging just for that
+REDACTED_HEADERS = ('authorization', 'proxy-authorization', 'cookie', 'set-cookie')
+TRACE_IDS = itertools.count(1)
+
+class Trace(object):
+
+    """
+    Writes a trace of a request to the output, which can be a logging
+    Logger (written to at the given level, DEBUG by default), any callable
+    taking a line of text, or None for standard output. Credentials in
+    headers are hidden unless redact is turned off.
+    """
+
+    def __init__(self, output=None, level=DEBUG, redact=True):
+        self.output = output
+        self.level = level
+        self.redact = redact
+        self.id = next(TRACE_IDS)
+
+    @classmethod
+    def from_setting(cls, setting):
+        """
+        Build a Trace from the _verbose keyword argument, which can be a
+        Trace, a Logger or callable to write to, True to print to standard
+        output, or something false to turn tracing off.
+        """
+        if isinstance(setting, Trace):
+            return setting
+        if not setting:
+            return None
+        if setting is True:
+            return cls()
+        return cls(setting)
+
+    def log(self, marker, message):
+        line = ' '.join(part for part in ['#{}'.format(self.id), marker, message] if part)
+        if hasattr(self.output, 'log'):
+            self.output.log(self.level, line)
+        elif self.output is not None:
+            self.output(line)
+        else:
+            print(line)
+
+    def headers(self, marker, headers):
+        for name, val in headers:
+            if self.redact and name.lower() in REDACTED_HEADERS:
+                val = '<redacted>'
+            self.log(marker, '{}: {}'.format(name, val))
+
+    def request(self, method, url, headers, data):
+        self.log('>', '{} {}'.format(method, url))
+        self.headers('>', headers.items())
+        if isinstance(data, bytes):
+            if data:
+                self.log('>', 'body: {} bytes'.format(len(data)))
+        elif data is not None:
+            size = getattr(data, 'content_length', None)
+            if size is None:
+                self.log('>', 'body: streamed, length unknown')
+            else:
+                self.log('>', 'body: streamed, {} bytes'.format(size))
+
+    def response(self, code, reason, headers):
+        self.log('<', '{} {}'.format(code, reason))
+        self.headers('<', headers.items())
+
+    def cached(self, url):
+        self.log('<', 'served from cache: {}'.format(url))
+
+    def finish(self, response):
+        """
+        Log the body size, if it's been read, and the timings.
+        """
+        if response._data is not None and response.bytes_received != response.bytes_decoded:
+            self.log('<', 'body: {} bytes ({} compressed)'.format(response.bytes_decoded, response.bytes_received))
+        elif response._data is not None:
+            self.log('<', 'body: {} bytes'.format(len(response._data)))
+        self.log('', 'timings: {!r}'.format(response.timings))
+
+    def error(self, err):
+        self.log('!', '{}: {}'.format(type(err).__name__, err))
@@ -0,0 +1,215 @@
+"""
+Provides the transports that beekeeper can send requests over. Each API
+uses a single transport, chosen with the _transport keyword argument:
+
+-   "pooled" (the default): beekeeper.pool.ConnectionPool, which keeps
+    connections alive and reuses them between requests
+-   "urllib": UrllibTransport, which goes through the standard library's
+    urllib opener machinery, handlers and all, on a new connection each time
+-   MockTransport: answers requests from canned responses held in memory,
+    without touching the network at all
+
+Anything else implementing the Transport interface can be passed in too.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+try:
+    from urllib2 import Request as Py2Request, HTTPError
+    from urllib2 import build_opener, HTTPCookieProcessor
+    pyversion = 2
+except ImportError:
+    from urllib.request import Request as PythonRequest, build_opener
+    from urllib.request import HTTPCookieProcessor
+    from urllib.error import HTTPError
+    pyversion = 3
+
+import io
+import re
+import threading
+from email.message import Message
+
+from beekeeper.metrics import Timings
+
+if pyversion == 2:
+    class PythonRequest(Py2Request):
+
+        def __init__(self, *args, **kwargs):
+            self._method = kwargs.pop('method', None)
+            Py2Request.__init__(self, *args, **kwargs)
+
+        def get_method(self):
+            return self._method if self._method else super(PythonRequest, self).get_method()
+
+class Transport(object):
+
+    """
+    The interface every transport provides. urlopen() sends a single
+    prepared request and returns a response that looks like the ones
+    urllib hands back: it has .code, .msg and .headers attributes,
+    getcode() and info() methods, and a file-like read(amt=None) for the
+    body, which can be left on the wire until it's read. A response with a
+    non-2xx status is raised as an HTTPError wrapping the response, a
+    failure to connect as a URLError, and a timeout as a socket.timeout.
+    """
+
+    def urlopen(self, url, data=None, headers=None, method=None, timeout=5, timings=None, trace=None):
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Release any resources, like open connections, held by the transport.
+        """
+        pass
+
+class UrllibTransport(Transport):
+
+    """
+    Sends requests through a urllib opener, which handles redirects,
+    cookies (if a cookie jar is given) and proxies as urllib always does.
+    Any extra handlers are added to the opener.
+    """
+
+    def __init__(self, cookie_jar=None, handlers=()):
+        handlers = list(handlers)
+        if cookie_jar is not None:
+            handlers.append(HTTPCookieProcessor(cookie_jar))
+        self.opener = build_opener(*handlers)
+
+    def urlopen(self, url, data=None, headers=None, method=None, timeout=5, timings=None, trace=None):
+        timings = timings if timings is not None else Timings()
+        headers = dict(headers or {})
+        if trace is not None:
+            trace.request(method or ('GET' if data is None else 'POST'), url, headers, data)
+        try:
+            with timings.timer('ttfb'):
+                response = self.opener.open(PythonRequest(url, data, headers, method=method), timeout=timeout)
+        except HTTPError as err:
+            if trace is not None:
+                trace.response(err.code, err.msg, err.headers)
+            raise
+        if trace is not None:
+            trace.response(response.getcode(), response.msg, response.headers)
+        return response
+
+class BufferedResponse(object):
+
+    """
+    A response whose body is already in memory, that looks like the
+    response objects that urllib hands back.
+    """
+
+    def __init__(self, code, reason, headers, body):
+        self.code = code
+        self.msg = reason
+        self.headers = headers
+        self.body = io.BytesIO(body)
+
+    def getcode(self):
+        return self.code
+
+    def info(self):
+        return self.headers
+
+    def read(self, amt=None):
+        return self.body.read(amt)
+
+    def readline(self, limit=-1):
+        return self.body.readline(limit)
+
+    def readlines(self, hint=-1):
+        return self.body.readlines(hint)
+
+    def __iter__(self):
+        return iter(self.body)
+
+    def close(self):
+        pass
+
+class MockRequest(object):
+
+    """
+    A request received by a MockTransport.
+    """
+
+    def __init__(self, method, url, headers, data):
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.data = data
+
+    def __repr__(self):
+        return 'MockRequest({} {})'.format(self.method, self.url)
+
+class MockTransport(Transport):
+
+    """
+    Answers requests from responses registered with add(), and keeps every
+    request it receives in .requests. Streamed request bodies are read in
+    full, as a server would. Requests that don't match anything get a 404.
+    """
+
+    def __init__(self):
+        self.routes = []
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def add(self, method, url, code=200, headers=None, body=b''):
+        """
+        Register a response for the given method (or '*' for any) and URL.
+        The URL is a regular expression matched against the whole request
+        URL. Instead of a body, we can pass a function, which gets the
+        MockRequest and returns a (code, headers, body) tuple. Later routes
+        take priority over earlier ones.
+        """
+        self.routes.insert(0, (method, re.compile(url + '$'), code, dict(headers or {}), body))
+        return self
+
+    def respond(self, request):
+        for method, pattern, code, headers, body in self.routes:
+            if method in ('*', request.method) and pattern.match(request.url):
+                if callable(body):
+                    return body(request)
+                return code, headers, body
+        return 404, {'Content-Type': 'text/plain'}, 'No mock response for {} {}'.format(request.method, request.url).encode('utf-8')
+
+    def urlopen(self, url, data=None, headers=None, method=None, timeout=5, timings=None, trace=None):
+        timings = timings if timings is not None else Timings()
+        headers = dict(headers or {})
+        method = method or ('GET' if data is None else 'POST')
+        if data is not None and not isinstance(data, bytes):
+            data = b''.join(data)
+        request = MockRequest(method, url, headers, data)
+        with self.lock:
+            self.requests.append(request)
+        if trace is not None:
+            trace.request(method, url, headers, data)
+        with timings.timer('ttfb'):
+            code, response_headers, body = self.respond(request)
+        message = Message()
+        for name, val in response_headers.items():
+            message[name] = val
+        if isinstance(body, type('')):
+            body = body.encode('utf-8')
+        response = BufferedResponse(code, 'Mock', message, body)
+        if trace is not None:
+            trace.response(code, response.msg, message)
+        if not 200 <= code < 300:
+            raise HTTPError(url, code, response.msg, message, response)
+        return response
+
+def get_transport(setting, cookie_jar=None, **options):
+    """
+    Turn the _transport keyword argument into a Transport: "pooled" or
+    None for a ConnectionPool, built with the given options, "urllib" for
+    a UrllibTransport, or a Transport object, which is used as it is.
+    """
+    if setting is None or setting == 'pooled':
+        from beekeeper.pool import ConnectionPool
+        return ConnectionPool(cookie_jar=cookie_jar, **options)
+    if setting == 'urllib':
+        return UrllibTransport(cookie_jar)
+    if isinstance(setting, Transport):
+        return setting
+    raise TypeError('Unknown transport {!r}'.format(setting))
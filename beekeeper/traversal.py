@@ -0,0 +1,131 @@
+"""
+Provides the traverse() function, which pares a decoded response down to
+the parts of it that an Action's traversal path points at, and the
+TraversalPath class, a path compiled once (when the hive is loaded) so
+that traversing each response doesn't have to work it out again.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+from beekeeper.exceptions import TraversalError
+
+try:
+    basestring
+except NameError:
+    basestring = str
+
+WILDCARD = '\\*'
+
+#The kinds of step a path item compiles to
+KEY, BRANCHES, EVERY_KEY, INVALID = range(4)
+
+def compile_step(item):
+    if isinstance(item, list) or isinstance(item, tuple):
+        if all(isinstance(branch, basestring) for branch in item):
+            return BRANCHES, tuple(item)
+        return INVALID, item
+    if not isinstance(item, basestring):
+        return INVALID, item
+    if item == WILDCARD:
+        return EVERY_KEY, item
+    return KEY, item
+
+class TraversalPath(tuple):
+
+    """
+    A traversal path, compiled into a flat list of steps. It's still the
+    tuple of path items it was built from, so it can be used anywhere a
+    path can; calling it traverses an object exactly as traverse() would,
+    but walks down plain keys in a loop rather than recursing, and only
+    recurses where the result branches out: over the items of a list, or
+    the keys of a dictionary.
+    """
+
+    def __new__(cls, path=()):
+        self = tuple.__new__(cls, path)
+        self.steps = [compile_step(item) for item in self]
+        return self
+
+    @classmethod
+    def from_setting(cls, setting):
+        """
+        Compile an Action's "traverse" hive entry, which should be a list
+        of strings and lists of strings; we raise a TypeError for anything
+        else, rather than waiting for the first response to find out.
+        None means the response isn't traversed at all.
+        """
+        if setting is None or isinstance(setting, TraversalPath):
+            return setting
+        if not (isinstance(setting, list) or isinstance(setting, tuple)):
+            raise TypeError('A traversal path must be a list, not {!r}'.format(setting))
+        path = cls(setting)
+        for kind, item in path.steps:
+            if kind == INVALID:
+                raise TypeError('Traversal path items must be strings or lists of strings, not {!r}'.format(item))
+        return path
+
+    def __call__(self, obj, split=False):
+        return self.walk(obj, 0, split)
+
+    def walk(self, obj, index, split):
+        """
+        Traverse obj with the steps from index onwards. "split" is set
+        when obj is one of the values picked out of a dictionary by the
+        previous step, in which case it's fine for it not to go any deeper.
+        """
+        steps = self.steps
+        end = len(steps)
+        while index < end:
+            if isinstance(obj, list) or isinstance(obj, tuple):
+                #Each item in a list gets the rest of the path
+                walk = self.walk
+                return [walk(item, index, False) for item in obj]
+            kind, key = steps[index]
+            if not isinstance(obj, dict):
+                if split:
+                    return obj
+                raise TraversalError(obj, self[index])
+            index += 1
+            if kind == KEY:
+                try:
+                    obj = obj[key]
+                except KeyError:
+                    raise TraversalError(obj, key)
+                split = False
+            elif kind == BRANCHES:
+                if index == end:
+                    return {name: obj[name] for name in key}
+                walk = self.walk
+                return {name: walk(obj[name], index, True) for name in key}
+            elif kind == EVERY_KEY:
+                if index == end:
+                    return dict(obj)
+                walk = self.walk
+                return {name: walk(item, index, True) for name, item in obj.items()}
+            else:
+                raise TraversalError(obj, key)
+        return obj
+
+def traverse(obj, *path, **kwargs):
+    """
+    Traverse the object we receive with the given path. Path
+    items can be either strings or lists of strings (or any
+    nested combination thereof):
+
+    -   If the current state of the object is a list, we get a
+        list of each of its items, traversed with the rest of
+        the path.
+
+    -   If the current path item is a list of keys, we get a
+        dictionary of each of those keys, traversed with the
+        rest of the path; "\\*" does the same for every key.
+
+    -   Any other string is a key to navigate down through.
+
+    If the object can't be traversed any further, we raise a
+    TraversalError, unless the previous step split up a
+    dictionary (or we were told it did, with split=True), in
+    which case we just get the object back.
+    """
+    return TraversalPath(path)(obj, kwargs.get('split', False))
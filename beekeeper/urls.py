@@ -0,0 +1,134 @@
+"""
+Provides URLTemplate, an Endpoint's URL parsed once into its fixed text
+and its replacement slots, so that rendering a URL for each request is a
+matter of filling in the slots rather than parsing the template again.
+
+Replacement values can hold a whole path fragment, "/"s and all. Every
+character that's allowed in a URL path (letters, digits, "-._~", the
+sub-delimiters "!$&'()*+,;=", ":", "@" and "/") is kept as it is, as are
+%XX sequences, so that a value that's already been percent-encoded isn't
+encoded twice; anything else, including non-ASCII text (as UTF-8) and a
+"%" that doesn't start an escape, is percent-escaped. Query strings are
+rendered with encode_params(), which reuses the encoding of any parameter
+whose value is still the one fixed in the hive.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+import re
+from string import Formatter
+
+try:
+    from urllib import urlencode, quote
+except ImportError:
+    from urllib.parse import urlencode, quote
+
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+#The characters quote() should leave alone in a path, besides the
+#unreserved ones it always keeps; "%" is dealt with separately
+SAFE = "/:@!$&'()*+,;=%"
+PLAIN = re.compile(r"[A-Za-z0-9\-._~/:@!$&'()*+,;=]*\Z")
+BARE_PERCENT = re.compile(r'%(?![0-9A-Fa-f]{2})')
+
+FORMATTER = Formatter()
+
+def escape(value):
+    if isinstance(value, bytes):
+        value = value.decode('utf-8')
+    else:
+        value = text_type(value)
+    if PLAIN.match(value) is not None:
+        return value
+    value = BARE_PERCENT.sub('%25', value)
+    return text_type(quote(value.encode('utf-8'), safe=SAFE))
+
+class URLTemplate(object):
+
+    """
+    A URL with {name} slots to be replaced, as used in Endpoint paths.
+    Slots can have the usual format specs and conversions, but have to
+    be named; a template with positional or indexed slots, or unbalanced
+    braces, raises a TypeError when it's parsed.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.pieces = []
+        self.slots = []
+        self.fills = []
+        try:
+            parsed = list(FORMATTER.parse(template))
+        except ValueError as err:
+            raise TypeError('Invalid URL template {!r}: {}'.format(template, err))
+        for literal, name, spec, conversion in parsed:
+            if literal:
+                self.pieces.append(literal)
+            if name is None:
+                continue
+            if not name or name.isdigit() or '.' in name or '[' in name:
+                raise TypeError('URL template {!r} has an invalid slot {!r}; slots must be named'.format(template, name))
+            self.fills.append((len(self.pieces), name, spec, conversion))
+            self.pieces.append(None)
+            if name not in self.slots:
+                self.slots.append(name)
+        if not self.slots:
+            self.fixed = ''.join(self.pieces)
+        else:
+            self.fixed = None
+
+    def __repr__(self):
+        return 'URLTemplate({!r})'.format(self.template)
+
+    def render(self, replacements):
+        """
+        Fill in each slot with its escaped replacement value; a missing
+        replacement raises a KeyError, as str.format() would.
+        """
+        if self.fixed is not None:
+            return self.fixed
+        out = list(self.pieces)
+        for index, name, spec, conversion in self.fills:
+            value = replacements[name]
+            if conversion:
+                value = FORMATTER.convert_field(value, conversion)
+            if spec:
+                value = format(value, spec)
+            out[index] = escape(value)
+        return ''.join(out)
+
+def static_params(variables):
+    """
+    Encode each url_param variable whose value is fixed in the hive, ahead
+    of time; returns a dictionary of parameter names to (value, encoded)
+    pairs for encode_params() to pick from.
+    """
+    out = {}
+    for name, var in variables.items():
+        value = dict.get(var, 'value')
+        if value is None or callable(value) or not var.has_type('url_param'):
+            continue
+        name = var.get('name', name)
+        out[name] = (value, urlencode([(name, value)]))
+    return out
+
+def encode_params(params, encoded=None):
+    """
+    Render a query string from the params, in the same way urlencode()
+    would, but reusing the pre-encoded pairs for any static parameter
+    that still has its hive value.
+    """
+    if not encoded:
+        return urlencode(params)
+    out = []
+    for name, value in params.items():
+        static = encoded.get(name)
+        if static is not None and static[0] is value:
+            out.append(static[1])
+        else:
+            out.append(urlencode([(name, value)]))
+    return '&'.join(out)
@@ -15,6 +15,7 @@ from functools import partial
 from base64 import b64encode
 
 from beekeeper.data_handlers import encode
+from beekeeper.multipart import MultipartBody
 from beekeeper.exceptions import CannotHandleVariableTypes
 
 class VariableHandler(object):
@@ -41,7 +42,7 @@ def set_content_type(rq, mimetype):
 def render_data(rq, **data):
     for val in data.values():
         set_content_type(rq, val['mimetype'])
-        rq.set_data(encode(val['value'], val['mimetype']))
+        rq.set_data(encode(val['value'], val['mimetype'], json_codec=getattr(rq, 'json_codec', None)))
 
 @VariableHandler('http_form')
 def http_form(rq, **values):
@@ -79,23 +80,37 @@ def cookies(rq, **values):
 
 @VariableHandler('multipart')
 def multipart(rq, **values):
+    """
+    Files are streamed from their file objects as the request is sent,
+    rather than being read into memory; if there aren't any, the body is
+    just built as bytes.
+    """
     frame = '\n--{}\nContent-Disposition: form-data; name="{}"'
     boundary = uuid4().hex
     files = [name for name, data in values.items() if 'mimetype' in data]
-    output = bytes()
+    parts = []
     for name, value in values.items():
         if name in files:
             fname = value.get('filename', getattr(value['value'], 'name', uuid4().hex))
             this_frame = frame + '; filename="{}"\nContent-Type: {}\n\n'
-            this_data = encode(value['value'], value['mimetype'])
+            if hasattr(value['value'], 'read'):
+                this_data = value['value']
+            else:
+                this_data = encode(value['value'], value['mimetype'])
             args = (boundary, name, fname, value['mimetype'])
         else:
             this_frame = frame + '\n\n'
             this_data = value['value'].encode('ascii')
             args = (boundary, name)
-        output += this_frame.format(*args).encode('ascii') + this_data
-    output += '\n--{}--'.format(boundary).encode('ascii')
-    rq.set_data(output)
+        parts.extend([this_frame.format(*args).encode('ascii'), this_data])
+    parts.append('\n--{}--'.format(boundary).encode('ascii'))
+    body = MultipartBody(parts)
+    if body.is_streamed():
+        rq.set_data(body)
+        if body.content_length is not None:
+            rq.set_headers(**{'Content-Length': str(body.content_length)})
+    else:
+        rq.set_data(b''.join(parts))
     content_type_header = 'multipart/form-data; boundary={}'.format(boundary)
     set_content_type(rq, content_type_header)
 
@@ -72,6 +72,26 @@ class Variable(dict):
                 newthing[name] = deepcopy(value)
         return newthing
 
+    def copy(self):
+        """
+        Make a shallow copy of the variable; callable values are left
+        uncalled, so the copy stays linked to whatever they depend on.
+        """
+        newthing = Variable(self.default_type)
+        dict.update(newthing, dict.items(self))
+        return newthing
+
+    def resolved(self):
+        """
+        Make a copy of the variable for use in a single request, executing
+        any callable values and keeping the results, the same way that
+        deepcopying does.
+        """
+        newthing = Variable(self.default_type)
+        for name, value in dict.items(self):
+            newthing[name] = value() if callable(value) else value
+        return newthing
+
     def is_filled(self):
         """
         Does the variable have a value, or is it optional?
@@ -145,6 +165,26 @@ class Variables(dict):
         if len(unhandleable) > 0:
             raise CannotHandleVariableTypes(*unhandleable)
 
+    def copy(self):
+        """
+        Copy the Variables object, and each Variable in it, without
+        executing any callable values.
+        """
+        new = Variables(variable_settings=self.settings)
+        for name, var in self.items():
+            dict.__setitem__(new, name, var.copy())
+        return new
+
+    def resolved(self):
+        """
+        Copy the Variables object for use in a single request, executing
+        any callable values along the way.
+        """
+        new = Variables(variable_settings=self.settings)
+        for name, var in self.items():
+            dict.__setitem__(new, name, var.resolved())
+        return new
+
     def required_names(self):
         """
         Get a list of the variables that we still need to fill in
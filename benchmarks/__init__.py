@@ -0,0 +1,3 @@
+"""
+Benchmarks for beekeeper; run them with "python -m benchmarks.run".
+"""
@@ -0,0 +1,258 @@
+"""
+The benchmark cases. Importing this module registers them with the
+harness, in the order they're reported in.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from functools import partial
+
+from beekeeper.api import API
+from beekeeper.comms import Request
+from beekeeper.data_handlers import code, get_json_codec, JSON_CODECS
+from beekeeper.hive import Hive
+from beekeeper.transports import MockTransport
+from beekeeper.traversal import traverse, TraversalPath
+from beekeeper.variables import Variables
+
+from benchmarks.harness import benchmark
+from benchmarks.server import BenchmarkServer, ITEMS
+
+HIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Examples', 'hives')
+
+WIDGET = json.dumps({'data': {'id': '1', 'name': 'widget 1'}}).encode('utf-8')
+
+def widget_hive(root):
+    return {
+        'root': root,
+        'endpoints': {
+            'Widget': {
+                'path': '/widgets/{widget_id}',
+                'variables': {
+                    'widget_id': {'type': 'url_replacement'},
+                    'fields': {'type': 'url_param', 'optional': True}
+                }
+            },
+            'Items': {'path': '/items'},
+            'Upload': {
+                'path': '/upload',
+                'methods': ['POST'],
+                'variables': {
+                    'note': {'type': 'multipart'},
+                    'upload': {'type': 'multipart', 'mimetype': 'application/octet-stream', 'filename': 'blob.bin'}
+                }
+            }
+        },
+        'objects': {
+            'Widgets': {
+                'id_variable': 'widget_id',
+                'actions': {
+                    'get': {'endpoint': 'Widget', 'traverse': ['data']},
+                    'list': {'endpoint': 'Items', 'traverse': ['items', ['id', 'name']]}
+                }
+            },
+            'Files': {
+                'actions': {
+                    'upload': {'endpoint': 'Upload', 'method': 'POST', 'traverse': ['ok']}
+                }
+            }
+        }
+    }
+
+class Context(object):
+
+    """
+    What the cases share: the example hives, read once, and the local
+    server, which is only started if a case needs it.
+    """
+
+    def __init__(self):
+        self.hives = {}
+        for fname in sorted(os.listdir(HIVE_DIR)):
+            if fname.endswith('.json'):
+                with open(os.path.join(HIVE_DIR, fname)) as hive_file:
+                    self.hives[fname[:-len('.json')]] = json.load(hive_file)
+        self.server = None
+
+    def url(self, path=''):
+        if self.server is None:
+            self.server = BenchmarkServer().__enter__()
+        return self.server.url(path)
+
+    def close(self):
+        if self.server is not None:
+            self.server.__exit__()
+            self.server = None
+
+def required_variables(hive):
+    """
+    Make up a value for each variable the hive needs to be given when
+    the API is built.
+    """
+    variables = Variables(variable_settings=hive.get('variable_settings', {}), **hive.get('variables', {}))
+    return {name: 'x' for name in variables.required_names()}
+
+def mock_api():
+    transport = MockTransport()
+    transport.add('GET', r'http://bench\.invalid/widgets/\w+(\?.*)?', headers={'Content-Type': 'application/json'}, body=WIDGET)
+    transport.add('GET', r'http://bench\.invalid/items', headers={'Content-Type': 'application/json'}, body=ITEMS)
+    transport.add('POST', r'http://bench\.invalid/upload', headers={'Content-Type': 'application/json'}, body=b'{"ok": true}')
+    return API(widget_hive('http://bench.invalid'), _transport=transport)
+
+def build_everything(api):
+    for object_name in list(api._object_specs):
+        obj = api.get_object(object_name)
+        for action_name in list(obj._action_specs):
+            obj.get_action(action_name)
+
+def construct_case(name):
+    def construct(context):
+        hive = context.hives[name]
+        variables = required_variables(hive)
+        return lambda: API(hive, **variables).close()
+    def construct_all(context):
+        hive = context.hives[name]
+        variables = required_variables(hive)
+        def operation():
+            api = API(hive, **variables)
+            build_everything(api)
+            api.close()
+        return operation
+    benchmark('construct/' + name, iterations=500)(construct)
+    benchmark('construct/' + name + '/all-actions', iterations=200)(construct_all)
+
+def load_case(name):
+    fname = os.path.join(HIVE_DIR, name + '.json')
+    def load(context):
+        return lambda: Hive.from_file(fname)
+    def load_cached(context):
+        cache_dir = tempfile.mkdtemp()
+        Hive.from_file(fname, cache=cache_dir)
+        return lambda: Hive.from_file(fname, cache=cache_dir), partial(shutil.rmtree, cache_dir)
+    benchmark('load/' + name, iterations=2000)(load)
+    benchmark('load/' + name + '/compiled', iterations=2000)(load_cached)
+
+for hive_name in sorted(os.listdir(HIVE_DIR)):
+    if hive_name.endswith('.json'):
+        load_case(hive_name[:-len('.json')])
+        construct_case(hive_name[:-len('.json')])
+
+@benchmark('execute/mock', iterations=2000)
+def execute_mock(context):
+    api = mock_api()
+    return lambda: api.Widgets.get(widget_id='1'), api.close
+
+@benchmark('execute/mock/full-object', iterations=2000)
+def execute_mock_full(context):
+    api = mock_api()
+    return lambda: api.Widgets.get(widget_id='1', return_full_object=True).data, api.close
+
+@benchmark('execute/local', iterations=1000)
+def execute_local(context):
+    api = API(widget_hive(context.url()))
+    return lambda: api.Widgets.get(widget_id='1'), api.close
+
+@benchmark('execute/local/large', iterations=200)
+def execute_local_large(context):
+    api = API(widget_hive(context.url()))
+    return lambda: api.Widgets.list(), api.close
+
+@benchmark('render/request', iterations=5000)
+def render_request(context):
+    api = mock_api()
+    action = api.Widgets.get_action('get')
+    def operation():
+        Request(action, action.variables().fill(widget_id='1', fields='name')).render_url()
+    return operation, api.close
+
+@benchmark('render/url', iterations=20000)
+def render_url(context):
+    api = mock_api()
+    action = api.Widgets.get_action('get')
+    rq = Request(action, action.variables().fill(widget_id='1', fields='name'))
+    return rq.render_url, api.close
+
+@benchmark('render/variables', iterations=5000)
+def render_variables(context):
+    api = mock_api()
+    action = api.Widgets.get_action('get')
+    return lambda: action.variables().fill(widget_id='1', fields='name'), api.close
+
+@benchmark('traverse/items', iterations=500)
+def traverse_items(context):
+    data = json.loads(ITEMS.decode('utf-8'))
+    return lambda: traverse(data, 'items', ['id', 'name'])
+
+@benchmark('traverse/items/compiled', iterations=500)
+def traverse_items_compiled(context):
+    data = json.loads(ITEMS.decode('utf-8'))
+    path = TraversalPath(['items', ['id', 'name']])
+    return lambda: path(data)
+
+@benchmark('traverse/single', iterations=20000)
+def traverse_single(context):
+    data = {'data': {'id': '1', 'name': 'widget 1'}}
+    return lambda: traverse(data, 'data', 'name')
+
+def decode_case(codec_name):
+    @benchmark('decode/json/' + codec_name, iterations=500)
+    def decode(context):
+        try:
+            codec = get_json_codec(codec_name)
+        except ImportError:
+            return None
+        return lambda: code('load', ITEMS, 'application/json', json_codec=codec)
+    return decode
+
+for codec_name in sorted(JSON_CODECS):
+    decode_case(codec_name)
+
+@benchmark('decode/xml', iterations=100)
+def decode_xml(context):
+    try:
+        import xmltodict
+    except ImportError:
+        return None
+    data = json.loads(ITEMS.decode('utf-8'))
+    document = xmltodict.unparse({'items': {'item': data['items']}}).encode('utf-8')
+    return lambda: code('load', document, 'application/xml')
+
+@benchmark('encode/multipart/bytes', iterations=2000)
+def encode_multipart_bytes(context):
+    api = mock_api()
+    action = api.Files.get_action('upload')
+    payload = os.urandom(64 * 1024)
+    return lambda: Request(action, action.variables().fill(note='hello', upload=payload)), api.close
+
+@benchmark('encode/multipart/file', iterations=500)
+def encode_multipart_file(context):
+    api = mock_api()
+    action = api.Files.get_action('upload')
+    upload = io.BytesIO(os.urandom(1024 * 1024))
+    def operation():
+        rq = Request(action, action.variables().fill(note='hello', upload=upload))
+        for _ in rq.output['data']:
+            pass
+    return operation, api.close
+
+@benchmark('throughput/local/map-8', iterations=20, per_op=100)
+def throughput_local(context):
+    api = API(widget_hive(context.url()))
+    calls = [{'widget_id': str(i)} for i in range(100)]
+    def operation():
+        for result in api.Widgets.get_action('get').map(calls, concurrency=8):
+            result.get()
+    return operation, api.close
+
+@benchmark('import/beekeeper.api', iterations=5, warmup=1)
+def import_api(context):
+    command = [sys.executable, '-c', 'import beekeeper.api']
+    return lambda: subprocess.check_call(command)
@@ -0,0 +1,191 @@
+"""
+The benchmark harness: a registry of cases, the timing and allocation
+measurements, and the comparison against a saved baseline.
+
+A case is registered with the @benchmark decorator on a setup function,
+which takes the shared Context and returns the operation to time (a
+function taking no arguments), or a (operation, teardown) pair, or None
+to skip the case, if something it needs isn't installed. Each
+case is timed over a number of iterations after a warmup, giving the
+operations per second and latency percentiles; allocations are measured
+in a separate, shorter pass with tracemalloc, since tracing slows
+everything down.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+import json
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+timer = getattr(time, 'perf_counter', time.time)
+
+CASES = []
+ALLOCATION_ITERATIONS = 50
+
+class Case(object):
+
+    """
+    A registered benchmark. "per_op" is how many units of work (like
+    requests) a single operation does, for reporting throughput.
+    """
+
+    def __init__(self, name, setup, iterations, warmup, per_op):
+        self.name = name
+        self.setup = setup
+        self.iterations = iterations
+        self.warmup = warmup
+        self.per_op = per_op
+
+def benchmark(name, iterations=1000, warmup=None, per_op=1):
+    """
+    Register a setup function as a benchmark case with the given name.
+    """
+    def register(setup):
+        CASES.append(Case(name, setup, iterations, warmup if warmup is not None else max(1, iterations // 10), per_op))
+        return setup
+    return register
+
+class Result(object):
+
+    """
+    The measurements for one case. Latencies are in microseconds per
+    operation; throughput is in units of work per second.
+    """
+
+    FIELDS = (
+        'name', 'iterations', 'ops_per_sec', 'throughput', 'mean_us',
+        'p50_us', 'p90_us', 'p99_us', 'peak_kb', 'retained_bytes_per_op'
+    )
+
+    def __init__(self, **kwargs):
+        for field in self.FIELDS:
+            setattr(self, field, kwargs.get(field))
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+def percentile(samples, percent):
+    index = int(round((len(samples) - 1) * percent / 100))
+    return samples[index]
+
+def measure_allocations(operation, iterations):
+    """
+    Run the operation under tracemalloc, and return the peak memory
+    allocated while it ran, in KB, and the memory still held afterwards,
+    in bytes per operation; (None, None) without tracemalloc.
+    """
+    if tracemalloc is None:
+        return None, None
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        for _ in range(iterations):
+            operation()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (peak - baseline) / 1024, (current - baseline) / iterations
+
+def run_case(case, context, scale=1.0, allocations=True):
+    """
+    Set up and time a single case; None if the case was skipped.
+    """
+    operation = case.setup(context)
+    if operation is None:
+        return None
+    teardown = None
+    if isinstance(operation, tuple):
+        operation, teardown = operation
+    iterations = max(5, int(case.iterations * scale))
+    try:
+        for _ in range(max(1, int(case.warmup * scale))):
+            operation()
+        latencies = []
+        started = timer()
+        for _ in range(iterations):
+            start = timer()
+            operation()
+            latencies.append(timer() - start)
+        elapsed = timer() - started
+        peak_kb, retained = None, None
+        if allocations:
+            peak_kb, retained = measure_allocations(operation, min(iterations, ALLOCATION_ITERATIONS))
+    finally:
+        if teardown is not None:
+            teardown()
+    latencies.sort()
+    return Result(
+        name=case.name,
+        iterations=iterations,
+        ops_per_sec=iterations / elapsed,
+        throughput=iterations * case.per_op / elapsed,
+        mean_us=sum(latencies) / len(latencies) * 1e6,
+        p50_us=percentile(latencies, 50) * 1e6,
+        p90_us=percentile(latencies, 90) * 1e6,
+        p99_us=percentile(latencies, 99) * 1e6,
+        peak_kb=peak_kb,
+        retained_bytes_per_op=retained
+    )
+
+def run_suite(context, names=None, scale=1.0, allocations=True, report=None):
+    """
+    Run every registered case whose name contains one of the given
+    strings (or every case, if there aren't any), calling report with
+    each Result as it comes in.
+    """
+    results = []
+    for case in CASES:
+        if names and not any(name in case.name for name in names):
+            continue
+        result = run_case(case, context, scale, allocations)
+        if result is None:
+            continue
+        results.append(result)
+        if report is not None:
+            report(result)
+    return results
+
+def save(results, fname):
+    with open(fname, 'w') as out:
+        json.dump({result.name: result.as_dict() for result in results}, out, indent=2, sort_keys=True)
+
+def load(fname):
+    with open(fname) as baseline:
+        return {name: Result(**fields) for name, fields in json.load(baseline).items()}
+
+def compare(results, baseline, threshold=0.1):
+    """
+    Compare each result's throughput with the baseline's; a case is a
+    regression if it's slower by more than the threshold (as a fraction).
+    Returns a list of (result, change, regressed) tuples, where change is
+    the fractional change in throughput, or None if the baseline didn't
+    have the case.
+    """
+    out = []
+    for result in results:
+        before = baseline.get(result.name)
+        if before is None or not before.throughput:
+            out.append((result, None, False))
+            continue
+        change = result.throughput / before.throughput - 1
+        out.append((result, change, change < -threshold))
+    return out
+
+def format_result(result, change=None, regressed=False):
+    """
+    Format a result as a single line of the report.
+    """
+    line = '{:<40} {:>12.1f}/s  p50 {:>9.1f}us  p90 {:>9.1f}us  p99 {:>9.1f}us'.format(
+        result.name, result.throughput, result.p50_us, result.p90_us, result.p99_us
+    )
+    if result.peak_kb is not None:
+        line += '  peak {:>8.1f}KB  held {:>8.1f}B/op'.format(result.peak_kb, result.retained_bytes_per_op)
+    if change is not None:
+        line += '  {:>+7.1%}{}'.format(change, '  REGRESSION' if regressed else '')
+    return line
@@ -0,0 +1,61 @@
+"""
+Runs the benchmarks and reports on them. With --save, the results are
+written out as a baseline; with --compare, they're checked against one,
+and the exit status is 1 if any case got slower than the threshold allows.
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+import argparse
+import json
+import sys
+
+from benchmarks import harness
+from benchmarks.cases import Context
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description=__doc__.strip())
+    parser.add_argument('filters', nargs='*', help='only run cases whose names contain one of these')
+    parser.add_argument('--quick', action='store_true', help='run a tenth of the iterations, for a rough idea')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply every case\'s iterations by this')
+    parser.add_argument('--no-allocations', action='store_true', help='skip measuring allocations')
+    parser.add_argument('--save', metavar='FILE', help='save the results as a baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare the results with a saved baseline')
+    parser.add_argument('--threshold', type=float, default=0.1, help='slowdown that counts as a regression (default: 0.1)')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    parser.add_argument('--list', action='store_true', help='list the cases and exit')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if args.list:
+        for case in harness.CASES:
+            print(case.name)
+        return 0
+    baseline = harness.load(args.compare) if args.compare else {}
+    scale = args.scale / 10 if args.quick else args.scale
+
+    def report(result):
+        if not args.json:
+            _, change, regressed = harness.compare([result], baseline, args.threshold)[0]
+            print(harness.format_result(result, change, regressed))
+            sys.stdout.flush()
+
+    context = Context()
+    try:
+        results = harness.run_suite(context, args.filters, scale, not args.no_allocations, report)
+    finally:
+        context.close()
+    if args.json:
+        print(json.dumps([result.as_dict() for result in results], indent=2, sort_keys=True))
+    if args.save:
+        harness.save(results, args.save)
+    regressions = [result.name for result, _, regressed in harness.compare(results, baseline, args.threshold) if regressed]
+    if regressions:
+        print('{} regression(s) over {:.0%}: {}'.format(len(regressions), args.threshold, ', '.join(regressions)), file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+A local HTTP/1.1 stand-in for a remote API, for benchmarks that need to
+go over a real socket. Connections are kept alive, and responses are
+canned, so that the numbers reflect beekeeper's overhead rather than the
+server's:
+
+-   GET /widgets/<id>: {"data": {"id": <id>, "name": "widget <id>"}}
+-   GET /items: a list of ITEM_COUNT objects, under "items"
+-   POST /upload: reads and discards the body, and answers {"ok": true}
+"""
+
+from __future__ import absolute_import, division
+from __future__ import unicode_literals, print_function
+
+import json
+import threading
+
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+
+ITEM_COUNT = 1000
+ITEMS = json.dumps({
+    'items': [{'id': i, 'name': 'item {}'.format(i), 'tags': ['a', 'b'], 'score': i * 1.5} for i in range(ITEM_COUNT)]
+}).encode('utf-8')
+
+class BenchmarkHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path.startswith('/widgets/'):
+            widget_id = path[len('/widgets/'):]
+            body = json.dumps({'data': {'id': widget_id, 'name': 'widget ' + widget_id}}).encode('utf-8')
+            self.reply(200, body)
+        elif path == '/items':
+            self.reply(200, ITEMS)
+        else:
+            self.reply(404, b'{"error": "not found"}')
+
+    def do_POST(self):
+        remaining = int(self.headers.get('Content-Length', 0))
+        while remaining:
+            remaining -= len(self.rfile.read(min(remaining, 65536)))
+        self.reply(200, b'{"ok": true}')
+
+    def reply(self, code, body):
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class BenchmarkServer(ThreadingMixIn, HTTPServer):
+
+    """
+    Serves the canned responses on a free port on localhost, from a
+    background thread; use it as a context manager.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), BenchmarkHandler)
+        self.thread = threading.Thread(target=self.serve_forever, args=(0.01,))
+        self.thread.daemon = True
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+    def url(self, path=''):
+        return 'http://127.0.0.1:{}{}'.format(self.server_address[1], path)
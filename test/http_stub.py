@@ -0,0 +1,95 @@
+"""
+A small local HTTP/1.1 server for tests that need to talk over a real socket.
+"""
+
+from __future__ import unicode_literals
+
+import threading
+
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+            self.server.open_connections += 1
+
+    def finish(self):
+        BaseHTTPRequestHandler.finish(self)
+        with self.server.lock:
+            self.server.open_connections -= 1
+
+    def respond(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            body = self.read_chunked()
+        else:
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length) if length else b''
+        with self.server.lock:
+            self.server.requests.append((self.command, self.path, self.headers, body))
+        route = self.server.routes.get(self.path.split('?')[0])
+        if callable(route):
+            route = route(self)
+        code, headers, body = route or (200, {'Content-Type': 'text/plain'}, self.path.encode('utf-8'))
+        self.send_response(code)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if 'Content-Length' not in headers:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def read_chunked(self):
+        body = b''
+        while True:
+            size = int(self.rfile.readline().split(b';')[0], 16)
+            if not size:
+                self.rfile.readline()
+                return body
+            body += self.rfile.read(size)
+            self.rfile.readline()
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = respond
+
+    def log_message(self, *args):
+        pass
+
+class StubServer(ThreadingMixIn, HTTPServer):
+
+    """
+    Serves canned responses keyed by path. Unknown paths get a 200
+    with the request path echoed back as plain text.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, routes=None):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StubHandler)
+        self.routes = routes or {}
+        self.connections = 0
+        self.open_connections = 0
+        self.requests = []
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, args=(0.01,))
+        self.thread.daemon = True
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+    def url(self, path=''):
+        return 'http://127.0.0.1:{}{}'.format(self.server_address[1], path)
@@ -0,0 +1,191 @@
+from __future__ import unicode_literals
+
+import gc
+import json
+import socket
+import sys
+import threading
+import time
+import unittest
+
+try:
+    from urllib2 import URLError
+    from cookielib import CookieJar
+except ImportError:
+    from urllib.error import URLError
+    from http.cookiejar import CookieJar
+
+from beekeeper.api import API
+from beekeeper.comms import ResponseException
+from beekeeper.exceptions import RequestTimeout
+from beekeeper.transports import MockTransport
+
+from .http_stub import StubServer
+from .test_pool import set_environ
+
+if sys.version_info >= (3, 5):
+    import asyncio
+
+ROUTES = {
+    '/widgets/5': (200, {'Content-Type': 'application/json'}, json.dumps({'data': {'id': 5}}).encode('utf-8')),
+    '/widgets/6': (404, {'Content-Type': 'application/json'}, b'{"error": "nope"}')
+}
+
+def hive(root):
+    return {
+        'root': root,
+        'endpoints': {
+            'Widget': {
+                'path': '/widgets/{widget_id}',
+                'variables': {
+                    'widget_id': {'type': 'url_replacement'}
+                }
+            }
+        },
+        'objects': {
+            'Widgets': {
+                'id_variable': 'widget_id',
+                'actions': {
+                    'get': {'endpoint': 'Widget', 'traverse': ['data', 'id']}
+                }
+            }
+        }
+    }
+
+@unittest.skipIf(sys.version_info < (3, 5), 'asyncio support needs Python 3.5+')
+class AsyncExecuteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer(ROUTES).__enter__()
+        self.api = API(hive(self.server.url()))
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.api.async_connection_pool().close()
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        self.server.__exit__()
+
+    def run_coroutine(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_aexecute(self):
+        self.assertEqual(self.run_coroutine(self.api.Widgets.aio.get(widget_id=5)), 5)
+
+    def test_async_instance(self):
+        self.assertEqual(self.run_coroutine(self.api.Widgets.aio[5].get()), 5)
+        self.assertEqual(self.run_coroutine(self.api.Widgets[5].aio.get()), 5)
+
+    def test_concurrent_calls_share_connections(self):
+        calls = [self.api.Widgets.aio[5].get() for _ in range(20)]
+        self.assertEqual(self.run_coroutine(asyncio.gather(*calls)), [5] * 20)
+        self.assertLessEqual(self.server.connections, 10)
+
+    def test_new_loop_drops_old_connections(self):
+        #The garbage collector would close some of them eventually anyway
+        gc.disable()
+        self.addCleanup(gc.enable)
+        calls = [self.api.Widgets.aio[5].get() for _ in range(20)]
+        self.run_coroutine(asyncio.gather(*calls))
+        self.loop.close()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        calls = [self.api.Widgets.aio[5].get() for _ in range(20)]
+        self.assertEqual(self.run_coroutine(asyncio.gather(*calls)), [5] * 20)
+        for _ in range(100):
+            if self.server.open_connections <= 10:
+                break
+            time.sleep(0.01)
+        self.assertLessEqual(self.server.open_connections, 10)
+
+    def test_pool_per_loop(self):
+        self.assertEqual(self.run_coroutine(self.api.Widgets.aio.get(widget_id=5)), 5)
+        def other_thread():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                results.append(loop.run_until_complete(self.api.Widgets.aio.get(widget_id=5)))
+                results.append(self.api.async_connection_pool())
+            finally:
+                loop.close()
+        results = []
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+        self.assertEqual(results[0], 5)
+        self.assertIsNot(results[1], self.api.async_connection_pool())
+        #The first loop's connection is still there to be reused
+        self.assertEqual(self.run_coroutine(self.api.Widgets.aio.get(widget_id=5)), 5)
+        self.assertEqual(self.server.connections, 2)
+
+    def test_cookies_not_redirected_to_other_host(self):
+        from beekeeper.aio import AsyncConnectionPool
+        other = StubServer().__enter__()
+        self.addCleanup(other.__exit__)
+        self.server.routes['/login'] = (200, {'Set-Cookie': 'session=SECRET'}, b'')
+        self.server.routes['/away'] = (302, {'Location': other.url('/landing').replace('127.0.0.1', 'localhost')}, b'')
+        pool = AsyncConnectionPool(cookie_jar=CookieJar())
+        self.addCleanup(pool.close)
+        self.run_coroutine(pool.urlopen(self.server.url('/login')))
+        self.assertEqual(self.run_coroutine(pool.urlopen(self.server.url('/away'))).read(), b'/landing')
+        self.assertEqual(self.server.requests[-1][2]['Cookie'], 'session=SECRET')
+        self.assertIsNone(other.requests[-1][2]['Cookie'])
+
+    def test_header_injection_refused(self):
+        from beekeeper.aio import AsyncConnectionPool
+        pool = AsyncConnectionPool()
+        self.addCleanup(pool.close)
+        for headers in [{'X-Note': 'ok\r\nX-Evil: injected'}, {'X-Evil: injected\r\nX-Note': 'ok'}]:
+            with self.assertRaises(ValueError):
+                self.run_coroutine(pool.urlopen(self.server.url('/widgets/5'), headers=headers))
+        with self.assertRaises(URLError):
+            self.run_coroutine(pool.urlopen(self.server.url('/widgets/5 HTTP/1.1\r\nX-Evil: injected')))
+        self.assertEqual(self.server.requests, [])
+
+    def test_through_proxy(self):
+        self.server.routes['http://widgets.invalid/widgets/5'] = ROUTES['/widgets/5']
+        set_environ(self, http_proxy=self.server.url(), no_proxy='')
+        with API(hive('http://widgets.invalid')) as api:
+            self.assertEqual(self.run_coroutine(api.Widgets.aio.get(widget_id=5)), 5)
+        self.assertEqual(self.server.requests[-1][1], 'http://widgets.invalid/widgets/5')
+
+    def test_error_response(self):
+        with self.assertRaises(ResponseException) as context:
+            self.run_coroutine(self.api.Widgets.aio[6].get())
+        self.assertEqual(context.exception.code, 404)
+        self.assertEqual(context.exception.read(), {'error': 'nope'})
+
+def timed_out(request):
+    raise URLError(socket.timeout('timed out'))
+
+@unittest.skipIf(sys.version_info < (3, 5), 'asyncio support needs Python 3.5+')
+class AsyncTimeoutTest(unittest.TestCase):
+
+    def setUp(self):
+        self.timeouts = []
+        transport = MockTransport()
+        transport.add('GET', r'.*/widgets/5', headers={'Content-Type': 'application/json'}, body=b'{"data": {"id": 5}}')
+        transport.add('GET', r'.*/widgets/7', body=timed_out)
+        urlopen = transport.urlopen
+        def recording_urlopen(**kwargs):
+            self.timeouts.append(kwargs['timeout'])
+            return urlopen(**kwargs)
+        transport.urlopen = recording_urlopen
+        self.api = API(hive('http://widgets.invalid'), _transport=transport)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def test_attempt_timeout(self):
+        self.assertEqual(self.loop.run_until_complete(self.api.Widgets.aio[5].get(_retry={'deadline': 0.5})), 5)
+        self.assertLessEqual(self.timeouts[0], 0.5)
+
+    def test_timeout_error(self):
+        with self.assertRaises(RequestTimeout):
+            self.api.Widgets[7].get()
+        with self.assertRaises(RequestTimeout):
+            self.loop.run_until_complete(self.api.Widgets.aio[7].get())
@@ -0,0 +1,133 @@
+from __future__ import unicode_literals
+
+import unittest
+
+from beekeeper.api import API
+from beekeeper.data_handlers import JSONCodec
+from beekeeper.transports import MockTransport
+
+def hive():
+    return {
+        'root': 'https://example.com',
+        'endpoints': {
+            'Widget': {
+                'path': '/widgets/{widget_id}',
+                'methods': ['GET', 'DELETE'],
+                'variables': {
+                    'widget_id': {'type': 'url_replacement'}
+                }
+            },
+            'Gadget': {
+                'path': '/gadgets'
+            }
+        },
+        'objects': {
+            'Widgets': {
+                'id_variable': 'widget_id',
+                'actions': {
+                    'get': {'endpoint': 'Widget', 'traverse': ['id']},
+                    'delete': {'endpoint': 'Widget', 'method': 'DELETE'}
+                }
+            },
+            'Gadgets': {
+                'actions': {
+                    'list': {'endpoint': 'Gadget'}
+                }
+            }
+        }
+    }
+
+class LazyConstructionTest(unittest.TestCase):
+
+    def setUp(self):
+        transport = MockTransport()
+        transport.add('GET', r'.*/widgets/7', headers={'Content-Type': 'application/json'}, body=b'{"id": 7}')
+        self.api = API(hive(), _transport=transport)
+
+    def test_nothing_built_up_front(self):
+        self.assertEqual(self.api._objects, {})
+        self.assertEqual(self.api._endpoints, {})
+
+    def test_built_on_first_use(self):
+        self.assertEqual(self.api.Widgets[7].get(), 7)
+        self.assertEqual(set(self.api._objects), {'Widgets'})
+        self.assertEqual(set(self.api._endpoints), {'Widget'})
+        self.assertEqual(set(self.api.Widgets._actions), {'get'})
+        self.assertEqual(self.api.Widgets.get_action('get').name, 'Widgets.get')
+
+    def test_built_once(self):
+        self.assertIs(self.api.Widgets, self.api.Widgets)
+        self.assertIs(self.api.Widgets.get_action('get'), self.api.Widgets.get_action('get'))
+        self.assertIs(
+            self.api.Widgets.get_action('get').endpoint,
+            self.api.Widgets.get_action('delete').endpoint
+        )
+
+    def test_defined_actions(self):
+        self.assertEqual(sorted(self.api.Widgets.defined_actions()), ['delete', 'get'])
+
+    def test_unknown_names(self):
+        with self.assertRaises(AttributeError):
+            self.api.Sprockets
+        with self.assertRaises(AttributeError):
+            self.api.Widgets.update
+
+    def test_invalid_specs_raised_on_load(self):
+        spec = hive()
+        spec['objects']['Gadgets']['actions']['create'] = {'endpoint': 'Gadget', 'method': 'POST'}
+        with self.assertRaises(TypeError):
+            API(spec)
+        spec = hive()
+        spec['objects']['Gadgets']['actions']['list']['endpoint'] = 'Sprocket'
+        with self.assertRaises(TypeError):
+            API(spec)
+        spec = hive()
+        spec['objects']['Gadgets']['actions']['list']['traverse'] = 5
+        with self.assertRaises(TypeError):
+            API(spec)
+        spec = hive()
+        spec['endpoints']['Gadget']['path'] = '/a/{0}'
+        with self.assertRaises(TypeError):
+            API(spec)
+
+    def test_name_clashes_raised_on_load(self):
+        for name in ['iterate', 'map_ids', 'get_action', 'aio']:
+            spec = hive()
+            spec['objects']['Gadgets']['actions'][name] = {'endpoint': 'Gadget'}
+            with self.assertRaises(TypeError):
+                API(spec)
+        spec = hive()
+        spec['objects']['close'] = spec['objects'].pop('Gadgets')
+        with self.assertRaises(TypeError):
+            API(spec)
+
+class RecordingCodec(JSONCodec):
+
+    def __init__(self):
+        self.calls = []
+
+    def loads(self, data, encoding):
+        self.calls.append('loads')
+        return JSONCodec.loads(self, data, encoding)
+
+    def dumps(self, python_object, encoding):
+        self.calls.append('dumps')
+        return JSONCodec.dumps(self, python_object, encoding)
+
+class JSONCodecTest(unittest.TestCase):
+
+    def test_codec_used_for_requests_and_responses(self):
+        spec = hive()
+        spec['endpoints']['Gadget']['methods'] = ['POST']
+        spec['endpoints']['Gadget']['variables'] = {'gadget': {'type': 'data', 'mimetype': 'application/json'}}
+        spec['objects']['Gadgets']['actions']['list']['method'] = 'POST'
+        transport = MockTransport()
+        transport.add('POST', r'.*/gadgets', headers={'Content-Type': 'application/json'}, body=b'{"id": 3}')
+        codec = RecordingCodec()
+        api = API(spec, _transport=transport, _json=codec)
+        self.assertEqual(api.Gadgets.list(gadget={'name': 'sprocket'}), {'id': 3})
+        self.assertEqual(codec.calls, ['dumps', 'loads'])
+        self.assertEqual(transport.requests[0].data, b'{"name": "sprocket"}')
+
+    def test_stdlib_by_default(self):
+        self.assertEqual(API(hive()).json_codec().name, 'json')
@@ -0,0 +1,69 @@
+from __future__ import unicode_literals
+
+import threading
+import time
+import unittest
+
+from beekeeper.api import API
+from beekeeper.batch import run_batch
+
+from .http_stub import StubServer
+from .test_aio import hive
+
+def slow_double(x):
+    time.sleep(0.01 * (5 - x))
+    return x * 2
+
+def picky(x):
+    if x == 2:
+        raise ValueError(x)
+    return x
+
+class RunBatchTest(unittest.TestCase):
+
+    def test_ordered(self):
+        results = list(run_batch(slow_double, ({'x': x} for x in range(5)), concurrency=5))
+        self.assertEqual([result.get() for result in results], [0, 2, 4, 6, 8])
+        self.assertEqual([result.kwargs for result in results], [{'x': x} for x in range(5)])
+
+    def test_unordered(self):
+        results = list(run_batch(slow_double, ({'x': x} for x in range(5)), concurrency=5, ordered=False))
+        self.assertEqual(sorted(result.get() for result in results), [0, 2, 4, 6, 8])
+        self.assertEqual(results[0].index, 4)
+
+    def test_errors_dont_abort(self):
+        results = list(run_batch(picky, ({'x': x} for x in range(4)), concurrency=2))
+        self.assertEqual([result.failed() for result in results], [False, False, True, False])
+        self.assertIsInstance(results[2].error, ValueError)
+        with self.assertRaises(ValueError):
+            results[2].get()
+
+    def test_concurrency_bound(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def tracked(x):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.01)
+            with lock:
+                state['running'] -= 1
+            return x
+
+        list(run_batch(tracked, ({'x': x} for x in range(12)), concurrency=3))
+        self.assertLessEqual(state['peak'], 3)
+
+class MapIdsTest(unittest.TestCase):
+
+    def test_map_ids(self):
+        routes = {
+            '/widgets/{}'.format(x): (200, {'Content-Type': 'application/json'}, '{{"data": {{"id": {}}}}}'.format(x).encode('utf-8'))
+            for x in [1, 3]
+        }
+        with StubServer(routes) as server:
+            api = API(hive(server.url()))
+            results = list(api.Widgets.map_ids([1, 2, 3], 'get', concurrency=2))
+        self.assertEqual([result.kwargs for result in results], [{'widget_id': x} for x in [1, 2, 3]])
+        self.assertEqual([results[0].get(), results[2].get()], [1, 3])
+        self.assertTrue(results[1].failed())
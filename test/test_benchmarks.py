@@ -0,0 +1,65 @@
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from beekeeper.api import API
+
+from benchmarks import harness
+from benchmarks.cases import Context, widget_hive, required_variables
+
+class HarnessTest(unittest.TestCase):
+
+    def test_run_case(self):
+        calls = []
+        case = harness.Case('noop', lambda context: (lambda: calls.append(1), lambda: calls.append('done')), 20, 5, 3)
+        result = harness.run_case(case, None)
+        self.assertEqual(calls.count(1), 5 + 20 + 20)
+        self.assertEqual(calls[-1], 'done')
+        self.assertEqual(result.iterations, 20)
+        self.assertAlmostEqual(result.throughput, result.ops_per_sec * 3)
+        self.assertTrue(result.p50_us <= result.p90_us <= result.p99_us)
+
+    def test_skipped_case(self):
+        case = harness.Case('missing', lambda context: None, 20, 5, 1)
+        self.assertIsNone(harness.run_case(case, None))
+
+    def test_compare(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        fname = os.path.join(tmp, 'baseline.json')
+        harness.save([harness.Result(name='a', throughput=100.0), harness.Result(name='b', throughput=100.0)], fname)
+        baseline = harness.load(fname)
+        results = [
+            harness.Result(name='a', throughput=95.0),
+            harness.Result(name='b', throughput=80.0),
+            harness.Result(name='c', throughput=1.0)
+        ]
+        compared = harness.compare(results, baseline, threshold=0.1)
+        self.assertEqual([regressed for _, _, regressed in compared], [False, True, False])
+        self.assertAlmostEqual(compared[1][1], -0.2)
+        self.assertIsNone(compared[2][1])
+
+class CasesTest(unittest.TestCase):
+
+    def test_local_server(self):
+        context = Context()
+        self.addCleanup(context.close)
+        with API(widget_hive(context.url())) as api:
+            self.assertEqual(api.Widgets.get(widget_id='7'), {'id': '7', 'name': 'widget 7'})
+            self.assertEqual(api.Files.upload(note='hi', upload=b'x' * 100), True)
+
+    def test_example_hives_construct(self):
+        context = Context()
+        self.assertTrue(context.hives)
+        for hive in context.hives.values():
+            API(hive, **required_variables(hive)).close()
+
+    def test_every_case_runs(self):
+        context = Context()
+        self.addCleanup(context.close)
+        for case in harness.CASES:
+            if not case.name.startswith(('construct/', 'import/', 'throughput/')):
+                harness.run_case(harness.Case(case.name, case.setup, 5, 1, 1), context, allocations=False)
@@ -0,0 +1,117 @@
+from __future__ import unicode_literals
+
+import json
+import shutil
+import tempfile
+import unittest
+
+from beekeeper.api import API
+from beekeeper.cache import CacheEntry, MemoryCache, DiskCache, ResponseCache
+
+from .http_stub import StubServer
+from .test_aio import hive
+
+def entry(data, ttl=60):
+    return CacheEntry(200, 'OK', [('Content-Type', 'text/plain'), ('ETag', '"abc"')], data, ttl)
+
+def etagged(handler):
+    if handler.headers.get('If-None-Match') == '"v1"':
+        return (304, {'ETag': '"v1"'}, b'')
+    body = json.dumps({'data': {'id': len(handler.server.requests)}}).encode('utf-8')
+    return (200, {'Content-Type': 'application/json', 'ETag': '"v1"'}, body)
+
+def by_cookie(handler):
+    user = handler.headers.get('Cookie', 'user=0').split('=')[1]
+    return (200, {'Content-Type': 'application/json'}, json.dumps({'data': {'id': int(user)}}).encode('utf-8'))
+
+def log_in(handler):
+    return (200, {'Set-Cookie': 'user={}; Path=/'.format(handler.path.split('/')[-1])}, b'')
+
+class MemoryCacheTest(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = MemoryCache(max_entries=2)
+        cache.store('a', entry(b'a'))
+        cache.store('b', entry(b'b'))
+        cache.get('a')
+        cache.store('c', entry(b'c'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a').data, b'a')
+        self.assertEqual(cache.get('c').data, b'c')
+
+    def test_key_headers(self):
+        one = MemoryCache.key('GET', 'http://x', {'Authorization': 'one', 'X-Trace': '1'})
+        same = MemoryCache.key('GET', 'http://x', {'Authorization': 'one', 'X-Trace': '2'})
+        other = MemoryCache.key('GET', 'http://x', {'Authorization': 'two'})
+        self.assertEqual(one, same)
+        self.assertNotEqual(one, other)
+
+    def test_should_store(self):
+        self.assertTrue(ResponseCache.should_store(200, {'Vary': 'Accept-Encoding, Cookie'}))
+        self.assertFalse(ResponseCache.should_store(404, {}))
+        self.assertFalse(ResponseCache.should_store(200, {'Cache-Control': 'no-store'}))
+        self.assertFalse(ResponseCache.should_store(200, {'Cache-Control': 'max-age=60, private'}))
+        self.assertFalse(ResponseCache.should_store(200, {'Cache-Control': 'private="Set-Cookie"'}))
+        self.assertFalse(ResponseCache.should_store(200, {'Vary': 'X-Tenant'}))
+        self.assertFalse(ResponseCache.should_store(200, {'Vary': '*'}))
+
+    def test_validators(self):
+        self.assertEqual(entry(b'a').validators(), {'If-None-Match': '"abc"'})
+
+class DiskCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_roundtrip(self):
+        cache = DiskCache(self.directory)
+        cache.store('a', entry(b'a'))
+        loaded = DiskCache(self.directory).get('a')
+        self.assertEqual(loaded.data, b'a')
+        self.assertEqual(loaded.response().headers['content-type'], 'text/plain')
+        cache.discard('a')
+        self.assertIsNone(cache.get('a'))
+
+    def test_eviction(self):
+        cache = DiskCache(self.directory, max_entries=1)
+        cache.store('a', entry(b'a'))
+        cache.store('b', entry(b'b'))
+        self.assertEqual(len([x for x in [cache.get('a'), cache.get('b')] if x]), 1)
+
+class CachedActionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer({'/widgets/1': etagged}).__enter__()
+        self.hive = hive(self.server.url())
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def test_uncached_by_default(self):
+        api = API(self.hive, _cache=MemoryCache())
+        self.assertEqual([api.Widgets[1].get() for _ in range(2)], [1, 2])
+
+    def test_fresh_entry_served(self):
+        self.hive['objects']['Widgets']['actions']['get']['cache'] = {'ttl': 60}
+        api = API(self.hive, _cache=MemoryCache())
+        self.assertEqual([api.Widgets[1].get() for _ in range(3)], [1, 1, 1])
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_stale_entry_revalidated(self):
+        api = API(self.hive, _cache=MemoryCache(default_ttl=0))
+        self.assertEqual([api.Widgets[1].get() for _ in range(3)], [1, 1, 1])
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.server.requests[-1][2].get('If-None-Match'), '"v1"')
+
+    def test_keyed_on_session_cookies(self):
+        self.server.routes.update({'/widgets/1': by_cookie, '/login/1': log_in, '/login/2': log_in})
+        self.hive['objects']['Widgets']['actions']['get']['cache'] = {'ttl': 60}
+        cache = MemoryCache()
+        apis = [API(self.hive, _cache=cache) for _ in range(2)]
+        for user, api in enumerate(apis, 1):
+            api.transport().urlopen(self.server.url('/login/{}'.format(user))).read()
+        self.assertEqual([api.Widgets[1].get() for api in apis * 2], [1, 2, 1, 2])
+        self.assertEqual(len(self.server.requests), 4)
@@ -0,0 +1,55 @@
+from __future__ import unicode_literals
+
+import json
+import unittest
+
+from beekeeper.api import API
+
+from .http_stub import StubServer
+from .test_aio import hive
+
+LINES = b''.join(['line {}\r\n'.format(x).encode('utf-8') for x in range(1000)])
+
+class StreamingTest(unittest.TestCase):
+
+    def setUp(self):
+        routes = {'/widgets/1': (200, {'Content-Type': 'text/plain'}, LINES)}
+        self.server = StubServer(routes).__enter__()
+        self.api = API(hive(self.server.url()))
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def idle_connections(self):
+        return sum(len(idle) for idle in self.api.connection_pool().idle.values())
+
+    def test_iter_bytes(self):
+        response = self.api.Widgets[1].get(_stream=True)
+        self.assertEqual(self.idle_connections(), 0)
+        chunks = list(response.iter_bytes(1000))
+        self.assertEqual(b''.join(chunks), LINES)
+        self.assertTrue(all(len(chunk) <= 1000 for chunk in chunks))
+        self.assertEqual(self.idle_connections(), 1)
+
+    def test_iter_lines(self):
+        lines = list(self.api.Widgets[1].get(_stream=True).iter_lines(chunk_size=7))
+        self.assertEqual(len(lines), 1000)
+        self.assertEqual(lines[-1], b'line 999')
+
+    def test_raw_and_data(self):
+        with self.api.Widgets[1].get(_stream=True) as response:
+            self.assertEqual(response.raw.read(6), b'line 0')
+        self.assertEqual(self.idle_connections(), 0)
+        response = self.api.Widgets[1].get(_stream=True)
+        self.assertEqual(response.data, LINES)
+        self.assertEqual(list(response.iter_lines())[0], b'line 0')
+
+class IterItemsTest(unittest.TestCase):
+
+    def test_streamed_json(self):
+        body = json.dumps({'data': {'id': [1, 2, 3]}}).encode('utf-8')
+        routes = {'/widgets/1': (200, {'Content-Type': 'application/json'}, body)}
+        with StubServer(routes) as server:
+            api = API(hive(server.url()))
+            self.assertEqual(list(api.Widgets[1].get(_stream=True).iter_items()), [1, 2, 3])
+            self.assertEqual(list(api.Widgets[1].get(return_full_object=True).iter_items()), [1, 2, 3])
@@ -0,0 +1,191 @@
+from __future__ import unicode_literals
+
+import gzip
+import io
+import json
+import unittest
+import zlib
+from email.message import Message
+
+from beekeeper.api import API
+from beekeeper.compression import DecompressingReader, CompressionPolicy, accept_encoding, decompressing
+from beekeeper.metrics import MetricsRecorder
+from beekeeper.transports import BufferedResponse, MockTransport
+
+from .http_stub import StubServer
+
+ITEMS = [{'id': i, 'name': 'widget {}'.format(i)} for i in range(2000)]
+BODY = json.dumps({'items': ITEMS}).encode('utf-8')
+
+def gzipped(data):
+    out = io.BytesIO()
+    with gzip.GzipFile(fileobj=out, mode='wb') as compressed:
+        compressed.write(data)
+    return out.getvalue()
+
+def raw_deflated(data):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+def response(body, encoding=None):
+    headers = Message()
+    headers['Content-Type'] = 'application/json'
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return BufferedResponse(200, 'OK', headers, body)
+
+def compressed_items(handler):
+    if 'gzip' in handler.headers.get('Accept-Encoding', ''):
+        return (200, {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}, gzipped(BODY))
+    return (200, {'Content-Type': 'application/json'}, BODY)
+
+def hive(root):
+    return {
+        'root': root,
+        'endpoints': {'Items': {'path': '/items'}},
+        'objects': {
+            'Items': {
+                'actions': {
+                    'list': {'endpoint': 'Items', 'traverse': ['items']}
+                }
+            }
+        }
+    }
+
+class DecompressingReaderTest(unittest.TestCase):
+
+    def test_gzip(self):
+        reader = decompressing(response(gzipped(BODY), 'gzip'))
+        self.assertIsInstance(reader, DecompressingReader)
+        self.assertEqual(reader.read(), BODY)
+        self.assertEqual(reader.compressed_bytes, len(gzipped(BODY)))
+        self.assertEqual(reader.decompressed_bytes, len(BODY))
+
+    def test_chunked_reads(self):
+        reader = decompressing(response(gzipped(BODY), 'gzip'))
+        chunks = []
+        while True:
+            chunk = reader.read(100)
+            if not chunk:
+                break
+            self.assertLessEqual(len(chunk), 100)
+            chunks.append(chunk)
+        self.assertEqual(b''.join(chunks), BODY)
+
+    def test_deflate_with_and_without_zlib_wrapper(self):
+        self.assertEqual(decompressing(response(zlib.compress(BODY), 'deflate')).read(), BODY)
+        self.assertEqual(decompressing(response(raw_deflated(BODY), 'deflate')).read(), BODY)
+
+    def test_layered_encodings(self):
+        body = gzipped(zlib.compress(BODY))
+        self.assertEqual(decompressing(response(body, 'deflate, gzip')).read(), BODY)
+
+    def test_passthrough(self):
+        for encoding in (None, 'identity', 'compress'):
+            raw = response(BODY, encoding)
+            self.assertIs(decompressing(raw), raw)
+
+    def test_accept_encoding(self):
+        self.assertTrue(accept_encoding().startswith('gzip, deflate'))
+
+class CompressedResponseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer({'/items': compressed_items}).__enter__()
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def test_negotiated_and_decoded(self):
+        recorder = MetricsRecorder()
+        api = API(hive(self.server.url()), _metrics=recorder)
+        result = api.Items.list(return_full_object=True)
+        self.assertEqual(result.read(), ITEMS)
+        self.assertEqual(result.bytes_decoded, len(BODY))
+        self.assertEqual(result.bytes_received, len(gzipped(BODY)))
+        self.assertEqual(recorder.counter('Items.list', 'bytes_decoded'), len(BODY))
+        self.assertEqual(recorder.counter('Items.list', 'bytes_received'), len(gzipped(BODY)))
+        self.assertIn('gzip', self.server.requests[0][2]['Accept-Encoding'])
+
+    def test_streamed(self):
+        api = API(hive(self.server.url()))
+        with api.Items.list(_stream=True) as result:
+            self.assertEqual(list(result.iter_items(chunk_size=512)), ITEMS)
+            self.assertEqual(result.bytes_decoded, len(BODY))
+            self.assertLess(result.bytes_received, result.bytes_decoded)
+
+    def test_explicit_accept_encoding_kept(self):
+        api = API(hive(self.server.url()), _headers={'Accept-Encoding': 'identity'})
+        result = api.Items.list(return_full_object=True)
+        self.assertEqual(result.read(), ITEMS)
+        self.assertEqual(result.bytes_received, result.bytes_decoded)
+        self.assertEqual(self.server.requests[0][2]['Accept-Encoding'], 'identity')
+
+def upload_hive(compress):
+    return {
+        'root': 'https://example.com',
+        'endpoints': {
+            'Import': {
+                'path': '/import',
+                'methods': ['POST'],
+                'variables': {'records': {'type': 'data', 'mimetype': 'application/json'}}
+            }
+        },
+        'objects': {
+            'Records': {
+                'actions': {
+                    'load': {'endpoint': 'Import', 'method': 'POST', 'compress': compress, 'retry': {'attempts': 2, 'backoff': 0, 'methods': ['POST']}}
+                }
+            }
+        }
+    }
+
+class RequestCompressionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = MockTransport()
+        self.transport.add('POST', r'.*/import', headers={'Content-Type': 'application/json'}, body=b'{"ok": true}')
+        self.api = API(upload_hive({'min_size': 100}), _transport=self.transport)
+
+    def sent(self):
+        request = self.transport.requests[-1]
+        return request.headers.get('Content-Encoding'), request.data
+
+    def test_large_body_compressed(self):
+        self.api.Records.load(records=ITEMS)
+        encoding, data = self.sent()
+        self.assertEqual(encoding, 'gzip')
+        self.assertEqual(json.loads(zlib.decompress(data, 16 + zlib.MAX_WBITS).decode('utf-8')), ITEMS)
+        self.assertLess(len(data), len(BODY))
+
+    def test_small_body_untouched(self):
+        self.api.Records.load(records=[1, 2])
+        self.assertEqual(self.sent(), (None, b'[1, 2]'))
+
+    def test_call_level_override(self):
+        self.api.Records.load(records=ITEMS, _compress=False)
+        self.assertIsNone(self.sent()[0])
+        self.api.Records.load(records=ITEMS, _compress='deflate')
+        encoding, data = self.sent()
+        self.assertEqual(encoding, 'deflate')
+        self.assertEqual(json.loads(zlib.decompress(data).decode('utf-8')), ITEMS)
+
+    def test_off_by_default(self):
+        api = API(upload_hive(None), _transport=self.transport)
+        api.Records.load(records=ITEMS, _compress=None)
+        self.assertIsNone(self.sent()[0])
+        api.Records.load(records=ITEMS, _compress=True)
+        self.assertEqual(self.sent()[0], 'gzip')
+
+    def test_compressed_once_across_retries(self):
+        responses = [(503, {}, b''), (200, {'Content-Type': 'application/json'}, b'{"ok": true}')]
+        self.transport.add('POST', r'.*/import', body=lambda request: responses.pop(0))
+        api = API(upload_hive({'min_size': 100, 'level': 1}), _transport=self.transport)
+        api.Records.load(records=ITEMS)
+        first, second = self.transport.requests
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(json.loads(zlib.decompress(second.data, 16 + zlib.MAX_WBITS).decode('utf-8')), ITEMS)
+
+    def test_unknown_encoding(self):
+        with self.assertRaises(TypeError):
+            CompressionPolicy.from_setting('lzma')
@@ -2,7 +2,14 @@ from __future__ import unicode_literals
 
 import unittest
 
-from beekeeper.data_handlers import encode, decode
+from beekeeper.data_handlers import encode, decode, get_json_codec, JSONCodec
+
+def installed(module):
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
 
 class TestJsonParser(unittest.TestCase):
 
@@ -50,4 +57,46 @@ class TestParams(unittest.TestCase):
 class TestEmptyData(unittest.TestCase):
 
     def test_empty_data(self):
-        self.assertEqual(decode(bytes(), 'application/json'), None)
\ No newline at end of file
+        self.assertEqual(decode(bytes(), 'application/json'), None)
+
+class TestJsonCodecs(unittest.TestCase):
+
+    def setUp(self):
+        self.testingbytes = '{"Key1":"Valu\u00e9","Key2":[2,3.5,null]}'.encode('utf-8')
+        self.testingdict = {'Key1': 'Valu\u00e9', 'Key2': [2, 3.5, None]}
+
+    def check(self, codec):
+        self.assertEqual(decode(self.testingbytes, 'application/json', json_codec=codec), self.testingdict)
+        self.assertEqual(decode(encode(self.testingdict, 'application/json', json_codec=codec), 'application/json'), self.testingdict)
+        latin = self.testingbytes.decode('utf-8').encode('latin-1')
+        self.assertEqual(decode(latin, 'application/json', encoding='latin-1', json_codec=codec), self.testingdict)
+        self.assertEqual(decode(b'not json', 'text/plain', json_codec=codec), 'not json')
+        self.assertEqual(decode(b'[1]', 'text/plain', json_codec=codec), [1])
+
+    def test_stdlib(self):
+        self.check(get_json_codec('json'))
+
+    @unittest.skipUnless(installed('orjson'), 'orjson is not installed')
+    def test_orjson(self):
+        self.check(get_json_codec('orjson'))
+
+    @unittest.skipUnless(installed('ujson'), 'ujson is not installed')
+    def test_ujson(self):
+        self.check(get_json_codec('ujson'))
+
+    def test_auto(self):
+        codec = get_json_codec('auto')
+        self.assertIsInstance(codec, JSONCodec)
+        if installed('orjson'):
+            self.assertEqual(codec.name, 'orjson')
+        elif not installed('ujson'):
+            self.assertEqual(codec.name, 'json')
+
+    def test_default_and_passthrough(self):
+        codec = JSONCodec()
+        self.assertEqual(get_json_codec(None).name, 'json')
+        self.assertIs(get_json_codec(codec), codec)
+
+    def test_unknown(self):
+        with self.assertRaises(TypeError):
+            get_json_codec('yaml')
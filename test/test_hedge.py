@@ -0,0 +1,76 @@
+from __future__ import division, unicode_literals
+
+import sys
+import time
+import unittest
+
+from beekeeper.api import API
+from beekeeper.hedge import HedgePolicy
+
+from .http_stub import StubServer
+from .test_aio import hive
+
+if sys.version_info >= (3, 5):
+    import asyncio
+
+def slow_first(handler):
+    count = len(handler.server.requests)
+    if count == 1:
+        time.sleep(1)
+    body = '{{"data": {{"id": {}}}}}'.format(count).encode('utf-8')
+    return (200, {'Content-Type': 'application/json'}, body)
+
+class HedgePolicyTest(unittest.TestCase):
+
+    def test_delay(self):
+        policy = HedgePolicy(percentile=90, delay=0.5, min_samples=10)
+        self.assertEqual(policy.delay(), 0.5)
+        policy.latencies.extend(x / 100 for x in range(1, 11))
+        self.assertEqual(policy.delay(), 0.09)
+
+    def test_all_fail(self):
+        policy = HedgePolicy(delay=0.01)
+        def fail():
+            raise ValueError('nope')
+        with self.assertRaises(ValueError):
+            policy.run(fail)
+
+class HedgedActionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer({'/widgets/1': slow_first}).__enter__()
+        self.hive = hive(self.server.url())
+        self.hive['objects']['Widgets']['actions']['get']['hedge'] = {'delay': 0.05}
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def test_hedge_wins(self):
+        start = time.time()
+        self.assertEqual(API(self.hive).Widgets[1].get(), 2)
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_per_call_off(self):
+        self.assertEqual(API(self.hive).Widgets[1].get(_hedge=False), 1)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_unsafe_method_not_hedged(self):
+        self.hive['endpoints']['Widget']['methods'] = ['POST']
+        self.hive['objects']['Widgets']['actions']['get']['method'] = 'POST'
+        self.assertEqual(API(self.hive).Widgets[1].get(), 1)
+        self.assertEqual(len(self.server.requests), 1)
+
+    @unittest.skipIf(sys.version_info < (3, 5), 'asyncio support needs Python 3.5+')
+    def test_async(self):
+        api = API(self.hive)
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            self.assertEqual(loop.run_until_complete(api.Widgets.aio[1].get()), 2)
+            #Let the cancelled loser unwind before the loop closes.
+            loop.run_until_complete(asyncio.sleep(0.05))
+        finally:
+            api.async_connection_pool().close()
+            loop.close()
+            asyncio.set_event_loop(None)
@@ -1,8 +1,16 @@
 from __future__ import unicode_literals
 
+import json
+import os
+import shutil
+import tempfile
 import unittest
 
+import beekeeper.comms
 import beekeeper.hive
+from beekeeper.cache import MemoryCache
+
+from .http_stub import StubServer
 
 hive_v5 = {
     "name": "test_hive",
@@ -34,7 +42,7 @@ hive_vfree = {
     "name": "test_hive",
 }
 
-def fake_download_as_json(url):
+def fake_download_as_json(url, cache=None, ttl=None):
     hives = {
         "url_for_version_4": hive_v4,
         "url_for_version_5": hive_v5
@@ -103,3 +111,115 @@ class HiveTest(unittest.TestCase):
         hive = beekeeper.hive.Hive(**hive_vfree)
         with self.assertRaises(beekeeper.hive.VersionNotInHive):
             hive.get_version_url(5)
+
+class CompiledHiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = os.path.join(self.dir, 'cache')
+        self.fname = os.path.join(self.dir, 'hive.json')
+        self.write(hive_v5)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, hive):
+        with open(self.fname, 'w') as hive_file:
+            json.dump(hive, hive_file)
+
+    def test_compiled_copy_written(self):
+        hive = beekeeper.hive.Hive.from_file(self.fname, cache=self.cache)
+        self.assertEqual(hive, beekeeper.hive.Hive(**hive_v5))
+        compiled = beekeeper.hive.compiled_path(self.fname, self.cache)
+        self.assertTrue(os.path.exists(compiled))
+        self.assertEqual(beekeeper.hive.load_compiled(self.fname, self.cache), hive_v5)
+
+    def test_compiled_copy_used(self):
+        beekeeper.hive.Hive.from_file(self.fname, cache=self.cache)
+        header = beekeeper.hive.compiled_header(self.fname)
+        beekeeper.hive.save_compiled(self.fname, self.cache, header, hive_vfree)
+        hive = beekeeper.hive.Hive.from_file(self.fname, cache=self.cache)
+        self.assertEqual(hive, beekeeper.hive.Hive(**hive_vfree))
+
+    def test_stale_compiled_copy_ignored(self):
+        beekeeper.hive.Hive.from_file(self.fname, cache=self.cache)
+        self.write(hive_v4)
+        stat = os.stat(self.fname)
+        os.utime(self.fname, (stat.st_atime, stat.st_mtime + 10))
+        hive = beekeeper.hive.Hive.from_file(self.fname, cache=self.cache)
+        self.assertEqual(hive, beekeeper.hive.Hive(**hive_v4))
+
+    def test_corrupt_compiled_copy_ignored(self):
+        os.makedirs(self.cache)
+        with open(beekeeper.hive.compiled_path(self.fname, self.cache), 'wb') as compiled:
+            compiled.write(b'not marshal data')
+        hive = beekeeper.hive.Hive.from_file(self.fname, cache=self.cache)
+        self.assertEqual(hive, beekeeper.hive.Hive(**hive_v5))
+
+def versioned_hive(handler):
+    if handler.headers.get('If-None-Match') == '"v5"':
+        return (304, {'ETag': '"v5"'}, b'')
+    body = json.dumps(dict(hive_v5, versioning={
+        'version': 5,
+        'other_versions': [{'version': 4, 'location': handler.server.url('/api/hive-v4.json')}]
+    })).encode('utf-8')
+    return (200, {'Content-Type': 'application/json', 'ETag': '"v5"'}, body)
+
+class RemoteHiveCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        beekeeper.hive.download_as_json = beekeeper.comms.download_as_json
+        self.server = StubServer({
+            '/api/hive.json': versioned_hive,
+            '/api/hive-v4.json': (200, {'Content-Type': 'application/json'}, json.dumps(hive_v4).encode('utf-8'))
+        }).__enter__()
+        self.url = self.server.url('/api/hive.json')
+
+    def tearDown(self):
+        self.server.__exit__()
+        beekeeper.hive.download_as_json = fake_download_as_json
+
+    def paths(self):
+        return [request[1] for request in self.server.requests]
+
+    def test_fresh_hive_not_downloaded(self):
+        cache = MemoryCache()
+        first = beekeeper.hive.Hive.from_url(self.url, cache=cache)
+        second = beekeeper.hive.Hive.from_url(self.url, cache=cache)
+        self.assertEqual(first, second)
+        self.assertEqual(self.paths(), ['/api/hive.json'])
+
+    def test_stale_hive_revalidated(self):
+        cache = MemoryCache(default_ttl=0)
+        first = beekeeper.hive.Hive.from_url(self.url, cache=cache)
+        second = beekeeper.hive.Hive.from_url(self.url, cache=cache)
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.requests[1][2].get('If-None-Match'), '"v5"')
+
+    def test_offline(self):
+        cache = MemoryCache(default_ttl=0)
+        first = beekeeper.hive.Hive.from_url(self.url, cache=cache)
+        self.server.__exit__()
+        self.assertEqual(beekeeper.hive.Hive.from_url(self.url, cache=cache), first)
+
+    def test_versioned_hive_pinned(self):
+        cache = MemoryCache(default_ttl=0)
+        for _ in range(2):
+            hive = beekeeper.hive.Hive.from_url(self.url, version=4, cache=cache)
+            self.assertEqual(hive.version(), 4)
+        self.assertEqual(self.paths(), ['/api/hive.json', '/api/hive-v4.json', '/api/hive.json'])
+
+    def test_no_cache(self):
+        beekeeper.hive.Hive.from_url(self.url)
+        beekeeper.hive.Hive.from_url(self.url)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertIsNone(self.server.requests[1][2].get('If-None-Match'))
+
+    def test_domain_failover_remembered(self):
+        cache = MemoryCache()
+        first = beekeeper.hive.Hive.from_url(self.url, cache=cache)
+        domain = self.server.url()[len('http://'):]
+        second = beekeeper.hive.Hive.from_domain(domain, require_https=False, cache=cache)
+        self.assertEqual(first, second)
+        self.assertEqual(self.server.connections, 1)
@@ -0,0 +1,32 @@
+from __future__ import unicode_literals
+
+import subprocess
+import sys
+import unittest
+
+# Modules that only some hives or some calls need, and that importing
+# beekeeper shouldn't pay for up front.
+DEFERRED_MODULES = ('xmltodict', 'xml.sax', 'logging', 'asyncio', 'beekeeper.aio')
+
+def imported_after(statement):
+    code = '{}; import sys; print(" ".join(sorted(sys.modules)))'.format(statement)
+    return set(subprocess.check_output([sys.executable, '-c', code]).decode('utf-8').split())
+
+class ImportTest(unittest.TestCase):
+
+    def test_api_import_defers_optional_modules(self):
+        modules = imported_after('from beekeeper import API')
+        self.assertIn('beekeeper.api', modules)
+        self.assertEqual([name for name in DEFERRED_MODULES if name in modules], [])
+
+    @unittest.skipIf(sys.version_info < (3, 7), 'lazy package attributes need Python 3.7+')
+    def test_submodule_import_is_self_contained(self):
+        modules = imported_after('import beekeeper.data_handlers')
+        self.assertNotIn('beekeeper.api', modules)
+        self.assertNotIn('beekeeper.comms', modules)
+
+    def test_xml_codec_loaded_on_first_use(self):
+        modules = imported_after(
+            'from beekeeper.data_handlers import decode; decode(b"<a>1</a>", "application/xml")'
+        )
+        self.assertIn('xmltodict', modules)
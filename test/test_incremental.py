@@ -0,0 +1,73 @@
+from __future__ import unicode_literals
+
+import json
+import unittest
+
+from beekeeper.comms import traverse
+from beekeeper.exceptions import TraversalError
+from beekeeper.incremental import iter_json, iter_items
+
+DOCUMENT = {
+    'meta': {'count': 3, 'tags': ['a', 'b'], 'note': 'has "quotes" and \\ slashes ]}'},
+    'data': {
+        'items': [
+            {'id': 1, 'name': 'one', 'props': {'x': 1, 'y': [1, 2]}},
+            {'id': 2, 'name': 'twoé', 'props': {'x': 2, 'y': []}},
+            {'id': 3, 'name': 'three', 'props': {'x': 3, 'y': None}}
+        ],
+        'total': 3.5
+    },
+    'flag': True
+}
+
+PATHS = [
+    [],
+    ['data'],
+    ['data', 'items'],
+    ['data', 'items', 'name'],
+    ['data', 'items', ['id', 'name']],
+    ['data', 'items', 'props', '\\*'],
+    ['data', '\\*'],
+    [['meta', 'flag']],
+    ['meta', 'count'],
+    ['data', 'items', 'props', 'y'],
+]
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+class IncrementalJSONTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = json.dumps(DOCUMENT).encode('utf-8')
+
+    def test_matches_traverse(self):
+        for path in PATHS:
+            expected = list(iter_items(traverse(DOCUMENT, *path)))
+            for size in [1, 7, len(self.data)]:
+                self.assertEqual(list(iter_json(chunked(self.data, size), path)), expected)
+
+    def test_items_arrive_early(self):
+        document = b'{"data": {"items": [{"id": 1}, {"id": 2}, '
+        items = iter_json(chunked(document, 4), ['data', 'items', 'id'])
+        self.assertEqual([next(items), next(items)], [1, 2])
+        with self.assertRaises(ValueError):
+            next(items)
+
+    def test_missing_key(self):
+        with self.assertRaises(TraversalError):
+            list(iter_json([self.data], ['data', 'nope']))
+
+    def test_empty_body(self):
+        self.assertEqual(list(iter_json([b''], ['data'])), [])
+
+    def test_numbers_split_across_chunks(self):
+        for number in ('-12.5e-3', '1.5', '12345', '-0.25E+10'):
+            document = '{{"pre": {}, "x": [{}]}}'.format(number, number).encode('utf-8')
+            for split in range(1, len(document)):
+                chunks = [document[:split], document[split:]]
+                self.assertEqual(list(iter_json(chunks, [['pre', 'x']])), [('pre', json.loads(number)), ('x', [json.loads(number)])])
+
+    def test_truncated_number(self):
+        with self.assertRaises(ValueError):
+            list(iter_json([b'[1.', b']']))
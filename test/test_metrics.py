@@ -0,0 +1,81 @@
+from __future__ import unicode_literals
+
+import logging
+import unittest
+
+from beekeeper.api import API
+from beekeeper.comms import ResponseException
+from beekeeper.metrics import Timings, Histogram, MetricsRecorder
+
+from .http_stub import StubServer
+from .test_aio import hive, ROUTES
+
+class TimingsTest(unittest.TestCase):
+
+    def test_phases_add_up(self):
+        timings = Timings()
+        timings.add('ttfb', 0.25)
+        timings.add('ttfb', 0.25)
+        with timings.timer('decode'):
+            pass
+        self.assertEqual(timings['ttfb'], 0.5)
+        self.assertIn('decode', timings)
+        self.assertAlmostEqual(timings.total(), 0.5, places=2)
+
+    def test_histogram(self):
+        histogram = Histogram(buckets=(1, 2))
+        for value in (0.5, 1.5, 1.5, 3):
+            histogram.observe(value)
+        self.assertEqual(histogram.buckets, [1, 2, 1])
+        self.assertEqual(histogram.mean(), 1.625)
+
+class MetricsHookTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer(ROUTES).__enter__()
+        self.recorder = MetricsRecorder()
+        self.api = API(hive(self.server.url()), _metrics=self.recorder)
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def test_response_timings(self):
+        response = self.api.Widgets[5].get(return_full_object=True)
+        self.assertEqual(response.read(), 5)
+        for phase in ('render', 'dns', 'connect', 'ttfb', 'download', 'decode', 'traverse'):
+            self.assertIn(phase, response.timings)
+        reused = self.api.Widgets[5].get(return_full_object=True)
+        self.assertNotIn('connect', reused.timings)
+
+    def test_recorder(self):
+        self.api.Widgets[5].get()
+        with self.assertRaises(ResponseException):
+            self.api.Widgets[6].get()
+        self.assertEqual(self.recorder.counter('Widgets.get', 'requests'), 2)
+        self.assertEqual(self.recorder.counter('Widgets.get', 'errors'), 1)
+        self.assertEqual(self.recorder.counter('Widgets.get', 'status_404'), 1)
+        self.assertEqual(self.recorder.histogram('Widgets.get', 'ttfb').count, 2)
+
+    def test_callback(self):
+        seen = []
+        self.api.add_metrics_hook(seen.append)
+        self.api.Widgets[5].get()
+        self.assertEqual([(m.action, m.method, m.code) for m in seen], [('Widgets.get', 'GET', 200)])
+        self.assertTrue(seen[0].url.endswith('/widgets/5'))
+
+    def test_failing_hook(self):
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        logger = logging.getLogger('beekeeper.metrics')
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        def broken(metrics):
+            raise RuntimeError('hook failed')
+        self.api.add_metrics_hook(broken)
+        self.assertEqual(self.api.Widgets[5].get(), 5)
+        with self.assertRaises(ResponseException):
+            self.api.Widgets[6].get()
+        self.assertEqual(self.recorder.counter('Widgets.get', 'requests'), 2)
+        self.assertEqual(len(records), 2)
+        self.assertIsInstance(records[0].exc_info[1], RuntimeError)
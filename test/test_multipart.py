@@ -0,0 +1,166 @@
+from __future__ import unicode_literals
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from beekeeper.api import API
+from beekeeper.multipart import MultipartBody, is_replayable
+
+from .http_stub import StubServer
+
+class Unseekable(object):
+
+    def __init__(self, data):
+        self.stream = io.BytesIO(data)
+
+    def read(self, amt=None):
+        return self.stream.read(amt)
+
+def upload(handler):
+    return (200, {'Content-Type': 'application/json'}, b'{"ok": true}')
+
+def unavailable(handler):
+    return (503, {'Content-Type': 'application/json'}, b'{}')
+
+def flaky_upload(handler):
+    if len(handler.server.requests) < 2:
+        return unavailable(handler)
+    return upload(handler)
+
+RETRY_POSTS = {'attempts': 3, 'backoff': 0.01, 'jitter': False, 'methods': ['POST']}
+
+def hive(root):
+    return {
+        'root': root,
+        'endpoints': {
+            'Upload': {
+                'path': '/upload',
+                'methods': ['POST'],
+                'variables': {
+                    'note': {'type': 'multipart'},
+                    'upload': {'type': 'multipart', 'mimetype': 'application/octet-stream', 'filename': 'blob.bin'}
+                }
+            }
+        },
+        'objects': {
+            'Files': {
+                'actions': {
+                    'upload': {'endpoint': 'Upload', 'method': 'POST', 'traverse': ['ok']}
+                }
+            }
+        }
+    }
+
+class MultipartBodyTest(unittest.TestCase):
+
+    def test_parts_in_order(self):
+        body = MultipartBody([b'head', io.BytesIO(b'0123456789'), b'tail'], chunk_size=4)
+        self.assertEqual(list(body), [b'head', b'0123', b'4567', b'89', b'tail'])
+        self.assertEqual(body.content_length, 18)
+        self.assertTrue(body.is_streamed())
+
+    def test_rewound_for_each_send(self):
+        stream = io.BytesIO(b'skip|data')
+        stream.seek(5)
+        body = MultipartBody([stream])
+        self.assertEqual(body.content_length, 4)
+        self.assertEqual(b''.join(body), b'data')
+        self.assertEqual(b''.join(body), b'data')
+
+    def test_unknown_length(self):
+        self.assertIsNone(MultipartBody([b'x', Unseekable(b'data')]).content_length)
+        text = MultipartBody([io.StringIO('café')])
+        self.assertIsNone(text.content_length)
+        self.assertEqual(b''.join(text), 'café'.encode('utf-8'))
+
+    def test_replayable(self):
+        self.assertTrue(is_replayable(None))
+        self.assertTrue(is_replayable(b'data'))
+        self.assertTrue(is_replayable(MultipartBody([b'x', io.BytesIO(b'data')])))
+        self.assertFalse(is_replayable(MultipartBody([b'x', Unseekable(b'data')])))
+        self.assertFalse(is_replayable(Unseekable(b'data')))
+
+    def test_bytes_only(self):
+        body = MultipartBody([b'a', b'', b'b'])
+        self.assertFalse(body.is_streamed())
+        self.assertEqual(list(body), [b'a', b'b'])
+        self.assertEqual(body.content_length, 2)
+
+class StreamedUploadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer({'/upload': upload}).__enter__()
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'blob.bin')
+        self.data = os.urandom(300000)
+        with open(self.path, 'wb') as blob:
+            blob.write(self.data)
+
+    def tearDown(self):
+        self.server.__exit__()
+        shutil.rmtree(self.dir)
+
+    def check_upload(self, headers, body, length_known=True):
+        self.assertEqual(headers.get('Content-Length') is not None, length_known)
+        self.assertIn(b'name="note"\n\nhello', body)
+        self.assertIn(b'filename="blob.bin"\nContent-Type: application/octet-stream\n\n' + self.data, body)
+
+    def test_pooled(self):
+        api = API(hive(self.server.url()))
+        with open(self.path, 'rb') as blob:
+            self.assertTrue(api.Files.upload(note='hello', upload=blob))
+        _, _, headers, body = self.server.requests[0]
+        self.check_upload(headers, body)
+        self.assertEqual(int(headers['Content-Length']), len(body))
+
+    def test_urllib(self):
+        api = API(hive(self.server.url()), _transport='urllib')
+        with open(self.path, 'rb') as blob:
+            self.assertTrue(api.Files.upload(note='hello', upload=blob))
+        _, _, headers, body = self.server.requests[0]
+        self.check_upload(headers, body)
+
+    def test_retried_upload_replayed(self):
+        self.server.routes['/upload'] = flaky_upload
+        api = API(hive(self.server.url()))
+        with open(self.path, 'rb') as blob:
+            self.assertTrue(api.Files.upload(note='hello', upload=blob, _retry=RETRY_POSTS))
+        self.assertEqual(len(self.server.requests), 2)
+        self.check_upload(self.server.requests[1][2], self.server.requests[1][3])
+
+    def test_unseekable_upload_not_retried(self):
+        self.server.routes['/upload'] = flaky_upload
+        api = API(hive(self.server.url()))
+        with self.assertRaises(Exception):
+            api.Files.upload(note='hello', upload=Unseekable(self.data), _retry=RETRY_POSTS)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_unknown_length_sent_chunked(self):
+        api = API(hive(self.server.url()))
+        self.assertTrue(api.Files.upload(note='hello', upload=Unseekable(self.data)))
+        _, _, headers, body = self.server.requests[0]
+        self.assertEqual(headers.get('Transfer-Encoding'), 'chunked')
+        self.check_upload(headers, body, length_known=False)
+
+    @unittest.skipIf(sys.version_info < (3, 5), 'asyncio support needs Python 3.5+')
+    def test_aio(self):
+        import asyncio
+        loop = asyncio.new_event_loop()
+        api = API(hive(self.server.url()))
+        try:
+            with open(self.path, 'rb') as blob:
+                self.assertTrue(loop.run_until_complete(api.Files.aio.upload(note='hello', upload=blob)))
+            self.assertTrue(loop.run_until_complete(api.Files.aio.upload(note='hello', upload=Unseekable(self.data))))
+            self.server.routes['/upload'] = unavailable
+            with self.assertRaises(Exception):
+                loop.run_until_complete(api.Files.aio.upload(note='hello', upload=Unseekable(self.data), _retry=RETRY_POSTS))
+        finally:
+            api.close()
+            loop.close()
+        self.check_upload(self.server.requests[0][2], self.server.requests[0][3])
+        self.check_upload(self.server.requests[1][2], self.server.requests[1][3], length_known=False)
+        self.assertEqual(len(self.server.requests), 3)
@@ -0,0 +1,121 @@
+from __future__ import unicode_literals
+
+import json
+import unittest
+
+try:
+    from urllib.parse import urlsplit, parse_qs
+except ImportError:
+    from urlparse import urlsplit, parse_qs
+
+from beekeeper.api import API
+from beekeeper.pagination import Paginator
+
+from .http_stub import StubServer
+
+ITEMS = list(range(25))
+
+def query(handler):
+    return {key: val[0] for key, val in parse_qs(urlsplit(handler.path).query).items()}
+
+def as_json(body, headers=None):
+    out = {'Content-Type': 'application/json'}
+    out.update(headers or {})
+    return (200, out, json.dumps(body).encode('utf-8'))
+
+def by_offset(handler):
+    params = query(handler)
+    offset, limit = int(params['offset']), int(params['limit'])
+    return as_json({'results': ITEMS[offset:offset + limit]})
+
+def by_page(handler):
+    page = int(query(handler)['page'])
+    return as_json({'results': ITEMS[(page - 1) * 10:page * 10]})
+
+def by_cursor(handler):
+    start = int(query(handler).get('after', 0))
+    end = start + 10
+    return as_json({'results': ITEMS[start:end], 'next': end, 'more': end < len(ITEMS)})
+
+def by_link(handler):
+    start = int(query(handler).get('start', 0))
+    headers = {}
+    if start + 10 < len(ITEMS):
+        headers['Link'] = '<{}?start={}>; rel="next"'.format(handler.server.url('/link'), start + 10)
+    return as_json({'results': ITEMS[start:start + 10]}, headers)
+
+ROUTES = {'/offset': by_offset, '/page': by_page, '/cursor': by_cursor, '/link': by_link}
+
+def hive(root, path, variables, pagination):
+    return {
+        'root': root,
+        'endpoints': {
+            'Things': {'path': path, 'variables': variables}
+        },
+        'objects': {
+            'Things': {
+                'actions': {
+                    'list': {'endpoint': 'Things', 'traverse': ['results'], 'pagination': pagination}
+                }
+            }
+        }
+    }
+
+def param(**kwargs):
+    return dict({'type': 'url_param', 'optional': True}, **kwargs)
+
+class PaginatorTest(unittest.TestCase):
+
+    def test_unknown_type(self):
+        with self.assertRaises(TypeError):
+            Paginator({'type': 'scroll'})
+
+    def test_first_keeps_explicit_values(self):
+        paginator = Paginator({'offset_variable': 'offset', 'limit_variable': 'limit', 'limit': 10})
+        self.assertEqual(paginator.first({}), {'offset': 0, 'limit': 10})
+        self.assertEqual(paginator.first({'offset': 5}), {'offset': 5, 'limit': 10})
+
+class IterateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer(ROUTES).__enter__()
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def action(self, path, variables, pagination):
+        return API(hive(self.server.url(), path, variables, pagination)).Things.get_action('list')
+
+    def test_offset(self):
+        action = self.action('/offset', {'offset': param(), 'limit': param()}, {
+            'type': 'offset', 'offset_variable': 'offset', 'limit_variable': 'limit', 'limit': 10
+        })
+        self.assertEqual(list(action.iterate()), ITEMS)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(list(action.iterate(offset=20)), ITEMS[20:])
+
+    def test_page(self):
+        action = self.action('/page', {'page': param()}, {'type': 'page', 'limit': 10})
+        self.assertEqual(list(action.iterate(_prefetch=True)), ITEMS)
+
+    def test_cursor(self):
+        action = self.action('/cursor', {'after': param()}, {
+            'type': 'cursor', 'cursor_variable': 'after', 'cursor_path': ['next'], 'more_path': ['more']
+        })
+        self.assertEqual(list(action.iterate()), ITEMS)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_link(self):
+        api = API(hive(self.server.url(), '/link', {}, {'type': 'link'}))
+        self.assertEqual(list(api.Things.iterate('list', _prefetch=True)), ITEMS)
+
+    def test_lazy(self):
+        action = self.action('/page', {'page': param()}, {'type': 'page', 'limit': 10})
+        items = action.iterate()
+        self.assertEqual([next(items) for _ in range(10)], ITEMS[:10])
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_no_pagination(self):
+        api = API(hive(self.server.url(), '/offset', {}, None))
+        with self.assertRaises(TypeError):
+            api.Things.iterate('list')
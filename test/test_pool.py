@@ -0,0 +1,176 @@
+from __future__ import unicode_literals
+
+import base64
+import os
+import socket
+import unittest
+
+try:
+    from urllib2 import HTTPError, URLError
+    from cookielib import CookieJar
+except ImportError:
+    from urllib.error import HTTPError, URLError
+    from http.cookiejar import CookieJar
+
+from beekeeper import pool
+from beekeeper.multipart import MultipartBody
+from beekeeper.pool import ConnectionPool
+
+from .http_stub import StubServer
+from .test_multipart import Unseekable
+
+ROUTES = {
+    '/missing': (404, {'Content-Type': 'text/plain'}, b'/missing'),
+    '/redirect': (302, {'Location': '/thing'}, b'')
+}
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer(ROUTES).__enter__()
+        self.url = self.server.url()
+        self.pool = ConnectionPool()
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.__exit__()
+
+    def test_connection_reused(self):
+        for path in ['/one', '/two', '/three']:
+            self.assertEqual(self.pool.urlopen(self.url + path).read(), path.encode('utf-8'))
+        self.assertEqual(self.server.connections, 1)
+
+    def test_idle_eviction(self):
+        self.pool.idle_timeout = 0
+        self.pool.urlopen(self.url + '/one').read()
+        self.pool.urlopen(self.url + '/two').read()
+        self.assertEqual(self.server.connections, 2)
+
+    def test_max_connections(self):
+        self.pool.max_connections = 1
+        first = self.pool.urlopen(self.url + '/one', timeout=0.1)
+        with self.assertRaises(Exception):
+            self.pool.urlopen(self.url + '/two', timeout=0.1)
+        first.read()
+        self.assertEqual(self.pool.urlopen(self.url + '/two').read(), b'/two')
+
+    def test_error_response(self):
+        with self.assertRaises(HTTPError) as context:
+            self.pool.urlopen(self.url + '/missing')
+        self.assertEqual(context.exception.getcode(), 404)
+        self.assertEqual(context.exception.readline(), b'/missing')
+        self.assertEqual(self.pool.urlopen(self.url + '/one').read(), b'/one')
+        self.assertEqual(self.server.connections, 1)
+
+    def drop_idle_sockets(self):
+        for idle in self.pool.idle.values():
+            for conn, _ in idle:
+                conn.sock.shutdown(socket.SHUT_RDWR)
+
+    def test_stale_connection_retried(self):
+        self.pool.urlopen(self.url + '/one').read()
+        self.drop_idle_sockets()
+        self.assertEqual(self.pool.urlopen(self.url + '/two', data=b'body').read(), b'/two')
+        self.assertEqual(self.server.requests[-1][3], b'body')
+
+    def test_stale_connection_not_replayed(self):
+        self.pool.urlopen(self.url + '/one').read()
+        self.drop_idle_sockets()
+        body = MultipartBody([b'head', Unseekable(b'data')])
+        with self.assertRaises(URLError):
+            self.pool.urlopen(self.url + '/two', data=body, headers={'Transfer-Encoding': 'chunked'})
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_redirect(self):
+        self.assertEqual(self.pool.urlopen(self.url + '/redirect').read(), b'/thing')
+        self.assertEqual(self.server.connections, 1)
+
+    def test_cookies_not_redirected_to_other_host(self):
+        other = StubServer().__enter__()
+        self.addCleanup(other.__exit__)
+        self.server.routes['/login'] = (200, {'Set-Cookie': 'session=SECRET'}, b'')
+        self.server.routes['/away'] = (302, {'Location': other.url('/landing').replace('127.0.0.1', 'localhost')}, b'')
+        self.pool.cookie_jar = CookieJar()
+        self.pool.urlopen(self.url + '/login').read()
+        self.assertEqual(self.pool.urlopen(self.url + '/away').read(), b'/landing')
+        self.assertEqual(self.server.requests[-1][2]['Cookie'], 'session=SECRET')
+        self.assertIsNone(other.requests[-1][2]['Cookie'])
+
+    def test_ssl_context_built_lazily(self):
+        self.pool.urlopen(self.url + '/one').read()
+        self.assertIsNone(self.pool.ssl_context)
+        self.assertIs(self.pool.tls_context(), pool.default_ssl_context())
+        self.assertIs(ConnectionPool().tls_context(), self.pool.tls_context())
+
+    def test_every_address_tried(self):
+        closed = socket.socket()
+        closed.bind(('127.0.0.1', 0))
+        dead = closed.getsockname()
+        closed.close()
+        live = ('127.0.0.1', self.server.server_address[1])
+        getaddrinfo = socket.getaddrinfo
+        def fake_getaddrinfo(host, port, *args):
+            addresses = [(socket.AF_INET, socket.SOCK_STREAM, 6, '', dead)]
+            if port == live[1]:
+                addresses.append((socket.AF_INET, socket.SOCK_STREAM, 6, '', live))
+            return addresses
+        socket.getaddrinfo = fake_getaddrinfo
+        self.addCleanup(setattr, socket, 'getaddrinfo', getaddrinfo)
+        self.assertEqual(self.pool.urlopen(self.url + '/one').read(), b'/one')
+        self.assertEqual(self.server.connections, 1)
+        with self.assertRaises(URLError):
+            self.pool.urlopen('http://127.0.0.1:{}/one'.format(dead[1]), timeout=0.5)
+
+def set_environ(test, **values):
+    """
+    Set environment variables for the length of a test.
+    """
+    for name, value in values.items():
+        if name in os.environ:
+            test.addCleanup(os.environ.__setitem__, name, os.environ[name])
+        else:
+            test.addCleanup(os.environ.pop, name, None)
+        os.environ[name] = value
+
+class ProxyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.proxy = StubServer().__enter__()
+        self.pool = ConnectionPool()
+
+    def tearDown(self):
+        self.pool.close()
+        self.proxy.__exit__()
+
+    def test_proxies_from_environment(self):
+        set_environ(self, http_proxy='http://proxy.invalid:3128', no_proxy='local.invalid')
+        proxied = ConnectionPool()
+        self.assertEqual(proxied.proxy_for('http', 'example.invalid'), 'http://proxy.invalid:3128')
+        self.assertIsNone(proxied.proxy_for('http', 'local.invalid'))
+        self.assertIsNone(proxied.proxy_for('https', 'example.invalid'))
+
+    def test_http_through_proxy(self):
+        self.pool.proxies = {'http': self.proxy.url().replace('http://', 'http://user:pa%20ss@')}
+        for _ in range(2):
+            response = self.pool.urlopen('http://example.invalid/thing?x=1')
+            self.assertEqual(response.read(), b'http://example.invalid/thing?x=1')
+        _, path, headers, _ = self.proxy.requests[-1]
+        self.assertEqual(headers['Host'], 'example.invalid')
+        self.assertEqual(headers['Proxy-Authorization'], 'Basic ' + base64.b64encode(b'user:pa ss').decode('ascii'))
+        self.assertEqual(self.proxy.connections, 1)
+
+    def test_proxy_auth_not_redirected(self):
+        origin = StubServer().__enter__()
+        self.addCleanup(origin.__exit__)
+        set_environ(self, no_proxy='localhost')
+        self.proxy.routes['http://example.invalid/away'] = (302, {'Location': origin.url('/landing').replace('127.0.0.1', 'localhost')}, b'')
+        self.pool.proxies = {'http': self.proxy.url().replace('http://', 'http://user:pass@')}
+        self.assertEqual(self.pool.urlopen('http://example.invalid/away').read(), b'/landing')
+        self.assertIsNotNone(self.proxy.requests[-1][2]['Proxy-Authorization'])
+        self.assertIsNone(origin.requests[-1][2]['Proxy-Authorization'])
+
+    def test_https_tunnel_refused(self):
+        self.pool.proxies = {'https': self.proxy.url()}
+        with self.assertRaises(URLError) as context:
+            self.pool.urlopen('https://example.invalid/thing')
+        self.assertIn('Tunnel connection failed: 501', str(context.exception))
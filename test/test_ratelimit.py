@@ -0,0 +1,99 @@
+from __future__ import unicode_literals
+
+import threading
+import time
+import unittest
+
+from beekeeper.api import API
+from beekeeper.comms import ResponseException
+from beekeeper.ratelimit import RateLimiter, retry_after, reset_delay
+
+from .http_stub import StubServer
+from .test_aio import hive
+
+class Tracker(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def __call__(self, handler):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+        time.sleep(0.05)
+        with self.lock:
+            self.current -= 1
+        return (200, {'Content-Type': 'application/json'}, b'{"data": {"id": 1}}')
+
+def throttled(handler):
+    if len(handler.server.requests) == 1:
+        return (429, {'Retry-After': '0.3', 'Content-Type': 'application/json'}, b'{}')
+    return (200, {'Content-Type': 'application/json'}, b'{"data": {"id": 2}}')
+
+class RateLimiterTest(unittest.TestCase):
+
+    def test_burst_then_spaced(self):
+        limiter = RateLimiter(rate=10, burst=2)
+        waits = [limiter.reserve() for _ in range(4)]
+        self.assertEqual(waits[:2], [0, 0])
+        self.assertAlmostEqual(waits[2], 0.1, places=2)
+        self.assertAlmostEqual(waits[3], 0.2, places=2)
+
+    def test_pause(self):
+        limiter = RateLimiter()
+        limiter.pause(5)
+        self.assertAlmostEqual(limiter.reserve(), 5, places=1)
+
+    def test_observe_retry_after(self):
+        limiter = RateLimiter()
+        limiter.observe(429, {'Retry-After': '2'})
+        self.assertAlmostEqual(limiter.reserve(), 2, places=1)
+
+    def test_observe_remaining(self):
+        limiter = RateLimiter()
+        limiter.observe(200, {'X-RateLimit-Remaining': '3', 'X-RateLimit-Reset': '10'})
+        self.assertEqual(limiter.reserve(), 0)
+        limiter.observe(200, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '10'})
+        self.assertAlmostEqual(limiter.reserve(), 10, places=1)
+
+    def test_header_parsing(self):
+        self.assertEqual(retry_after('3'), 3)
+        self.assertEqual(retry_after('Thu, 01 Jan 1970 00:00:00 GMT'), 0)
+        self.assertIsNone(retry_after('soon'))
+        self.assertAlmostEqual(reset_delay(str(int(time.time()) + 30)), 30, delta=1)
+
+class LimitedAPITest(unittest.TestCase):
+
+    def test_max_in_flight(self):
+        tracker = Tracker()
+        with StubServer({'/widgets/1': tracker}) as server:
+            spec = hive(server.url())
+            spec['endpoints']['Widget']['rate_limit'] = {'max_in_flight': 2}
+            api = API(spec)
+            calls = [{'widget_id': 1}] * 8
+            results = [result.get() for result in api.Widgets.get_action('get').map(calls)]
+        self.assertEqual(results, [1] * 8)
+        self.assertEqual(tracker.peak, 2)
+
+    def test_api_rate(self):
+        with StubServer() as server:
+            spec = hive(server.url())
+            spec['rate_limit'] = {'rate': 20, 'burst': 1}
+            api = API(spec)
+            start = time.time()
+            for _ in range(5):
+                api.Widgets.get_action('get').execute(widget_id=1, return_full_object=True)
+            self.assertGreaterEqual(time.time() - start, 0.19)
+
+    def test_retry_after_pauses(self):
+        with StubServer({'/widgets/1': throttled}) as server:
+            spec = hive(server.url())
+            spec['rate_limit'] = {}
+            api = API(spec)
+            with self.assertRaises(ResponseException):
+                api.Widgets[1].get()
+            start = time.time()
+            self.assertEqual(api.Widgets[1].get(), 2)
+            self.assertGreaterEqual(time.time() - start, 0.25)
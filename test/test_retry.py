@@ -0,0 +1,92 @@
+from __future__ import unicode_literals
+
+import sys
+import unittest
+
+from beekeeper.api import API
+from beekeeper.comms import ResponseException
+from beekeeper.exceptions import RequestTimeout
+from beekeeper.retry import RetryPolicy
+
+from .http_stub import StubServer
+from .test_aio import hive
+
+if sys.version_info >= (3, 5):
+    import asyncio
+
+FAST = {'attempts': 3, 'backoff': 0.01, 'jitter': False}
+
+def flaky(handler):
+    if len(handler.server.requests) < 3:
+        return (503, {'Content-Type': 'application/json'}, b'{}')
+    return (200, {'Content-Type': 'application/json'}, b'{"data": {"id": 1}}')
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def test_from_setting(self):
+        self.assertIsNone(RetryPolicy.from_setting(None))
+        self.assertIsNone(RetryPolicy.from_setting(False))
+        self.assertEqual(RetryPolicy.from_setting(5).attempts, 5)
+        self.assertEqual(RetryPolicy.from_setting({'backoff': 2}).backoff, 2)
+
+    def test_backoff(self):
+        policy = RetryPolicy(backoff=1, max_backoff=5, jitter=False)
+        self.assertEqual([policy.delay(n, None) for n in range(1, 5)], [1, 2, 4, 5])
+        policy.jitter = True
+        self.assertTrue(all(0 <= policy.delay(3, None) <= 4 for _ in range(20)))
+
+    def test_retryable(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.is_retryable('GET', RequestTimeout(None)))
+        self.assertFalse(policy.is_retryable('POST', RequestTimeout(None)))
+
+    def test_attempts_and_deadline(self):
+        state = RetryPolicy(attempts=2, backoff=0).start('GET')
+        self.assertEqual(state.next_delay(RequestTimeout(None)), 0)
+        self.assertIsNone(state.next_delay(RequestTimeout(None)))
+        state = RetryPolicy(backoff=10, jitter=False, deadline=5).start('GET')
+        self.assertIsNone(state.next_delay(RequestTimeout(None)))
+
+class RetryActionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer({'/widgets/1': flaky}).__enter__()
+        self.hive = hive(self.server.url())
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def test_no_retry_by_default(self):
+        with self.assertRaises(ResponseException):
+            API(self.hive).Widgets[1].get()
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_hive_policy(self):
+        self.hive['objects']['Widgets']['actions']['get']['retry'] = FAST
+        self.assertEqual(API(self.hive).Widgets[1].get(), 1)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_per_call_override(self):
+        self.hive['objects']['Widgets']['actions']['get']['retry'] = FAST
+        with self.assertRaises(ResponseException):
+            API(self.hive).Widgets[1].get(_retry=False)
+        self.assertEqual(API(self.hive).Widgets[1].get(_retry=FAST), 1)
+
+    def test_unsafe_method_not_retried(self):
+        self.hive['endpoints']['Widget']['methods'] = ['POST']
+        self.hive['objects']['Widgets']['actions']['get']['method'] = 'POST'
+        with self.assertRaises(ResponseException):
+            API(self.hive).Widgets[1].get(_retry=FAST)
+        self.assertEqual(len(self.server.requests), 1)
+
+    @unittest.skipIf(sys.version_info < (3, 5), 'asyncio support needs Python 3.5+')
+    def test_async(self):
+        api = API(self.hive)
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            self.assertEqual(loop.run_until_complete(api.Widgets.aio[1].get(_retry=FAST)), 1)
+        finally:
+            api.async_connection_pool().close()
+            loop.close()
+            asyncio.set_event_loop(None)
@@ -0,0 +1,54 @@
+from __future__ import unicode_literals
+
+import unittest
+
+from beekeeper.api import API
+from beekeeper.session import Session
+
+from .http_stub import StubServer
+from .test_aio import hive, ROUTES
+
+def set_cookie(handler):
+    return (200, {'Content-Type': 'application/json', 'Set-Cookie': 'token=abc; Path=/'}, b'{"data": {"id": 0}}')
+
+class SessionTest(unittest.TestCase):
+
+    def setUp(self):
+        routes = dict(ROUTES)
+        routes['/widgets/login'] = set_cookie
+        self.server = StubServer(routes).__enter__()
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def test_cookies_isolated(self):
+        first = API(hive(self.server.url()))
+        second = API(hive(self.server.url()))
+        first.Widgets['login'].get()
+        first.Widgets[5].get()
+        second.Widgets[5].get()
+        cookies = [request[2].get('Cookie') for request in self.server.requests]
+        self.assertEqual(cookies, [None, 'token=abc', None])
+
+    def test_shared_session(self):
+        with Session() as session:
+            first = API(hive(self.server.url()), _session=session)
+            second = API(hive(self.server.url()), _session=session)
+            first.Widgets['login'].get()
+            second.Widgets[5].get()
+            self.assertIs(first.connection_pool(), second.connection_pool())
+        self.assertEqual(self.server.requests[-1][2].get('Cookie'), 'token=abc')
+        self.assertTrue(session.closed)
+
+    def test_default_headers(self):
+        with API(hive(self.server.url()), _headers={'X-Tenant': 'acme'}) as api:
+            api.Widgets[5].get()
+            self.assertEqual(api.session().headers, {'X-Tenant': 'acme'})
+        self.assertEqual(self.server.requests[0][2].get('X-Tenant'), 'acme')
+
+    def test_close(self):
+        api = API(hive(self.server.url()))
+        api.Widgets[5].get()
+        self.assertTrue(api.connection_pool().idle)
+        api.close()
+        self.assertFalse(api.connection_pool().idle)
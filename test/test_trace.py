@@ -0,0 +1,79 @@
+from __future__ import unicode_literals
+
+import logging
+import threading
+import unittest
+
+from beekeeper.api import API
+from beekeeper.comms import ResponseException
+from beekeeper.trace import Trace
+
+from .http_stub import StubServer
+from .test_aio import hive, ROUTES
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(record.getMessage())
+
+class TraceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer(ROUTES).__enter__()
+        self.api = API(hive(self.server.url()))
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def test_callable_output(self):
+        lines = []
+        self.assertEqual(self.api.Widgets[5].get(_verbose=lines.append), 5)
+        self.assertTrue(lines[0].endswith('> GET {}'.format(self.server.url('/widgets/5'))))
+        self.assertIn('< 200 OK', ' '.join(lines))
+        self.assertTrue(any('body: ' in line for line in lines))
+        self.assertTrue(lines[-1].split(' ', 1)[1].startswith('timings: '))
+        tag = lines[0].split(' ')[0]
+        self.assertTrue(all(line.startswith(tag + ' ') for line in lines))
+
+    def test_logger_output(self):
+        logger = logging.getLogger('beekeeper.test.trace')
+        logger.setLevel(logging.DEBUG)
+        handler = ListHandler()
+        logger.addHandler(handler)
+        try:
+            self.api.Widgets.get_action('get').execute(
+                widget_id=5, _verbose=Trace(logger), return_full_object=True
+            )
+        finally:
+            logger.removeHandler(handler)
+        self.assertTrue(handler.lines)
+
+    def test_redacts_credentials(self):
+        lines = []
+        trace = Trace(lines.append)
+        trace.request('GET', 'http://x', {'Authorization': 'secret'}, None)
+        self.assertEqual(lines[1].split(' ', 2)[2], 'Authorization: <redacted>')
+
+    def test_error(self):
+        lines = []
+        with self.assertRaises(ResponseException):
+            self.api.Widgets[6].get(_verbose=lines.append)
+        self.assertIn('< 404', ' '.join(lines))
+        self.assertIn('! ResponseException', lines[-1])
+
+    def test_scoped_to_request(self):
+        lines = []
+        def quiet():
+            for _ in range(10):
+                self.api.Widgets[5].get()
+        threads = [threading.Thread(target=quiet) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        self.api.Widgets[5].get(_verbose=lines.append)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len([line for line in lines if '> GET' in line]), 1)
@@ -0,0 +1,70 @@
+from __future__ import unicode_literals
+
+import json
+import sys
+import unittest
+
+from beekeeper.api import API
+from beekeeper.comms import ResponseException
+from beekeeper.transports import MockTransport, UrllibTransport
+
+from .http_stub import StubServer
+from .test_aio import hive, ROUTES
+
+if sys.version_info >= (3, 5):
+    import asyncio
+
+def widget(request):
+    body = json.dumps({'data': {'id': int(request.url.rsplit('/', 1)[1])}})
+    return (200, {'Content-Type': 'application/json'}, body)
+
+def mock():
+    transport = MockTransport()
+    transport.add('GET', r'http://mock/widgets/\d+', body=widget)
+    transport.add('GET', 'http://mock/widgets/6', code=410, headers={'Content-Type': 'text/plain'}, body='gone')
+    return transport
+
+class MockTransportTest(unittest.TestCase):
+
+    def test_routes(self):
+        transport = mock()
+        self.assertEqual(json.loads(transport.urlopen('http://mock/widgets/3').read().decode('utf-8')), {'data': {'id': 3}})
+        self.assertEqual([request.url for request in transport.requests], ['http://mock/widgets/3'])
+
+    def test_api(self):
+        transport = mock()
+        api = API(hive('http://mock'), _transport=transport)
+        self.assertEqual(api.Widgets[5].get(), 5)
+        with self.assertRaises(ResponseException) as context:
+            api.Widgets[6].get()
+        self.assertEqual(context.exception.code, 410)
+        self.assertEqual(context.exception.read(), 'gone')
+        with self.assertRaises(ResponseException) as context:
+            api.Widgets['x'].get()
+        self.assertEqual(context.exception.code, 404)
+        self.assertEqual(len(transport.requests), 3)
+
+    def test_unknown_transport(self):
+        with self.assertRaises(TypeError):
+            API(hive('http://mock'), _transport='carrier-pigeon')
+
+    @unittest.skipIf(sys.version_info < (3, 5), 'asyncio support needs Python 3.5+')
+    def test_async(self):
+        api = API(hive('http://mock'), _transport=mock())
+        self.assertIsNone(api.async_connection_pool())
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertEqual(loop.run_until_complete(api.Widgets.aio[7].get()), 7)
+        finally:
+            loop.close()
+
+class UrllibTransportTest(unittest.TestCase):
+
+    def test_api(self):
+        with StubServer(ROUTES) as server:
+            api = API(hive(server.url()), _transport='urllib')
+            self.assertIsInstance(api.transport(), UrllibTransport)
+            self.assertIsNone(api.connection_pool())
+            self.assertEqual(api.Widgets[5].get(), 5)
+            with self.assertRaises(ResponseException):
+                api.Widgets[6].get()
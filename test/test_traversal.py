@@ -0,0 +1,78 @@
+from __future__ import unicode_literals
+
+import unittest
+
+from beekeeper.api import API
+from beekeeper.exceptions import TraversalError
+from beekeeper.traversal import traverse, TraversalPath
+
+DOCUMENT = {
+    'data': {
+        'items': [
+            {'id': 1, 'name': 'one', 'tags': {'a': {'value': 1}, 'b': {'value': 2}}},
+            {'id': 2, 'name': 'two', 'tags': {'c': {'value': 3}}}
+        ],
+        'count': 2
+    }
+}
+
+class TraversalPathTest(unittest.TestCase):
+
+    def test_keys(self):
+        self.assertEqual(TraversalPath(['data', 'count'])(DOCUMENT), 2)
+        self.assertEqual(TraversalPath([])(DOCUMENT), DOCUMENT)
+
+    def test_lists(self):
+        self.assertEqual(TraversalPath(['data', 'items', 'id'])(DOCUMENT), [1, 2])
+        self.assertEqual(TraversalPath(['id'])([[{'id': 1}], [{'id': 2}]]), [[1], [2]])
+
+    def test_branches(self):
+        self.assertEqual(
+            TraversalPath(['data', 'items', ['id', 'name']])(DOCUMENT),
+            [{'id': 1, 'name': 'one'}, {'id': 2, 'name': 'two'}]
+        )
+        self.assertEqual(TraversalPath(['data', ['count', 'items'], 'id'])(DOCUMENT), {'count': 2, 'items': [1, 2]})
+
+    def test_wildcard(self):
+        self.assertEqual(
+            TraversalPath(['data', 'items', 'tags', '\\*', 'value'])(DOCUMENT),
+            [{'a': 1, 'b': 2}, {'c': 3}]
+        )
+
+    def test_errors(self):
+        with self.assertRaises(TraversalError) as err:
+            TraversalPath(['data', 'nope'])(DOCUMENT)
+        self.assertEqual(err.exception.key, 'nope')
+        with self.assertRaises(TraversalError) as err:
+            TraversalPath(['data', 'count', 'deeper'])(DOCUMENT)
+        self.assertEqual(err.exception.key, 'deeper')
+        with self.assertRaises(TraversalError):
+            TraversalPath(['data', 5])(DOCUMENT)
+        with self.assertRaises(KeyError):
+            TraversalPath(['data', ['count', 'nope']])(DOCUMENT)
+
+    def test_split(self):
+        self.assertEqual(TraversalPath(['deeper'])(5, split=True), 5)
+        self.assertEqual(traverse(5, 'deeper', split=True), 5)
+
+    def test_matches_traverse(self):
+        for path in (['data'], ['data', 'items', 'name'], ['data', 'items', ['id', 'tags'], '\\*']):
+            self.assertEqual(TraversalPath(path)(DOCUMENT), traverse(DOCUMENT, *path))
+
+    def test_still_a_path(self):
+        path = TraversalPath(['data', ['id', 'name']])
+        self.assertEqual(list(path), ['data', ['id', 'name']])
+        self.assertEqual(path[1:], (['id', 'name'],))
+
+    def test_validated_with_hive(self):
+        self.assertIsNone(TraversalPath.from_setting(None))
+        for setting in ('data', ['data', 5], ['data', ['id', None]]):
+            with self.assertRaises(TypeError):
+                TraversalPath.from_setting(setting)
+        hive = {
+            'root': 'http://example.com',
+            'endpoints': {'Things': {'path': '/things'}},
+            'objects': {'Things': {'actions': {'list': {'endpoint': 'Things', 'traverse': ['data', {'bad': 1}]}}}}
+        }
+        with self.assertRaises(TypeError):
+            API(hive)
@@ -0,0 +1,118 @@
+from __future__ import unicode_literals
+
+try:
+    from urlparse import urlsplit, parse_qs
+except ImportError:
+    from urllib.parse import urlsplit, parse_qs
+
+import json
+import os
+import unittest
+
+from beekeeper.api import API
+from beekeeper.transports import MockTransport
+from beekeeper.urls import URLTemplate, encode_params, static_params
+from beekeeper.variables import Variables
+
+HIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Examples', 'hives')
+
+def hive(path='/widgets/{widget_id}'):
+    return {
+        'root': 'http://example.com',
+        'variables': {'format': {'value': 'json'}},
+        'endpoints': {
+            'Widget': {
+                'path': path,
+                'variables': {
+                    'widget_id': {'type': 'url_replacement'},
+                    'fields': {'optional': True}
+                }
+            }
+        },
+        'objects': {
+            'Widgets': {
+                'id_variable': 'widget_id',
+                'actions': {'get': {'endpoint': 'Widget'}}
+            }
+        }
+    }
+
+class URLTemplateTest(unittest.TestCase):
+
+    def test_render(self):
+        template = URLTemplate('http://example.com/{kind}/{id:03d}/{kind}')
+        self.assertEqual(template.slots, ['kind', 'id'])
+        self.assertEqual(template.render({'kind': 'widgets', 'id': 7}), 'http://example.com/widgets/007/widgets')
+
+    def test_escaped(self):
+        template = URLTemplate('/things/{name}')
+        self.assertEqual(template.render({'name': 'a b?c#d%'}), '/things/a%20b%3Fc%23d%25')
+        self.assertEqual(template.render({'name': "ok/-._~:@!$&'()*+,;="}), "/things/ok/-._~:@!$&'()*+,;=")
+        self.assertEqual(template.render({'name': b'bytes'}), '/things/bytes')
+        self.assertEqual(template.render({'name': 'caf\xe9 \u4e2d\u6587'}), '/things/caf%C3%A9%20%E4%B8%AD%E6%96%87')
+        self.assertEqual(template.render({'name': 'a\nb"c<d>e\\f`g{h}'}), '/things/a%0Ab%22c%3Cd%3Ee%5Cf%60g%7Bh%7D')
+        self.assertEqual(template.render({'name': 'already%20encoded%2Fhere 100%'}), '/things/already%20encoded%2Fhere%20100%25')
+
+    def test_fixed(self):
+        template = URLTemplate('http://example.com/{{literal}}')
+        self.assertEqual(template.slots, [])
+        self.assertEqual(template.render({}), 'http://example.com/{literal}')
+
+    def test_missing_replacement(self):
+        with self.assertRaises(KeyError):
+            URLTemplate('/things/{name}').render({})
+
+    def test_invalid(self):
+        for template in ('/things/{', '/things/{}', '/things/{0}', '/things/{a.b}', '/things/{a[0]}'):
+            with self.assertRaises(TypeError):
+                URLTemplate(template)
+
+class ParamsTest(unittest.TestCase):
+
+    def test_static_params(self):
+        variables = Variables(
+            format={'value': 'json'},
+            fields={'optional': True},
+            stamp={'value': lambda: 'now'},
+            widget_id={'type': 'url_replacement', 'value': '1'},
+            **{'from': {'value': 'here'}}
+        )
+        encoded = static_params(variables)
+        self.assertEqual(sorted(encoded), ['format', 'from'])
+        self.assertEqual(encoded['from'][1], 'from=here')
+
+    def test_encode_params(self):
+        value = 'a b'
+        encoded = {'q': (value, 'q=precomputed')}
+        self.assertEqual(encode_params({'q': value, 'n': 2}, encoded), 'q=precomputed&n=2')
+        self.assertEqual(encode_params({'q': 'other', 'n': 2}, encoded), 'q=other&n=2')
+        self.assertEqual(encode_params({'q': 'a&b'}), 'q=a%26b')
+
+class RenderedURLTest(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = MockTransport().add('GET', r'.*', headers={'Content-Type': 'application/json'}, body=b'{}')
+
+    def test_request_url(self):
+        with API(hive(), _transport=self.transport) as api:
+            api.Widgets.get(widget_id='a b/c?d')
+            api.Widgets.get(widget_id='1', fields='name', format='xml')
+        urls = [urlsplit(request.url) for request in self.transport.requests]
+        self.assertEqual(
+            [(url.netloc, url.path, parse_qs(url.query)) for url in urls],
+            [
+                ('example.com', '/widgets/a%20b/c%3Fd', {'format': ['json']}),
+                ('example.com', '/widgets/1', {'format': ['xml'], 'fields': ['name']})
+            ]
+        )
+
+    def test_path_fragment(self):
+        with open(os.path.join(HIVE_DIR, 'apple_trailers.json')) as hive_file:
+            apple_trailers = json.load(hive_file)
+        with API(apple_trailers, _transport=self.transport) as api:
+            api.Movies.get(path='/trailers/wb/the_movie/')
+        self.assertEqual(self.transport.requests[-1].url, 'http://trailers.apple.com/trailers/wb/the_movie/data/page.json')
+
+    def test_validated_with_hive(self):
+        with self.assertRaises(TypeError):
+            API(hive('/widgets/{}'), _transport=self.transport)
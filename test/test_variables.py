@@ -154,3 +154,17 @@ class VariablesTest(unittest.TestCase):
         self.variables.add(**{'from':variable_3})
         self.assertIn('_from', self.variables)
         self.assertEqual(self.variables['_from']['name'], 'from')
+
+    def test_copy_keeps_callables(self):
+        counter = iter(range(10))
+        self.variables.add(z={'value': lambda: next(counter)})
+        copied = self.variables.copy()
+        self.assertTrue(callable(dict.__getitem__(copied['z'], 'value')))
+        copied.setval('x', 'changed')
+        self.assertEqual(self.variables['x']['value'], 'value1')
+
+    def test_resolved_executes_callables(self):
+        counter = iter(range(10))
+        self.variables.add(z={'value': lambda: next(counter)})
+        self.assertEqual(dict.__getitem__(self.variables.resolved()['z'], 'value'), 0)
+        self.assertEqual(dict.__getitem__(self.variables.resolved()['z'], 'value'), 1)